@@ -3,7 +3,8 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 from aw.api_endpoints.key import APIKey, APIKeyItem
 from aw.api_endpoints.job import APIJob, APIJobItem, APIJobExecutionItem, APIJobExecutionLogs, \
-    APIJobExecutionLogFile, APIJobExecution
+    APIJobExecutionLogFile, APIJobExecution, APIJobExecutionLogTail, APIJobExecutionLogStream, \
+    APIJobExecutionLogStreams, APIJobExecutionLogSearch
 from aw.api_endpoints.permission import APIPermission, APIPermissionItem
 from aw.api_endpoints.credentials import APIJobCredentials, APIJobCredentialsItem
 from aw.api_endpoints.filesystem import APIFsBrowse, APIFsExists
@@ -17,9 +18,13 @@ urlpatterns_api = [
     path('api/key/<str:token>', APIKeyItem.as_view()),
     path('api/key', APIKey.as_view()),
     path('api/job/<int:job_id>/<int:exec_id>/log/<int:line_start>', APIJobExecutionLogs.as_view()),
+    path('api/job/<int:job_id>/<int:exec_id>/log/tail', APIJobExecutionLogTail.as_view()),
+    path('api/job/<int:job_id>/<int:exec_id>/log/stream', APIJobExecutionLogStream.as_view()),
     path('api/job/<int:job_id>/<int:exec_id>/log', APIJobExecutionLogFile.as_view()),
     path('api/job/<int:job_id>/<int:exec_id>', APIJobExecutionItem.as_view()),
     path('api/job/<int:job_id>', APIJobItem.as_view()),
+    path('api/job_exec/search', APIJobExecutionLogSearch.as_view()),
+    path('api/job_exec/log/stream', APIJobExecutionLogStreams.as_view()),
     path('api/job_exec', APIJobExecution.as_view()),
     path('api/job', APIJob.as_view()),
     path('api/permission/<int:perm_id>', APIPermissionItem.as_view()),
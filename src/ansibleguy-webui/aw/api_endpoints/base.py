@@ -1,8 +1,11 @@
+from json import dumps as json_dumps
+
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import JsonResponse
 from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_api_key.permissions import BaseHasAPIKey
 from drf_spectacular.utils import OpenApiResponse
@@ -59,6 +62,24 @@ class LogDownloadResponse(BaseResponse):
     binary = serializers.CharField()
 
 
+def sse_event(event: str, data: dict, event_id: (int, str, None) = None) -> str:
+    # see: https://html.spec.whatwg.org/multipage/server-sent-events.html
+    msg = f'event: {event}\n'
+    if event_id is not None:
+        msg += f'id: {event_id}\n'
+
+    return msg + f'data: {json_dumps(data)}\n\n'
+
+
+class EventStreamRenderer(BaseRenderer):
+    # event-stream clients would otherwise get 'not acceptable'; errors are sent as single event
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event(event='msg', data=data).encode('utf-8')
+
+
 def api_docs_put(item: str) -> dict:
     return {
         200: OpenApiResponse(response=GenericResponse, description=f'{item} updated'),
@@ -10,7 +10,7 @@ from aw.model.job_credential import BaseJobCredentials, JobUserCredentials, JobG
 from aw.model.permission import CHOICE_PERMISSION_READ, CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE
 from aw.api_endpoints.base import API_PERMISSION, get_api_user, GenericResponse, BaseResponse, api_docs_delete, \
     api_docs_put, api_docs_post
-from aw.utils.permission import has_credentials_permission, has_manager_privileges
+from aw.utils.permission import has_credentials_permission, has_manager_privileges, get_viewable_credentials
 from aw.config.hardcoded import SECRET_HIDDEN
 from aw.utils.util import is_null
 from aw.base import USERS
@@ -137,14 +137,8 @@ class APIJobCredentials(APIView):
     def get(self, request):
         user = get_api_user(request)
         credentials_global = []
-        credentials_global_raw = JobGlobalCredentials.objects.all()
-        for credentials in credentials_global_raw:
-            if has_credentials_permission(
-                user=user,
-                credentials=credentials,
-                permission_needed=CHOICE_PERMISSION_READ,
-            ):
-                credentials_global.append(JobGlobalCredentialsReadResponse(instance=credentials).data)
+        for credentials in get_viewable_credentials(user):
+            credentials_global.append(JobGlobalCredentialsReadResponse(instance=credentials).data)
 
         credentials_user_raw = JobUserCredentials.objects.filter(user=user)
         credentials_user = []
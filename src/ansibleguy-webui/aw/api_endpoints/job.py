@@ -1,23 +1,35 @@
+from datetime import datetime
+
 from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
 from django.db.utils import IntegrityError
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework import serializers
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 
-from aw.config.hardcoded import JOB_EXECUTION_LIMIT
+from aw.config.hardcoded import JOB_EXECUTION_LIMIT, JOB_QUEUE_PRIORITY_MAX, LOG_TAIL_CHUNK_MAX, LOG_SEARCH_LIMIT, \
+    LOG_SEARCH_LIMIT_MAX, LOG_STREAM_MAX_PER_USER, LOG_STREAM_MAX_EXECUTIONS, LOG_TAIL_CHUNK_MIN
 from aw.model.job import Job, JobExecution
 from aw.model.permission import CHOICE_PERMISSION_READ, CHOICE_PERMISSION_EXECUTE, \
     CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE
 from aw.model.job_credential import JobGlobalCredentials
 from aw.api_endpoints.base import API_PERMISSION, get_api_user, BaseResponse, GenericResponse, \
-    LogDownloadResponse, api_docs_put, api_docs_delete, api_docs_post
+    LogDownloadResponse, api_docs_put, api_docs_delete, api_docs_post, EventStreamRenderer
 from aw.api_endpoints.job_util import get_viewable_jobs_serialized, JobReadResponse, get_job_executions_serialized, \
-    JobExecutionReadResponse, get_viewable_jobs, get_job_execution_serialized, get_log_file_content
-from aw.utils.permission import has_job_permission, has_credentials_permission, has_manager_privileges
+    JobExecutionReadResponse, get_log_file_content, stream_execution_log, get_executions_serialized, \
+    get_executions_page, encode_execution_cursor, parse_updated_since, stream_execution_logs, parse_stream_offsets, \
+    acquire_stream_slot, LogStream
+from aw.utils.permission import has_job_permission, has_credentials_permission, has_manager_privileges, \
+    get_permitted_job_ids, filter_permitted
 from aw.execute.queue import queue_add
+from aw.execute.control import send_control
 from aw.execute.util import update_status, is_execution_status
 from aw.utils.util import is_set
+from aw.utils.log_file import read_log_lines, read_log_chunk
+from aw.utils.log_search import search_logs, LogSearchError
 from aw.base import USERS
 
 
@@ -65,6 +77,29 @@ def _want_job_executions(request) -> tuple:
     return False, max_count
 
 
+def _job_execution_updated_since(request) -> (datetime, None):
+    # raises ValueError
+    return parse_updated_since(request.GET.get('updated_since', None))
+
+
+PARAM_UPDATED_SINCE = OpenApiParameter(
+    name='updated_since', type=str, required=False,
+    description="Only return job-executions that were updated after this time (ISO-8601, like the 'updated' "
+                "field of job-executions; needs to be URL-encoded)",
+)
+
+
+def _job_queue_priority(request) -> int:
+    if 'priority' not in request.GET:
+        return 0
+
+    try:
+        return min(max(int(request.GET['priority']), 0), JOB_QUEUE_PRIORITY_MAX)
+
+    except ValueError:
+        return 0
+
+
 def _has_credentials_permission(user: USERS, data: dict) -> bool:
     if 'credentials_default' in data and is_set(data['credentials_default']):
         try:
@@ -107,15 +142,23 @@ class APIJob(APIView):
                 description='Maximum count of job-executions to return',
                 required=False,
             ),
+            PARAM_UPDATED_SINCE,
         ],
     )
     def get(request):
         want_exec, exec_count = _want_job_executions(request)
         if want_exec:
+            try:
+                updated_since = _job_execution_updated_since(request)
+
+            except ValueError:
+                return Response(data={'msg': 'Provided updated_since is invalid'}, status=400)
+
             data = get_viewable_jobs_serialized(
                 user=get_api_user(request),
                 executions=True,
                 execution_count=exec_count,
+                updated_since=updated_since,
             )
 
         else:
@@ -157,6 +200,7 @@ class APIJob(APIView):
                 status=400,
             )
 
+        send_control('reload')
         return Response(data={'msg': 'Job created'}, status=200)
 
 
@@ -201,7 +245,15 @@ class APIJobItem(APIView):
 
         want_exec, exec_count = _want_job_executions(request)
         if want_exec:
-            data['executions'] = get_job_executions_serialized(job=job, execution_count=exec_count)
+            try:
+                updated_since = _job_execution_updated_since(request)
+
+            except ValueError:
+                return Response(data={'msg': 'Provided updated_since is invalid'}, status=400)
+
+            data['executions'] = get_job_executions_serialized(
+                job=job, execution_count=exec_count, updated_since=updated_since,
+            )
 
         return Response(data=data, status=200)
 
@@ -221,6 +273,7 @@ class APIJobItem(APIView):
                     return Response(data={'msg': f"Not privileged to delete the job '{job.name}'"}, status=403)
 
                 job.delete()
+                send_control('reload')
                 return Response(data={'msg': f"Job '{job.name}' deleted"}, status=200)
 
         except ObjectDoesNotExist:
@@ -257,7 +310,8 @@ class APIJobItem(APIView):
                     )
 
                 try:
-                    Job.objects.filter(id=job.id).update(**serializer.validated_data)
+                    # '.update()' does not touch the auto-updated timestamp the scheduler syncs by
+                    Job.objects.filter(id=job.id).update(**serializer.validated_data, updated=timezone.now())
 
                 except IntegrityError as err:
                     return Response(
@@ -265,6 +319,7 @@ class APIJobItem(APIView):
                         status=400,
                     )
 
+                send_control('reload')
                 return Response(data={'msg': f"Job '{job.name}' updated"}, status=200)
 
         except ObjectDoesNotExist:
@@ -280,7 +335,14 @@ class APIJobItem(APIView):
             404: OpenApiResponse(JobReadResponse, description='Job does not exist'),
         },
         summary='Execute a job.',
-        operation_id='job_execute'
+        operation_id='job_execute',
+        parameters=[
+            OpenApiParameter(
+                name='priority', type=int, default=0,
+                description=f'Queued executions with a higher priority are started first (0-{JOB_QUEUE_PRIORITY_MAX})',
+                required=False,
+            ),
+        ],
     )
     def post(self, request, job_id: int):
         user = get_api_user(request)
@@ -291,7 +353,8 @@ class APIJobItem(APIView):
                 if not has_job_permission(user=user, job=job, permission_needed=CHOICE_PERMISSION_EXECUTE):
                     return Response(data={'msg': f"Not privileged to execute the job '{job.name}'"}, status=403)
 
-                queue_add(job=job, user=user)
+                queue_add(job=job, user=user, priority=_job_queue_priority(request))
+                send_control('queue')
                 return Response(data={'msg': f"Job '{job.name}' execution queued"}, status=200)
 
         except ObjectDoesNotExist:
@@ -329,6 +392,7 @@ class APIJobExecutionItem(APIView):
                     return Response(data={'msg': f"Job execution '{job.name}' is not running"}, status=400)
 
                 update_status(execution, 'Stopping')
+                send_control('stop', execution=execution.id)
                 return Response(data={'msg': f"Job execution '{job.name}' stopping"}, status=200)
 
         except ObjectDoesNotExist:
@@ -368,9 +432,95 @@ class APIJobExecutionLogs(APIView):
                 if execution.log_stdout is None:
                     return Response(data={'msg': f"No logs found for job '{job.name}'"}, status=404)
 
-                with open(execution.log_stdout, 'r', encoding='utf-8') as logfile:
-                    lines = logfile.readlines()
-                    return Response(data={'lines': lines[line_start:]}, status=200)
+                return Response(data={'lines': read_log_lines(execution.log_stdout, line_start)}, status=200)
+
+        except (ObjectDoesNotExist, FileNotFoundError):
+            pass
+
+        return Response(
+            data={'msg': f"Job with ID '{job_id}', execution with ID '{exec_id}' or log-file does not exist"},
+            status=404,
+        )
+
+
+class JobExecutionLogTailResponse(BaseResponse):
+    data = serializers.CharField()
+    offset = serializers.IntegerField()
+    size = serializers.IntegerField()
+
+
+def _log_tail_int(request, key: str, default: int) -> (int, None):
+    try:
+        return int(request.GET.get(key, default))
+
+    except ValueError:
+        return None
+
+
+class APIJobExecutionLogTail(APIView):
+    http_method_names = ['get']
+    serializer_class = JobExecutionLogTailResponse
+    permission_classes = API_PERMISSION
+    valid_logfile_type = ['stdout', 'stderr', 'stdout_repo', 'stderr_repo']
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: OpenApiResponse(JobExecutionLogTailResponse, description='Return new job log-content'),
+            400: OpenApiResponse(JobExecutionLogTailResponse, description='Invalid offset or chunk-size provided'),
+            403: OpenApiResponse(JobExecutionLogTailResponse, description='Not privileged to view the job logs'),
+            404: OpenApiResponse(JobExecutionLogTailResponse, description='Job, execution or log-file do not exist'),
+        },
+        summary='Get log-content of a job execution starting at a byte-offset. '
+                'Pass the returned offset on the next request to only receive new content.',
+        operation_id='job_exec_log_tail',
+        parameters=[
+            OpenApiParameter(
+                name='offset', type=int, default=0,
+                description='Byte-offset to start reading at',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='max_bytes', type=int, default=LOG_TAIL_CHUNK_MAX,
+                description=f'Maximum count of bytes to return ({LOG_TAIL_CHUNK_MIN} to {LOG_TAIL_CHUNK_MAX})',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='type', type=str, default='stdout',
+                description=f"Type of log-file to read. One of {valid_logfile_type}",
+                required=False,
+            ),
+        ],
+    )
+    def get(self, request, job_id: int, exec_id: int):
+        user = get_api_user(request)
+        offset = _log_tail_int(request, key='offset', default=0)
+        max_bytes = _log_tail_int(request, key='max_bytes', default=LOG_TAIL_CHUNK_MAX)
+        if offset is None or max_bytes is None or offset < 0 or max_bytes < LOG_TAIL_CHUNK_MIN:
+            return Response(data={'msg': 'Provided offset or max_bytes are invalid'}, status=400)
+
+        try:
+            job, execution = _find_job_and_execution(job_id, exec_id)
+
+            if job is not None and execution is not None:
+                if not has_job_permission(user=user, job=job, permission_needed=CHOICE_PERMISSION_READ):
+                    return Response(data={'msg': f"Not privileged to view logs of the job '{job.name}'"}, status=403)
+
+                logfile_type = request.GET.get('type', 'stdout')
+                if logfile_type not in self.valid_logfile_type:
+                    logfile_type = 'stdout'
+
+                logfile = getattr(execution, f'log_{logfile_type}')
+                if logfile is None:
+                    return Response(data={'msg': f"No logs found for job '{job.name}'"}, status=404)
+
+                return Response(
+                    data=read_log_chunk(
+                        logfile, offset=offset, max_bytes=max_bytes,
+                        final=execution.status_name in JobExecution.status_done,
+                    ),
+                    status=200,
+                )
 
         except (ObjectDoesNotExist, FileNotFoundError):
             pass
@@ -381,6 +531,160 @@ class APIJobExecutionLogs(APIView):
         )
 
 
+def _log_stream_response(user: USERS, content) -> (StreamingHttpResponse, Response):
+    slot = acquire_stream_slot(user)
+    if slot is None:
+        content.close()
+        return Response(
+            data={'msg': f'Too many concurrent log-streams (limited to {LOG_STREAM_MAX_PER_USER} per user)'},
+            status=429,
+        )
+
+    response = StreamingHttpResponse(LogStream(content=content, slot=slot), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # proxies must not buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class APIJobExecutionLogStream(APIView):
+    http_method_names = ['get']
+    serializer_class = GenericResponse
+    permission_classes = API_PERMISSION
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    valid_logfile_type = ['stdout', 'stderr', 'stdout_repo', 'stderr_repo']
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: OpenApiResponse(GenericResponse, description='Stream of log-content and status-changes'),
+            400: OpenApiResponse(GenericResponse, description='Invalid offset provided'),
+            403: OpenApiResponse(GenericResponse, description='Not privileged to view the job logs'),
+            404: OpenApiResponse(GenericResponse, description='Job or execution do not exist'),
+            429: OpenApiResponse(GenericResponse, description='Too many concurrent log-streams of the user'),
+        },
+        summary='Stream log-content and status-changes of a job execution as server-sent events '
+                "('log', 'status' and 'end') until it has finished.",
+        operation_id='job_exec_log_stream',
+        parameters=[
+            OpenApiParameter(
+                name='offset', type=int, default=0,
+                description="Byte-offset to start reading at (the 'Last-Event-ID' header takes precedence)",
+                required=False,
+            ),
+            OpenApiParameter(
+                name='type', type=str, default='stdout',
+                description=f"Type of log-file to stream. One of {valid_logfile_type}",
+                required=False,
+            ),
+        ],
+    )
+    def get(self, request, job_id: int, exec_id: int):
+        user = get_api_user(request)
+        offset = request.META.get('HTTP_LAST_EVENT_ID', None)
+        if offset is None:
+            offset = _log_tail_int(request, key='offset', default=0)
+
+        else:
+            offset = int(offset) if offset.isdigit() else None
+
+        if offset is None or offset < 0:
+            return Response(data={'msg': 'Provided offset is invalid'}, status=400)
+
+        try:
+            job, execution = _find_job_and_execution(job_id, exec_id)
+
+            if job is not None and execution is not None:
+                if not has_job_permission(user=user, job=job, permission_needed=CHOICE_PERMISSION_READ):
+                    return Response(data={'msg': f"Not privileged to view logs of the job '{job.name}'"}, status=403)
+
+                logfile_type = request.GET.get('type', 'stdout')
+                if logfile_type not in self.valid_logfile_type:
+                    logfile_type = 'stdout'
+
+                return _log_stream_response(
+                    user=user,
+                    content=stream_execution_log(execution=execution, logfile_type=logfile_type, offset=offset),
+                )
+
+        except ObjectDoesNotExist:
+            pass
+
+        return Response(
+            data={'msg': f"Job with ID '{job_id}' or execution with ID '{exec_id}' does not exist"},
+            status=404,
+        )
+
+
+class APIJobExecutionLogStreams(APIView):
+    http_method_names = ['get']
+    serializer_class = GenericResponse
+    permission_classes = API_PERMISSION
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    valid_logfile_type = ['stdout', 'stderr', 'stdout_repo', 'stderr_repo']
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: OpenApiResponse(GenericResponse, description='Stream of log-content and status-changes'),
+            400: OpenApiResponse(GenericResponse, description='Invalid executions provided'),
+            403: OpenApiResponse(GenericResponse, description='Not privileged to view the job logs'),
+            404: OpenApiResponse(GenericResponse, description='Execution does not exist'),
+            429: OpenApiResponse(GenericResponse, description='Too many concurrent log-streams of the user'),
+        },
+        summary='Stream log-content and status-changes of multiple job executions over one connection '
+                "as server-sent events ('log', 'status' and 'end' - including the 'execution') "
+                'until all of them have finished.',
+        operation_id='job_exec_log_streams',
+        parameters=[
+            OpenApiParameter(
+                name='executions', type=str, required=True,
+                description='Comma-separated execution-IDs with optional byte-offsets to start reading at: '
+                            f"'<id>[:<offset>],...' (limited to {LOG_STREAM_MAX_EXECUTIONS}; "
+                            "the 'Last-Event-ID' header takes precedence)",
+            ),
+            OpenApiParameter(
+                name='type', type=str, default='stdout',
+                description=f"Type of log-file to stream. One of {valid_logfile_type}",
+                required=False,
+            ),
+        ],
+    )
+    def get(self, request):
+        user = get_api_user(request)
+        try:
+            offsets = parse_stream_offsets(
+                request.META.get('HTTP_LAST_EVENT_ID', None) or request.GET.get('executions', '')
+            )
+
+        except ValueError:
+            return Response(data={'msg': 'Provided executions are invalid'}, status=400)
+
+        if len(offsets) > LOG_STREAM_MAX_EXECUTIONS:
+            return Response(
+                data={'msg': f'Too many executions provided (limited to {LOG_STREAM_MAX_EXECUTIONS})'},
+                status=400,
+            )
+
+        executions = list(JobExecution.objects.filter(id__in=offsets).select_related('job'))
+        missing = set(offsets) - {execution.id for execution in executions}
+        if len(missing) > 0:
+            return Response(data={'msg': f"Executions with IDs {sorted(missing)} do not exist"}, status=404)
+
+        for job in {execution.job for execution in executions}:
+            if not has_job_permission(user=user, job=job, permission_needed=CHOICE_PERMISSION_READ):
+                return Response(data={'msg': f"Not privileged to view logs of the job '{job.name}'"}, status=403)
+
+        logfile_type = request.GET.get('type', 'stdout')
+        if logfile_type not in self.valid_logfile_type:
+            logfile_type = 'stdout'
+
+        return _log_stream_response(
+            user=user,
+            content=stream_execution_logs(executions=executions, logfile_type=logfile_type, offsets=offsets),
+        )
+
+
 class APIJobExecutionLogFile(APIView):
     http_method_names = ['get']
     serializer_class = LogDownloadResponse
@@ -421,7 +725,7 @@ class APIJobExecutionLogFile(APIView):
                 if logfile is None:
                     return Response(data={'msg': f"No logs found for job '{job.name}'"}, status=404)
 
-                return get_log_file_content(logfile)
+                return get_log_file_content(logfile, request=request)
 
         except (ObjectDoesNotExist, FileNotFoundError):
             pass
@@ -447,19 +751,100 @@ class APIJobExecution(APIView):
         parameters=[
             OpenApiParameter(
                 name='execution_count', type=int, default=JOB_EXECUTION_LIMIT,
-                description='Maximum count of job-executions to return',
+                description='Maximum count of job-executions to return (page-size)',
                 required=False,
             ),
+            OpenApiParameter(
+                name='cursor', type=str, required=False,
+                description="Return the next page of job-executions; the URL of the next page is returned "
+                            "in the 'Link' header (rel=\"next\") if more job-executions exist",
+            ),
+            PARAM_UPDATED_SINCE,
         ],
     )
     def get(self, request):
-        jobs = get_viewable_jobs(get_api_user(request))
+        job_ids = get_permitted_job_ids(get_api_user(request))
         exec_count = _job_execution_count(request)
         if exec_count is None:
             exec_count = JOB_EXECUTION_LIMIT
 
-        serialized = []
-        for execution in JobExecution.objects.filter(job__in=jobs).order_by('-updated')[:exec_count]:
-            serialized.append(get_job_execution_serialized(execution))
+        try:
+            executions = get_executions_page(
+                executions=filter_permitted(JobExecution.objects.all(), ids=job_ids, field='job_id'),
+                cursor=request.GET.get('cursor', None),
+                updated_since=_job_execution_updated_since(request),
+            )
+
+        except ValueError:
+            return Response(data={'msg': 'Provided cursor or updated_since are invalid'}, status=400)
+
+        serialized = get_executions_serialized(executions[:exec_count])
+        response = Response(data=serialized, status=200)
+        if 0 < exec_count == len(serialized):
+            params = request.GET.copy()
+            params['cursor'] = encode_execution_cursor(serialized[-1])
+            response['Link'] = f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+
+        return response
+
+
+class JobExecutionLogSearchResponse(BaseResponse):
+    execution = serializers.IntegerField()
+    job = serializers.IntegerField()
+    job_name = serializers.CharField()
+    log = serializers.CharField()
+    line = serializers.IntegerField()
+    snippet = serializers.CharField()
+
+
+class APIJobExecutionLogSearch(APIView):
+    http_method_names = ['get']
+    serializer_class = JobExecutionLogSearchResponse
+    permission_classes = API_PERMISSION
+
+    @extend_schema(
+        request=None,
+        responses={
+            200: OpenApiResponse(JobExecutionLogSearchResponse, description='Return matching log-lines'),
+            400: OpenApiResponse(GenericResponse, description='Invalid search provided'),
+            503: OpenApiResponse(GenericResponse, description='Log-search is not available'),
+        },
+        summary='Search the logs of job-executions the current user is privileged to view (newest first).',
+        operation_id='job_exec_log_search',
+        parameters=[
+            OpenApiParameter(
+                name='search', type=str, required=True,
+                description='Text to search for (as phrase)',
+            ),
+            OpenApiParameter(
+                name='limit', type=int, default=LOG_SEARCH_LIMIT,
+                description=f'Maximum count of log-lines to return (limited to {LOG_SEARCH_LIMIT_MAX})',
+                required=False,
+            ),
+        ],
+    )
+    def get(self, request):
+        search = request.GET.get('search', '').strip()
+        limit = _log_tail_int(request, key='limit', default=LOG_SEARCH_LIMIT)
+        if len(search) < 2 or limit is None or limit < 1:
+            return Response(data={'msg': 'Provided search or limit are invalid'}, status=400)
+
+        job_ids = get_permitted_job_ids(get_api_user(request))
+        try:
+            matches = search_logs(query=search, job_ids=job_ids, limit=min(limit, LOG_SEARCH_LIMIT_MAX))
+
+        except LogSearchError as err:
+            return Response(data={'msg': str(err)}, status=503)
+
+        # executions might have been deleted since they were indexed
+        existing = dict(JobExecution.objects.filter(
+            id__in={match['execution'] for match in matches},
+        ).values_list('id', 'job__name'))
+
+        results = []
+        for match in matches:
+            if match['execution'] in existing:
+                match['job_name'] = existing[match['execution']]
+                results.append(match)
 
-        return Response(data=serialized, status=200)
+        return Response(data=results, status=200)
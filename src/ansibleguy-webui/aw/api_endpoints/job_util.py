@@ -1,15 +1,34 @@
 from pathlib import Path
+from time import time
+from fcntl import flock, LOCK_EX, LOCK_NB, LOCK_UN
+from datetime import datetime
+from urllib.parse import quote
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as BinasciiError
 
+from pytz import BaseTzInfo, utc
 from django.shortcuts import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import QuerySet, Window, F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 
 from aw.config.main import config
-from aw.config.hardcoded import JOB_EXECUTION_LIMIT
+from aw.config.hardcoded import JOB_EXECUTION_LIMIT, LOG_STREAM_STATUS_INTERVAL, LOG_STREAM_KEEPALIVE, \
+    LOG_STREAM_MAX_DURATION, LOG_STREAM_RETRY, LOG_STREAM_MAX_PER_USER, LOG_SENDFILE_MODES, SHORT_TIME_FORMAT
 from aw.model.job import Job, JobExecution
+from aw.api_endpoints.base import sse_event
 from aw.utils.permission import get_viewable_jobs
-from aw.utils.util import get_next_cron_execution_str, is_set
+from aw.utils.util import get_next_cron_execution_str, is_set, is_null, datetime_from_db_str, pretty_timedelta_str
+from aw.utils.log_file import read_log_chunk, FileWatcher, get_log_file, stream_log_file, LogReader, \
+    LogFileCache, LOG_COMPRESS_SUFFIX
+from aw.utils.http import parse_range_header
 from aw.base import USERS
 
+EXECUTION_RELATED = ['job', 'user', 'result', 'result__error']
+
 
 class JobReadResponse(serializers.ModelSerializer):
     class Meta:
@@ -43,75 +62,424 @@ class JobExecutionReadResponse(serializers.ModelSerializer):
     log_stderr_repo = serializers.CharField(required=False)
 
 
-def get_job_execution_serialized(execution: JobExecution) -> dict:
-    serialized = JobExecutionReadResponse(instance=execution).data
+def _add_execution_details(
+        serialized: dict, execution: JobExecution, log_files: LogFileCache, timezone: BaseTzInfo, timezone_str: str,
+):
     serialized['job'] = execution.job.id
     serialized['job_name'] = execution.job.name
     serialized['job_comment'] = execution.job.comment
     serialized['user'] = execution.user.id if execution.user is not None else None
     serialized['user_name'] = execution.user.username if execution.user is not None else 'Scheduled'
-    serialized['time_start'] = execution.time_created_str
+    serialized['time_start'] = _time_str(execution.created, timezone=timezone, timezone_str=timezone_str)
     serialized['time_fin'] = None
     serialized['failed'] = None
     serialized['error_s'] = None
     serialized['error_m'] = None
 
     for logfile in JobExecution.log_file_fields:
-        if serialized[logfile] is None or not Path(serialized[logfile]).is_file():
+        if log_files.get_log_file(serialized[logfile]) is None:
             serialized[logfile] = None
             serialized[logfile + '_url'] = None
 
-    if execution.result is not None and is_set(execution.result.time_fin):
-        serialized['time_fin'] = execution.result.time_fin_str
-        serialized['time_duration'] = execution.result.time_duration_str
-        serialized['failed'] = execution.result.failed
-        if execution.result.error is not None:
-            serialized['error_s'] = execution.result.error.short
-            serialized['error_m'] = execution.result.error.med
+    result = execution.result
+    if result is not None and is_set(result.time_fin):
+        serialized['time_fin'] = _time_str(result.time_fin, timezone=timezone, timezone_str=timezone_str)
+        serialized['time_duration'] = pretty_timedelta_str((result.time_fin - result.time_start).total_seconds())
+        serialized['failed'] = result.failed
+        if result.error is not None:
+            serialized['error_s'] = result.error.short
+            serialized['error_m'] = result.error.med
+
+
+def _time_str(dt: datetime, timezone: BaseTzInfo, timezone_str: str) -> str:
+    if is_null(dt):
+        return ''
+
+    return datetime_from_db_str(dt=dt, fmt=SHORT_TIME_FORMAT, tz=timezone) + f" {timezone_str}"
+
+
+def get_executions_serialized(executions: QuerySet) -> list[dict]:
+    # executions: not yet evaluated; the related objects are joined instead of being queried for every execution
+    #   the fields of the serializer are only built once, every log-file is only checked once
+    #   and the timezone only loaded once
+    executions = list(executions.select_related(*EXECUTION_RELATED))
+    serialized = JobExecutionReadResponse(instance=executions, many=True).data
+    log_files = LogFileCache()
+    timezone, timezone_str = config.timezone, config['timezone']
+
+    for execution, execution_serialized in zip(executions, serialized):
+        _add_execution_details(
+            serialized=execution_serialized,
+            execution=execution,
+            log_files=log_files,
+            timezone=timezone,
+            timezone_str=timezone_str,
+        )
 
     return serialized
 
 
-def get_job_executions_serialized(job: Job, execution_count: int = JOB_EXECUTION_LIMIT) -> list[dict]:
-    serialized = []
-    for execution in JobExecution.objects.filter(job=job).order_by('-updated')[:execution_count]:
-        serialized.append(get_job_execution_serialized(execution))
+def parse_updated_since(value: (str, None)) -> (datetime, None):
+    if not is_set(value):
+        return None
+
+    updated = parse_datetime(value)
+    if updated is None:
+        raise ValueError(f"Invalid datetime: '{value}'")
+
+    if is_naive(updated):
+        updated = make_aware(updated, timezone=utc)
+
+    return updated
+
+
+def encode_execution_cursor(execution: dict) -> str:
+    return urlsafe_b64encode(f"{execution['updated']}|{execution['id']}".encode('utf-8')).decode('utf-8')
+
+
+def _decode_execution_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        updated, execution_id = urlsafe_b64decode(cursor.encode('utf-8')).decode('utf-8').split('|', 1)
+        return parse_updated_since(updated), int(execution_id)
+
+    except (BinasciiError, UnicodeDecodeError) as err:
+        raise ValueError(f"Invalid cursor: '{cursor}'") from err
+
+
+def get_executions_page(
+        executions: QuerySet, cursor: (str, None) = None, updated_since: (datetime, None) = None,
+) -> QuerySet:
+    # newest first; keyset on (updated, id) so pages stay stable while new executions are added
+    #   executions that get updated while paging move to the front - they are returned by 'updated_since'
+    if updated_since is not None:
+        executions = executions.filter(updated__gt=updated_since)
+
+    if is_set(cursor):
+        updated, execution_id = _decode_execution_cursor(cursor)
+        if updated is None:
+            raise ValueError(f"Invalid cursor: '{cursor}'")
+
+        executions = executions.filter(Q(updated__lt=updated) | Q(updated=updated, id__lt=execution_id))
+
+    return executions.order_by('-updated', '-id')
+
+
+def get_job_executions_serialized(
+        job: Job, execution_count: int = JOB_EXECUTION_LIMIT, updated_since: (datetime, None) = None,
+) -> list[dict]:
+    executions = get_executions_page(JobExecution.objects.filter(job=job), updated_since=updated_since)
+    return get_executions_serialized(executions[:execution_count])
+
+
+def _get_jobs_executions_serialized(
+        jobs: list[Job], execution_count: (int, None), updated_since: (datetime, None),
+) -> dict[int, list[dict]]:
+    # latest executions of all jobs in a single query
+    executions = get_executions_page(JobExecution.objects.filter(job__in=jobs), updated_since=updated_since)
+    if execution_count is not None:
+        executions = executions.annotate(
+            job_row=Window(RowNumber(), partition_by=F('job_id'), order_by=[F('updated').desc(), F('id').desc()]),
+        ).filter(job_row__lte=execution_count)
+
+    serialized = {job.id: [] for job in jobs}
+    for execution in get_executions_serialized(executions.order_by('job_id', '-updated', '-id')):
+        serialized[execution['job']].append(execution)
 
     return serialized
 
 
 def get_viewable_jobs_serialized(
         user: USERS, executions: bool = False,
-        execution_count: int = None
+        execution_count: int = None, updated_since: (datetime, None) = None,
 ) -> list[dict]:
     serialized = []
+    timezone_str = config['timezone']
+    jobs = get_viewable_jobs(user)
+    if executions:
+        jobs_executions = _get_jobs_executions_serialized(
+            jobs=jobs, execution_count=execution_count, updated_since=updated_since,
+        )
 
-    for job in get_viewable_jobs(user):
+    for job in jobs:
         job_serialized = JobReadResponse(instance=job).data
         job_serialized['next_run'] = None
 
         try:
             if job.schedule is not None and job.enabled:
-                job_serialized['next_run'] = get_next_cron_execution_str(job.schedule) + f" {config['timezone']}"
+                job_serialized['next_run'] = get_next_cron_execution_str(job.schedule) + f" {timezone_str}"
 
         except ValueError:
             pass
 
         if executions:
-            job_serialized['executions'] = get_job_executions_serialized(job=job, execution_count=execution_count)
+            job_serialized['executions'] = jobs_executions[job.id]
 
         serialized.append(job_serialized)
 
     return serialized
 
 
-def get_log_file_content(logfile: (str, Path)) -> HttpResponse:
-    with open(logfile, 'rb') as _logfile:
-        content_b = _logfile.read()
-        if content_b == b'':
-            return HttpResponse(content_b, content_type='text/plain', status=404)
+def _log_file_sendfile(path: str) -> (HttpResponse, None):
+    # the proxy in front of us sends the file
+    mode = str(config['log_sendfile']).lower()
+    if mode not in LOG_SENDFILE_MODES:
+        return None
+
+    response = HttpResponse(content_type='text/plain', status=200)
+    if mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+        return response
+
+    try:
+        path_rel = Path(path).relative_to(config['path_log'])
+
+    except ValueError:
+        # written to a previously configured log-directory
+        return None
+
+    response['X-Accel-Redirect'] = f"{config['log_sendfile_prefix'].rstrip('/')}/{quote(str(path_rel))}"
+    return response
+
+
+def get_log_file_content(logfile: str, request) -> HttpResponse:
+    path = get_log_file(logfile)
+    if path is None:
+        raise FileNotFoundError(logfile)
+
+    compressed = path.endswith(LOG_COMPRESS_SUFFIX)
+    range_header = request.META.get('HTTP_RANGE', None)
+    response = None
+
+    if not compressed:
+        # proxies only pass a few headers of ours; compressed logs would lose their content-encoding
+        response = _log_file_sendfile(path)
+
+    if response is None and compressed and range_header is None and \
+            request.META.get('HTTP_ACCEPT_ENCODING', '').find('gzip') != -1:
+        # decompressed by the client
+        response = FileResponse(open(path, 'rb'), content_type='text/plain', status=200)  # pylint: disable=R1732
+        response['Content-Encoding'] = 'gzip'
+
+    if response is None:
+        with LogReader(logfile) as _logfile:
+            size = _logfile.size
+
+        if size == 0:
+            return HttpResponse(b'', content_type='text/plain', status=404)
+
+        try:
+            content_range = parse_range_header(header=range_header, size=size)
+
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if content_range is None and not compressed:
+            # uses the sendfile-wrapper of the webserver if available
+            response = FileResponse(open(path, 'rb'), content_type='text/plain', status=200)  # pylint: disable=R1732
+
+        elif content_range is None:
+            response = StreamingHttpResponse(stream_log_file(logfile), content_type='text/plain', status=200)
+            response['Content-Length'] = size
+
+        else:
+            start, end = content_range
+            response = StreamingHttpResponse(
+                stream_log_file(logfile, offset=start, length=end - start + 1),
+                content_type='text/plain',
+                status=206,
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
 
-        response = HttpResponse(content_b, content_type='text/plain', status=200)
+        # offsets are positions in the uncompressed content
+        response['Accept-Ranges'] = 'bytes'
 
     response['Content-Disposition'] = f"inline; filename={logfile.rsplit('/', 1)[1]}"
     return response
+
+
+class LogStream:
+    # the stream-slot of the user is released once the response is closed (p.e. the client disconnected)
+    def __init__(self, content, slot):
+        self.content = content
+        self.slot = slot
+
+    def __iter__(self):
+        return self.content
+
+    def close(self):
+        self.content.close()
+        flock(self.slot, LOCK_UN)
+        self.slot.close()
+
+
+def acquire_stream_slot(user: USERS):
+    # streams block a web-worker thread; the slots are lock-files so they are shared by all web-workers
+    #   and get released if a worker dies
+    path_slots = Path(config['path_run']) / 'streams'
+    path_slots.mkdir(mode=0o750, parents=True, exist_ok=True)
+    for nr in range(LOG_STREAM_MAX_PER_USER):
+        slot = open(path_slots / f'{user.id}_{nr}.lock', 'w', encoding='utf-8')  # pylint: disable=R1732
+        try:
+            flock(slot, LOCK_EX | LOCK_NB)
+            return slot
+
+        except BlockingIOError:
+            slot.close()
+
+    return None
+
+
+def _read_stream(stream: dict):
+    if stream['watcher'].path is None:
+        return
+
+    final = JobExecution.status_name_from_id(stream['status']) in JobExecution.status_done
+    try:
+        while True:
+            chunk = read_log_chunk(stream['watcher'].path, offset=stream['offset'], final=final)
+            if chunk['offset'] == stream['offset']:
+                return
+
+            stream['offset'] = chunk['offset']
+            yield chunk
+
+    except FileNotFoundError:
+        pass
+
+
+def _update_streams(streams: dict, logfile_field: str):
+    # status-changes of all streamed executions in one query
+    states = {
+        state['id']: state
+        for state in JobExecution.objects.filter(id__in=streams).values('id', 'status', logfile_field)
+    }
+    for execution_id, stream in list(streams.items()):
+        state = states.get(execution_id, None)
+        if state is None:
+            # got deleted
+            stream['watcher'].close()
+            streams.pop(execution_id)
+            continue
+
+        if state['status'] != stream['status']:
+            stream['status'] = state['status']
+            yield 'status', execution_id, {'status': JobExecution.status_name_from_id(state['status'])}
+
+        if state[logfile_field] != stream['watcher'].path:
+            stream['watcher'].close()
+            stream['watcher'].path = state[logfile_field]
+
+
+def _stream_executions(executions: list[JobExecution], logfile_type: str, offsets: dict):
+    # new log-content and status-changes of the executions until all of them have finished
+    #   yields tuples of (event, execution-id, data)
+    logfile_field = f'log_{logfile_type}'
+    streams = {
+        execution.id: {
+            'status': execution.status,
+            'offset': offsets.get(execution.id, 0),
+            'watcher': FileWatcher(getattr(execution, logfile_field)),
+        } for execution in executions
+    }
+    time_start = time()
+    time_sent = time_start
+    time_status = time_start
+
+    for execution in executions:
+        yield 'status', execution.id, {'status': execution.status_name}
+
+    try:
+        while True:
+            for execution_id, stream in list(streams.items()):
+                # the log-file is read once more after the execution has finished
+                done = JobExecution.status_name_from_id(stream['status']) in JobExecution.status_done
+
+                for chunk in _read_stream(stream):
+                    time_sent = time()
+                    yield 'log', execution_id, chunk
+
+                if done:
+                    stream['watcher'].close()
+                    streams.pop(execution_id)
+                    yield 'end', execution_id, {'status': JobExecution.status_name_from_id(stream['status'])}
+
+            if len(streams) == 0 or time() - time_start > LOG_STREAM_MAX_DURATION:
+                return
+
+            if time() - time_sent > LOG_STREAM_KEEPALIVE:
+                yield 'keep-alive', None, None
+                time_sent = time()
+
+            FileWatcher.wait_any(
+                watchers=[stream['watcher'] for stream in streams.values()],
+                timeout=LOG_STREAM_STATUS_INTERVAL,
+            )
+
+            if time() - time_status >= LOG_STREAM_STATUS_INTERVAL:
+                time_status = time()
+                yield from _update_streams(streams=streams, logfile_field=logfile_field)
+                if len(streams) == 0:
+                    return
+
+    finally:
+        for stream in streams.values():
+            stream['watcher'].close()
+
+
+def stream_execution_log(execution: JobExecution, logfile_type: str, offset: int):
+    # server-sent events; new log-content and status-changes until the execution has finished
+    yield f'retry: {LOG_STREAM_RETRY}\n\n'
+
+    for event, _, data in _stream_executions(
+            executions=[execution], logfile_type=logfile_type, offsets={execution.id: offset},
+    ):
+        if event == 'keep-alive':
+            yield ': keep-alive\n\n'
+
+        else:
+            yield sse_event(event=event, data=data, event_id=data['offset'] if event == 'log' else None)
+
+
+def encode_stream_offsets(offsets: dict) -> str:
+    return ','.join(f'{execution_id}:{offset}' for execution_id, offset in offsets.items())
+
+
+def parse_stream_offsets(value: str) -> dict:
+    # execution-ids with optional byte-offsets: '<id>[:<offset>],...'
+    offsets = {}
+    for entry in value.split(','):
+        execution_id, _, offset = entry.strip().partition(':')
+        if offset == '':
+            offset = '0'
+
+        if not execution_id.isdigit() or not offset.isdigit():
+            raise ValueError(f"Invalid execution: '{entry}'")
+
+        offsets[int(execution_id)] = int(offset)
+
+    return offsets
+
+
+def stream_execution_logs(executions: list[JobExecution], logfile_type: str, offsets: dict):
+    # server-sent events of multiple executions over one connection
+    #   the id of the events holds the offsets of the executions that are still streamed; re-connects resume with it
+    offsets = {execution.id: offsets.get(execution.id, 0) for execution in executions}
+    yield f'retry: {LOG_STREAM_RETRY}\n\n'
+
+    for event, execution_id, data in _stream_executions(
+            executions=executions, logfile_type=logfile_type, offsets=offsets,
+    ):
+        if event == 'keep-alive':
+            yield ': keep-alive\n\n'
+            continue
+
+        if event == 'log':
+            offsets[execution_id] = data['offset']
+
+        elif event == 'end':
+            offsets.pop(execution_id)
+
+        yield sse_event(event=event, data={'execution': execution_id, **data}, event_id=encode_stream_offsets(offsets))
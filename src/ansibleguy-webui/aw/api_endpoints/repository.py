@@ -16,7 +16,8 @@ from aw.model.job import Job
 from aw.utils.util import unset_or_null, is_set
 from aw.model.permission import CHOICE_PERMISSION_READ, CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE, \
     CHOICE_PERMISSION_EXECUTE
-from aw.execute.repository import api_update_repository
+from aw.execute.repository import api_update_repository, claim_repository_update
+from aw.execute.control import send_control
 from aw.api_endpoints.job_util import get_log_file_content
 
 
@@ -241,7 +242,8 @@ class APIRepositoryItem(GenericAPIView):
     @extend_schema(
         request=None,
         responses={
-            200: OpenApiResponse(response=GenericResponse, description='Repository update initiated'),
+            200: OpenApiResponse(response=GenericResponse, description='Repository update initiated or in progress'),
+            400: OpenApiResponse(response=GenericResponse, description='Repository is not updated on its own'),
             403: OpenApiResponse(response=GenericResponse, description='Not privileged to update the repository'),
             404: OpenApiResponse(response=GenericResponse, description='Repository does not exist'),
         },
@@ -264,11 +266,21 @@ class APIRepositoryItem(GenericAPIView):
                         status=403,
                     )
 
-                repository_update_thread = Thread(
-                    target=api_update_repository,
-                    kwargs={'repository': repository, 'user': user}
-                )
-                repository_update_thread.start()
+                if repository.rtype_name == 'Static' or repository.git_isolate:
+                    return Response(
+                        data={'msg': f"Repository '{repository.name}' is not updated on its own"},
+                        status=400,
+                    )
+
+                if not claim_repository_update(repository):
+                    return Response(data={'msg': f"Repository '{repository.name}' update in progress"}, status=200)
+
+                # the update runs in the scheduler process; fallback if it is not reachable
+                if not send_control('repo_update', repository=repository.id, user=user.id):
+                    Thread(
+                        target=api_update_repository,
+                        kwargs={'repository': repository, 'user': user}
+                    ).start()
 
                 return Response(data={'msg': f"Repository '{repository.name}' update initiated"}, status=200)
 
@@ -324,7 +336,7 @@ class APIRepositoryLogFile(GenericAPIView):
                 if logfile is None:
                     return Response(data={'msg': f"No logs found for repository '{repository.name}'"}, status=404)
 
-                return get_log_file_content(logfile)
+                return get_log_file_content(logfile, request=request)
 
         except (ObjectDoesNotExist, FileNotFoundError):
             pass
@@ -7,6 +7,11 @@ class AwConfig(AppConfig):
     name = 'aw'
     verbose_name = 'Ansible-WebUI'
 
+    def ready(self):
+        # pylint: disable=C0415,W0611
+        # registers the signal-handlers that invalidate cached permissions
+        import aw.utils.permission_cache
+
 
 # configuring sqlite at application startup/connection initialization
 @receiver(connection_created)
@@ -37,7 +37,28 @@ def _get_defaults_docker(var: str) -> any:
 CONFIG_DEFAULTS = {
     'port': 8000,
     'address': '127.0.0.1',
+    'web_threads': 10,  # per worker-process
     'run_timeout': 3600,
+    'run_concurrency': 10,
+    'run_concurrency_job': 0,  # unlimited
+    'run_concurrency_repository': 0,  # unlimited
+    'run_isolate_process': False,
+    'run_process_recycle': 50,  # runs
+    'run_limit_memory': 0,  # MB; unlimited
+    'run_limit_files': 0,  # unlimited
+    'repo_fresh_window': 0,  # sec; always update
+    'repo_check_remote': False,
+    'repo_checkout_cache_size': 1024,  # MB
+    'repo_prefetch_lead': 0,  # sec; disabled
+    'repo_prefetch_concurrency': 2,
+    'galaxy_requirements': True,
+    'log_compress': True,
+    'log_retention_days': 0,  # keep
+    'log_retention_size': 0,  # MB; unlimited
+    'log_retention_keep': 0,  # executions per job; all
+    'log_search': True,
+    'log_sendfile': None,  # x-accel-redirect or x-sendfile
+    'log_sendfile_prefix': '/_aw_logs/',
     'path_run': '/tmp/ansible-webui',
     'path_play': getcwd(),
     'path_log': f"{environ['HOME']}/.local/share/ansible-webui",
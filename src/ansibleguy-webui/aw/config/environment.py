@@ -7,6 +7,7 @@ from aw.config.hardcoded import ENV_KEY_CONFIG, ENV_KEY_SAML
 AW_ENV_VARS = {
     'port': ['AW_PORT'],
     'address': ['AW_LISTEN', 'AW_LISTEN_ADDRESS'],
+    'web_threads': ['AW_WEB_THREADS'],
     'timezone': ['AW_TIMEZONE'],
     'secret': ['AW_SECRET'],
     'path_run': ['AW_PATH_RUN'],
@@ -19,6 +20,26 @@ AW_ENV_VARS = {
     'db': ['AW_DB'],
     'db_migrate': ['AW_DB_MIGRATE'],
     'run_timeout': ['AW_RUN_TIMEOUT'],
+    'run_concurrency': ['AW_RUN_CONCURRENCY'],
+    'run_concurrency_job': ['AW_RUN_CONCURRENCY_JOB'],
+    'run_concurrency_repository': ['AW_RUN_CONCURRENCY_REPOSITORY'],
+    'run_isolate_process': ['AW_RUN_ISOLATE_PROCESS'],
+    'run_process_recycle': ['AW_RUN_PROCESS_RECYCLE'],
+    'run_limit_memory': ['AW_RUN_LIMIT_MEMORY'],
+    'run_limit_files': ['AW_RUN_LIMIT_FILES'],
+    'repo_fresh_window': ['AW_REPO_FRESH_WINDOW'],
+    'repo_check_remote': ['AW_REPO_CHECK_REMOTE'],
+    'repo_checkout_cache_size': ['AW_REPO_CHECKOUT_CACHE_SIZE'],
+    'repo_prefetch_lead': ['AW_REPO_PREFETCH_LEAD'],
+    'repo_prefetch_concurrency': ['AW_REPO_PREFETCH_CONCURRENCY'],
+    'galaxy_requirements': ['AW_GALAXY_REQUIREMENTS'],
+    'log_compress': ['AW_LOG_COMPRESS'],
+    'log_retention_days': ['AW_LOG_RETENTION_DAYS'],
+    'log_retention_size': ['AW_LOG_RETENTION_SIZE'],
+    'log_retention_keep': ['AW_LOG_RETENTION_KEEP'],
+    'log_search': ['AW_LOG_SEARCH'],
+    'log_sendfile': ['AW_LOG_SENDFILE'],
+    'log_sendfile_prefix': ['AW_LOG_SENDFILE_PREFIX'],
     'path_ansible_config': ['ANSIBLE_CONFIG'],
     'path_log': ['AW_PATH_LOG'],
     'session_timeout': ['AW_SESSION_TIMEOUT'],
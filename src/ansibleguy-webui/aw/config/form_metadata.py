@@ -13,6 +13,7 @@ FORM_LABEL = {
             'credentials_needed': 'Needs Credentials',
             'credentials_default': 'Default Job Credentials',
             'form': 'Execution Form',
+            'overlap': 'Overlap Policy',
         },
         'credentials': {
             'connect_user': 'Connect User',
@@ -32,6 +33,9 @@ FORM_LABEL = {
             'git_credentials': 'Git Credentials',
             'git_limit_depth': 'Git Limit Depth',
             'git_lfs': 'Git LFS',
+            'git_partial': 'Git Partial Clone',
+            'git_sparse': 'Git Sparse Checkout',
+            'git_sparse_paths': 'Git Sparse Checkout Paths',
             'git_playbook_base': 'Git Playbook Base-Directory',
             'git_isolate': 'Git Isolate Directory',
             'git_hook_pre': 'Git Pre-Hook',
@@ -133,6 +137,9 @@ FORM_HELP = {
             'credentials_default': 'Specify job-level default credentials to use',
             'enabled': 'En- or disable the schedule. Can be ignored if no schedule was set',
             'form': 'Select a Job-Execution form to display on ad-hoc executions',
+            'overlap': 'What to do if the job is triggered while it is already running or waiting. '
+                       "'Queue one' runs it once more afterwards - "
+                       'no matter how often it was triggered in the meantime',
         },
         'credentials': {
             'vault_file': 'Path to the file containing your vault-password',
@@ -151,6 +158,12 @@ FORM_HELP = {
                                "'Connect User', 'Connect Password' and 'SSH Private Key' are used",
             'git_playbook_base': 'Relative path to the Playbook base-directory relative from the repository root',
             'git_lfs': 'En- or disable checkout of Git-LFS files',
+            'git_partial': 'En- or disable partial clone. File-contents are only downloaded if they are checked out '
+                           '(<a href="https://git-scm.com/docs/partial-clone">Git Docs</a>)',
+            'git_sparse': 'En- or disable sparse checkout. Only the Playbook base-directory, the sparse-paths and the '
+                          'files in the repository root are checked out',
+            'git_sparse_paths': 'Additional directories to check out if sparse checkout is enabled. '
+                                'Comma-separated list of paths relative from the repository root',
             'git_isolate': 'En- or disable if one clone of the Git-repository should be used for all jobs. '
                            'If enabled - the repository will be cloned/fetched on every job execution. '
                            'This will have a negative impact on performance',
@@ -1,8 +1,9 @@
 # todo: some of these settings could be moved to the system-config later on
 
 THREAD_JOIN_TIMEOUT = 3
-INTERVAL_RELOAD = 10  # start/stop threads for configured jobs
-INTERVAL_CHECK = 5  # check for queued jobs
+INTERVAL_RELOAD = 10  # sync schedules of changed jobs (fallback if the control-channel wake-up got lost)
+RELOAD_OVERLAP = 2  # sec; re-check jobs updated shortly before the last sync
+INTERVAL_CHECK = 5  # check for queued jobs (fallback if the control-channel wake-up got lost)
 LOGIN_PATH = '/a/login/'
 LOGOUT_PATH = '/o/'
 LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S %z'
@@ -11,6 +12,11 @@ FILE_TIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 KEY_TIME_FORMAT = '%Y-%m-%d-%H-%M-%S'
 MIN_SECRET_LEN = 30
 JOB_EXECUTION_LIMIT = 20
+JOB_QUEUE_PRIORITY_MAX = 10
+RUN_EVENT_FLUSH_INTERVAL = 2  # sec; save live host/task results of a running job
+RUN_EVENT_FLUSH_SIZE = 500  # events
+RUN_CANCEL_CHECK = 0.5  # sec
+INTERVAL_CANCEL_FALLBACK = 30  # check for stop-requests in the database (if the control-channel message got lost)
 GRP_MANAGER = {
     'job': 'AW Job Managers',
     'permission': 'AW Permission Managers',
@@ -20,6 +26,32 @@ GRP_MANAGER = {
     'system': 'AW System Managers',
 }
 REPO_CLONE_TIMEOUT = 300
+REPO_LOCK_TIMEOUT = 900  # sec; wait for the update of a shared repository by another execution
+REPO_LOCK_CHECK = 0.2  # sec
+GALAXY_INSTALL_TIMEOUT = 600
+LOG_TAIL_CHUNK_MAX = 1024 * 1024  # bytes returned per log-tail request
+LOG_TAIL_CHUNK_MIN = 4  # bytes; longest utf-8 character
+LOG_INDEX_STRIDE = 1000  # lines between indexed offsets of a log-file
+LOG_INDEX_CACHE_SIZE = 64  # log-files
+LOG_WATCH_POLL = 0.5  # sec; stat-polling if inotify is not available
+LOG_STREAM_STATUS_INTERVAL = 2  # sec; check for status-changes of a streamed job-execution
+LOG_STREAM_KEEPALIVE = 5  # sec; also detects disconnected clients so their stream-slot is released
+LOG_STREAM_MAX_DURATION = 600  # sec; clients re-connect and resume at the last offset
+LOG_STREAM_RETRY = 3000  # ms
+# concurrent streams per user; browsers only open 6 connections per host (HTTP/1.1)
+LOG_STREAM_MAX_PER_USER = 3
+LOG_STREAM_MAX_EXECUTIONS = 20  # executions per multiplexed stream
+LOG_COMPRESS_BLOCK = 1024 * 1024  # bytes; compressed logs can be read starting at every block
+LOG_COMPRESS_LEVEL = 6
+LOG_MAINTENANCE_INTERVAL = 3600  # sec; compression of missed logs and retention
+LOG_RETENTION_BATCH = 500  # executions which log-fields are cleared per query
+LOG_SENDFILE_MODES = ['x-accel-redirect', 'x-sendfile']
+LOG_SEARCH_LINE_MAX = 2000  # chars of a log-line that are indexed
+LOG_SEARCH_BATCH = 5000  # lines
+LOG_SEARCH_DB_TIMEOUT = 10  # sec
+LOG_SEARCH_LIMIT = 50
+LOG_SEARCH_LIMIT_MAX = 500
+PERMISSION_CACHE_SIZE = 256  # users
 ENV_KEY_CONFIG = 'AW_CONFIG'
 ENV_KEY_SAML = 'AW_SAML'
 SECRET_HIDDEN = '⬤' * 15
@@ -88,6 +88,13 @@ class Config:
 
         return str(val).lower() in ['1', 'true', 'y', 'yes']
 
+    def get_int(self, setting: str, fallback: int = 0) -> int:
+        try:
+            return int(self.get(setting))
+
+        except (TypeError, ValueError):
+            return fallback
+
 
 def init_config():
     environ.setdefault('DJANGO_SETTINGS_MODULE', 'aw.settings')
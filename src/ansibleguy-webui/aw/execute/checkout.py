@@ -0,0 +1,165 @@
+# commit-addressed checkouts of isolated git repositories; executions that use the same commit share one
+#   the settings that change the content of a checkout (hooks, lfs, depth, sparse-paths) are part of its name
+#   an index (guarded by a lock-file) keeps track of the executions using a checkout and when it was last used
+#   unused checkouts are evicted (least-recently used first) once the disk-budget is exceeded
+
+from pathlib import Path
+from os import walk, chmod, replace
+from os import stat as os_stat
+from os import lstat as os_lstat
+from stat import S_ISLNK
+from shutil import rmtree
+from time import time
+from fcntl import flock, LOCK_EX, LOCK_UN
+from contextlib import contextmanager
+from json import dumps as json_dumps
+from json import loads as json_loads
+from json import JSONDecodeError
+
+from aw.config.main import config
+from aw.config.hardcoded import REPO_CLONE_TIMEOUT
+from aw.model.job import JobExecution
+from aw.utils.subps import process
+from aw.utils.debug import log
+
+EXECUTION_ACTIVE = ['Waiting', 'Starting', 'Running', 'Stopping']
+
+
+def get_path_checkout_base() -> Path:
+    return Path(config['path_run']) / 'repositories' / '.checkout'
+
+
+def get_path_checkout(path_mirror: Path, name: str) -> Path:
+    return get_path_checkout_base() / path_mirror.stem / name
+
+
+def _key(path: Path) -> str:
+    return str(path.relative_to(get_path_checkout_base()))
+
+
+@contextmanager
+def _index():
+    path_base = get_path_checkout_base()
+    path_base.mkdir(mode=0o750, parents=True, exist_ok=True)
+    path_index = path_base / 'index.json'
+
+    with open(path_base / 'index.lock', 'w', encoding='utf-8') as lock_file:
+        flock(lock_file, LOCK_EX)
+        try:
+            index = {}
+            if path_index.is_file():
+                try:
+                    with open(path_index, 'r', encoding='utf-8') as _index_file:
+                        index = json_loads(_index_file.read())
+
+                except (JSONDecodeError, OSError) as err:
+                    log(f"Resetting invalid index of repository-checkouts: {err}", level=3)
+
+            yield index
+
+            with open(f'{path_index}.tmp', 'w', encoding='utf-8') as _index_file:
+                _index_file.write(json_dumps(index))
+
+            replace(f'{path_index}.tmp', path_index)
+
+        finally:
+            flock(lock_file, LOCK_UN)
+
+
+def _set_writable(path: Path, writable: bool):
+    for root, dirs, files in walk(path):
+        for name in dirs + files:
+            entry = Path(root) / name
+            mode = os_lstat(entry).st_mode
+            if not S_ISLNK(mode):
+                chmod(entry, mode | 0o200 if writable else mode & ~0o222)
+
+    mode = os_stat(path).st_mode
+    chmod(path, mode | 0o200 if writable else mode & ~0o222)
+
+
+def _get_size(path: Path) -> int:
+    size = 0
+    for root, _, files in walk(path):
+        for name in files:
+            size += os_lstat(Path(root) / name).st_size
+
+    return size
+
+
+def checkout_remove(path: Path, path_mirror: Path):
+    if path.exists():
+        _set_writable(path=path, writable=True)
+        rmtree(path, ignore_errors=True)
+
+    if (path_mirror / 'HEAD').is_file():
+        # worktrees that are being created are locked by git and not pruned
+        process(cmd=['git', 'worktree', 'prune'], cwd=path_mirror, timeout_sec=REPO_CLONE_TIMEOUT)
+
+
+def checkout_acquire(path: Path, execution: JobExecution) -> bool:
+    with _index() as index:
+        entry = index.get(_key(path), None)
+        if entry is None:
+            return False
+
+        if not path.is_dir():
+            index.pop(_key(path))
+            return False
+
+        entry['executions'].append(execution.id)
+        entry['used'] = time()
+        return True
+
+
+def checkout_add(path: Path, path_mirror: Path, execution: JobExecution):
+    # executions must not modify the shared checkout
+    _set_writable(path=path, writable=False)
+
+    with _index() as index:
+        index[_key(path)] = {
+            'executions': [execution.id],
+            'used': time(),
+            'size': _get_size(path),
+            'mirror': str(path_mirror),
+        }
+        _evict(index)
+
+
+def checkout_release(path: Path, execution: JobExecution):
+    with _index() as index:
+        entry = index.get(_key(path), None)
+        if entry is not None:
+            if execution.id in entry['executions']:
+                entry['executions'].remove(execution.id)
+
+            entry['used'] = time()
+
+        _evict(index)
+
+
+def _evict(index: dict):
+    budget = config.get_int('repo_checkout_cache_size') * 1024 * 1024
+    size = sum(entry['size'] for entry in index.values())
+    if size <= budget:
+        return
+
+    # references of executions that ended without releasing them
+    referenced = {execution for entry in index.values() for execution in entry['executions']}
+    active = set(JobExecution.objects.filter(
+        id__in=referenced,
+        status__in=[JobExecution.status_id_from_name(status) for status in EXECUTION_ACTIVE],
+    ).values_list('id', flat=True))
+
+    for key, entry in sorted(index.items(), key=lambda item: item[1]['used']):
+        if size <= budget:
+            break
+
+        entry['executions'] = [execution for execution in entry['executions'] if execution in active]
+        if len(entry['executions']) > 0:
+            continue
+
+        log(f"Removing unused repository-checkout '{key}' ({entry['size'] // (1024 * 1024)} MB)", level=6)
+        checkout_remove(path=get_path_checkout_base() / key, path_mirror=Path(entry['mirror']))
+        index.pop(key)
+        size -= entry['size']
@@ -0,0 +1,106 @@
+# local control-channel from the web-workers to the scheduler process
+#   the scheduler binds a unix datagram socket; web-workers send small json-messages to it
+
+import socket
+from os import environ, chmod
+from os import remove as remove_file
+from pathlib import Path
+from select import select
+from time import sleep
+from json import dumps as json_dumps
+from json import loads as json_loads
+from json import JSONDecodeError
+
+from aw.config.main import config
+from aw.utils.debug import log
+
+ENV_KEY_SOCKET = 'AW_CONTROL_SOCKET'
+MAX_MESSAGE_SIZE = 4096
+
+
+class ControlChannel:
+    def __init__(self):
+        self.path = Path(config['path_run']) / 'control.sock'
+        self.sock = None
+
+    def open(self):
+        self.path.parent.mkdir(mode=0o750, parents=True, exist_ok=True)
+        try:
+            remove_file(self.path)
+
+        except FileNotFoundError:
+            pass
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(str(self.path))
+        chmod(self.path, 0o600)
+        self.sock.setblocking(False)
+
+        # web-workers are forked later on and inherit it
+        environ[ENV_KEY_SOCKET] = str(self.path)
+        log(f"Listening for control-messages on '{self.path}'", level=6)
+
+    def close(self):
+        if self.sock is None:
+            return
+
+        self.sock.close()
+        self.sock = None
+        try:
+            remove_file(self.path)
+
+        except FileNotFoundError:
+            pass
+
+    def receive(self, timeout: float) -> list[dict]:
+        # blocks until messages arrive or the timeout is reached
+        sock = self.sock
+        if sock is None:
+            sleep(timeout)
+            return []
+
+        try:
+            readable, _, _ = select([sock], [], [], timeout)
+
+        except (OSError, ValueError):
+            # closed while stopping
+            return []
+
+        if len(readable) == 0:
+            return []
+
+        messages = []
+        while True:
+            try:
+                data = sock.recv(MAX_MESSAGE_SIZE)
+
+            except OSError:
+                break
+
+            try:
+                message = json_loads(data.decode('utf-8'))
+                if isinstance(message, dict) and 'action' in message:
+                    messages.append(message)
+
+            except (JSONDecodeError, UnicodeDecodeError):
+                log(f"Got invalid control-message: '{data}'", level=4)
+
+        return messages
+
+
+def send_control(action: str, **data) -> bool:
+    path = environ.get(ENV_KEY_SOCKET, None)
+    if path is None:
+        return False
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            sock.sendto(json_dumps({'action': action, **data}).encode('utf-8'), path)
+
+        return True
+
+    except OSError as err:
+        # scheduler will still pick up the change on its next periodic check
+        log(f"Unable to send control-message '{action}' to scheduler: {err}", level=6)
+        return False
@@ -0,0 +1,267 @@
+# single thread that fires all scheduled jobs; keeps a min-heap of their next execution times
+
+from datetime import datetime
+from functools import lru_cache
+from heapq import heappush, heappop, heapify
+from itertools import count
+from threading import Thread, Condition, BoundedSemaphore, Lock
+from time import time
+
+from crontab import CronTab
+
+from aw.config.main import config
+from aw.config.hardcoded import THREAD_JOIN_TIMEOUT, SHORT_TIME_FORMAT
+from aw.model.job import Job
+from aw.model.repository import Repository
+from aw.execute.repository import ExecuteRepository
+from aw.execute.util import get_path_run
+from aw.utils.debug import log
+from aw.utils.handlers import AnsibleConfigError, AnsibleRepositoryError
+
+
+@lru_cache(maxsize=4096)
+def _parse_cron(schedule: str) -> CronTab:
+    # jobs with the same schedule share one parsed cron-object
+    return CronTab(schedule)
+
+
+class Schedule:
+    def __init__(self, job: Job, cron: CronTab):
+        self.job = job
+        self.cron = cron
+        self.next_run = None
+        self.version = 0
+        self.config_invalid = 0
+        self.log_name = f"'{job.name}' (Job-ID {job.id})"
+        self.prefetch = job.repository_id is not None and job.repository.rtype_name == 'Git'
+
+    @property
+    def next_run_str(self) -> str:
+        if self.next_run is None:
+            return 'None'
+
+        return datetime.fromtimestamp(self.next_run).strftime(SHORT_TIME_FORMAT)
+
+
+class CronDispatcher:
+    MAX_CONFIG_INVALID = 3
+    HEAP_COMPACT_MIN = 100
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.schedules = {}  # job-id => Schedule
+        self.heap = []  # (next-run timestamp, sequence, job-id, schedule-version, is-prefetch)
+        self.sequence = count()
+        self.state = Condition()
+        self.timezone = config.timezone
+        self.thread = None
+        self.stopping = False
+        self.prefetch_lead = config.get_int('repo_prefetch_lead')
+        self.prefetch_slots = BoundedSemaphore(max(config.get_int('repo_prefetch_concurrency', fallback=1), 1))
+        self.prefetch_active = set()  # repository-ids
+        self.prefetch_lock = Lock()
+
+    def start(self):
+        log('Starting cron-dispatcher', level=6)
+        self.thread = Thread(target=self._run, daemon=True, name='Cron-Dispatcher')
+        self.thread.start()
+
+    def stop(self) -> bool:
+        with self.state:
+            if self.stopping:
+                return False
+
+            self.stopping = True
+            self.state.notify()
+
+        if self.thread is not None:
+            self.thread.join(THREAD_JOIN_TIMEOUT)
+
+        log('Cron-dispatcher stopped', level=4)
+        return True
+
+    def update_timezone(self):
+        with self.state:
+            self.timezone = config.timezone
+
+    def _push(self, schedule: Schedule, now: float):
+        # only the cron-object parsed once per schedule-change is used to calculate the next run
+        schedule.next_run = now + schedule.cron.next(now=datetime.fromtimestamp(now, tz=self.timezone))
+        heappush(self.heap, (schedule.next_run, next(self.sequence), schedule.job.id, schedule.version, False))
+
+        # fetch the repository ahead of the execution to keep the network-time out of its critical path
+        time_prefetch = schedule.next_run - self.prefetch_lead
+        if self.prefetch_lead > 0 and schedule.prefetch and time_prefetch > now:
+            heappush(self.heap, (time_prefetch, next(self.sequence), schedule.job.id, schedule.version, True))
+
+    def _compact(self):
+        # replaced/removed schedules leave stale heap-entries behind; drop them once they pile up
+        if len(self.heap) < max(self.HEAP_COMPACT_MIN, 2 * len(self.schedules)):
+            return
+
+        self.heap = [
+            entry for entry in self.heap
+            if entry[2] in self.schedules and self.schedules[entry[2]].version == entry[3]
+        ]
+        heapify(self.heap)
+
+    def add(self, job: Job):
+        with self.state:
+            try:
+                cron = _parse_cron(job.schedule)
+
+            except ValueError:
+                log(f"Got invalid schedule '{job.schedule}' for job '{job.name}' (Job-ID {job.id})", level=4)
+                self.schedules.pop(job.id, None)
+                return
+
+            schedule = Schedule(job=job, cron=cron)
+            if job.id in self.schedules:
+                schedule.version = self.schedules[job.id].version + 1
+
+            self.schedules[job.id] = schedule
+            self._push(schedule=schedule, now=time())
+            self._compact()
+            log(f"Next execution of job {schedule.log_name} at {schedule.next_run_str}", level=7)
+            self.state.notify()
+
+    def remove(self, job: Job):
+        with self.state:
+            if self.schedules.pop(job.id, None) is not None:
+                log(f"Removed schedule of job '{job.name}' (Job-ID {job.id})", level=6)
+                self._compact()
+
+    def replace(self, job: Job):
+        log(f"Replacing schedule of job '{job.name}' (Job-ID {job.id})", level=6)
+        self.add(job)
+
+    def _pop_due(self, now: float) -> tuple[list[Schedule], list[Schedule]]:
+        due, prefetch = [], []
+        while len(self.heap) > 0 and self.heap[0][0] <= now:
+            _, _, job_id, version, is_prefetch = heappop(self.heap)
+            schedule = self.schedules.get(job_id, None)
+            if schedule is None or schedule.version != version:
+                continue
+
+            if is_prefetch:
+                prefetch.append(schedule)
+                continue
+
+            due.append(schedule)
+            self._push(schedule=schedule, now=now)
+
+        return due, prefetch
+
+    def _wait_sec(self, now: float) -> (float, None):
+        if len(self.heap) == 0:
+            return None
+
+        return max(self.heap[0][0] - now, 0)
+
+    def _run(self):
+        log('Entering cron-dispatcher runtime', level=7)
+        while True:
+            with self.state:
+                if self.stopping:
+                    return
+
+                now = time()
+                due, prefetch = self._pop_due(now)
+                if len(due) == 0 and len(prefetch) == 0:
+                    self.state.wait(self._wait_sec(now))
+                    continue
+
+            for schedule in prefetch:
+                self._prefetch(schedule)
+
+            for schedule in due:
+                self._fire(schedule)
+
+    def _prefetch(self, schedule: Schedule):
+        repository_id = schedule.job.repository_id
+        with self.prefetch_lock:
+            if repository_id in self.prefetch_active:
+                return
+
+            self.prefetch_active.add(repository_id)
+
+        Thread(
+            target=self._prefetch_repository,
+            args=(repository_id, schedule.next_run),
+            daemon=True,
+            name=f'Repository-Prefetch #{repository_id}',
+        ).start()
+
+    def _prefetch_repository(self, repository_id: int, next_run: float):
+        # pylint: disable=R1732
+        try:
+            # no use in waiting for a free slot once the execution started
+            if not self.prefetch_slots.acquire(timeout=max(next_run - time(), 0)):
+                log(f"Skipping prefetch of repository {repository_id} - too many running", level=6)
+                return
+
+            try:
+                repository = Repository.objects.get(id=repository_id)
+                ExecuteRepository(repository=repository, path_run=get_path_run()).prefetch()
+
+            except Repository.DoesNotExist:
+                pass
+
+            finally:
+                self.prefetch_slots.release()
+
+        finally:
+            with self.prefetch_lock:
+                self.prefetch_active.discard(repository_id)
+
+    def _fire(self, schedule: Schedule):
+        log(f"Starting job {schedule.log_name}", level=5)
+
+        def _finished(item):
+            self._finished(schedule=schedule, error=item.error)
+
+        self.pool.submit(job=schedule.job, callback=_finished)
+
+    def _finished(self, schedule: Schedule, error: (Exception, None)):
+        if not isinstance(error, (AnsibleConfigError, AnsibleRepositoryError, OSError)):
+            schedule.config_invalid = 0
+            return
+
+        schedule.config_invalid += 1
+        log(
+            msg=f"Got invalid config/environment for job {schedule.log_name} "
+                f"({schedule.config_invalid}/{self.MAX_CONFIG_INVALID}): \"{error}\"",
+            level=2,
+        )
+        if schedule.config_invalid < self.MAX_CONFIG_INVALID:
+            return
+
+        # it will always fail; fixing the config will re-add the schedule
+        with self.state:
+            if self.schedules.get(schedule.job.id, None) is not schedule:
+                return
+
+            self.schedules.pop(schedule.job.id)
+
+        schedule.job.enabled = False
+        schedule.job.save()
+        log(msg=f"Disabling job {schedule.log_name} because of invalid config! Please fix it", level=2)
+
+    def get(self, job_id: int) -> (Job, None):
+        with self.state:
+            schedule = self.schedules.get(job_id, None)
+            return None if schedule is None else schedule.job
+
+    def list(self) -> list[Job]:
+        with self.state:
+            return [schedule.job for schedule in self.schedules.values()]
+
+    def list_pretty(self) -> list:
+        with self.state:
+            return [
+                f'{schedule.job.name} next run at {schedule.next_run_str}'
+                for schedule in self.schedules.values()
+            ]
+
+    def __len__(self) -> int:
+        return len(self.schedules)
@@ -0,0 +1,49 @@
+from time import time
+from types import SimpleNamespace
+
+from cli_init import init_cli
+
+init_cli()
+
+# pylint: disable=C0413,W0212
+from aw.execute.dispatcher import CronDispatcher
+
+
+def _job(job_id: int, schedule: str) -> SimpleNamespace:
+    return SimpleNamespace(id=job_id, name=f'test{job_id}', enabled=True, schedule=schedule, repository_id=None)
+
+
+def test_add_schedules_next_run():
+    dispatcher = CronDispatcher(pool=None)
+    now = time()
+    dispatcher.add(_job(1, '*/5 * * * *'))
+    dispatcher.add(_job(2, 'invalid'))
+
+    assert list(dispatcher.schedules) == [1]
+    schedule = dispatcher.schedules[1]
+    assert now < schedule.next_run <= now + 5 * 60
+
+    due, _ = dispatcher._pop_due(now=schedule.next_run - 1)
+    assert len(due) == 0
+
+    # a due schedule is pushed again with its following run
+    due, _ = dispatcher._pop_due(now=schedule.next_run)
+    assert due == [schedule]
+    assert len(dispatcher.heap) == 1
+    assert dispatcher.heap[0][0] > now + 5 * 60 - 1
+
+
+def test_replace_and_remove():
+    dispatcher = CronDispatcher(pool=None)
+    dispatcher.add(_job(1, '0 0 * * *'))
+    dispatcher.replace(_job(1, '*/5 * * * *'))
+
+    schedule = dispatcher.schedules[1]
+    assert schedule.version == 1
+    # the entry of the replaced schedule is skipped
+    due, _ = dispatcher._pop_due(now=time() + 24 * 60 * 60)
+    assert due == [schedule]
+
+    dispatcher.remove(_job(1, '*/5 * * * *'))
+    assert len(dispatcher.schedules) == 0
+    assert dispatcher._pop_due(now=time() + 48 * 60 * 60) == ([], [])
@@ -0,0 +1,119 @@
+# galaxy requirements of a project are installed once per content; executions only reference the cached install
+
+from pathlib import Path
+from hashlib import sha256
+from shutil import rmtree
+from fcntl import flock, LOCK_EX, LOCK_UN
+
+from aw.config.main import config
+from aw.config.hardcoded import GALAXY_INSTALL_TIMEOUT
+from aw.model.job import JobExecution
+from aw.utils.util import write_file_0640
+from aw.utils.subps import process
+from aw.utils.handlers import AnsibleGalaxyError
+from aw.utils.debug import log
+
+REQUIREMENTS_FILES = ['requirements.yml', 'collections/requirements.yml']
+# ansible defaults; they would be dropped by setting the env-vars
+PATHS_DEFAULT = {
+    'ANSIBLE_COLLECTIONS_PATH': ['~/.ansible/collections', '/usr/share/ansible/collections'],
+    'ANSIBLE_ROLES_PATH': ['~/.ansible/roles', '/usr/share/ansible/roles', '/etc/ansible/roles'],
+}
+PATHS_CACHE = {
+    'ANSIBLE_COLLECTIONS_PATH': 'collections',
+    'ANSIBLE_ROLES_PATH': 'roles',
+}
+MARKER_INSTALLED = '.installed'
+
+
+def get_path_galaxy() -> Path:
+    return Path(config['path_run']) / 'galaxy'
+
+
+def _install(file: Path, path_cache: Path, project_dir: str, env_vars: dict, execution: JobExecution):
+    # run like the playbook so the project's ansible.cfg and the job's environment apply
+    env = {
+        **env_vars,
+        **{var: str(path_cache / sub_dir) for var, sub_dir in PATHS_CACHE.items()},
+    }
+    cmd = ['ansible-galaxy', 'install', '-r', str(file)]
+    result = process(cmd=cmd, cwd=project_dir, env=env, timeout_sec=GALAXY_INSTALL_TIMEOUT)
+    write_file_0640(file=execution.log_stdout_repo, content=f"COMMAND: {' '.join(cmd)}\n{result['stdout']}\n")
+
+    if result['rc'] != 0:
+        write_file_0640(file=execution.log_stderr_repo, content=f"{result['stderr']}\n")
+        rmtree(path_cache, ignore_errors=True)
+        raise AnsibleGalaxyError(
+            f"Failed to install galaxy requirements '{file}': '{result['stderr']}'"
+        ).with_traceback(None) from None
+
+    (path_cache / MARKER_INSTALLED).touch()
+
+
+def _get_install_hash(file: Path, project_dir: str, env_vars: dict) -> str:
+    # the install depends on the requirements, the project's ansible.cfg (galaxy servers) and the environment
+    content_hash = sha256()
+    with open(file, 'rb') as _file:
+        content_hash.update(_file.read())
+
+    ansible_cfg = Path(project_dir) / 'ansible.cfg'
+    if ansible_cfg.is_file():
+        with open(ansible_cfg, 'rb') as _file:
+            content_hash.update(_file.read())
+
+    for var in sorted(env_vars):
+        content_hash.update(f'\n{var}={env_vars[var]}'.encode('utf-8'))
+
+    return content_hash.hexdigest()
+
+
+def install_requirements(project_dir: str, env_vars: dict, execution: JobExecution) -> dict:
+    # returns the env-vars pointing to the installed requirements
+    paths = {var: [] for var in PATHS_CACHE}
+    if not config.is_true('galaxy_requirements'):
+        return {}
+
+    for file in REQUIREMENTS_FILES:
+        file = Path(project_dir) / file
+        if not file.is_file():
+            continue
+
+        path_cache = get_path_galaxy() / _get_install_hash(file=file, project_dir=project_dir, env_vars=env_vars)
+        path_cache.parent.mkdir(mode=0o750, parents=True, exist_ok=True)
+
+        with open(path_cache.with_suffix('.lock'), 'w', encoding='utf-8') as lock_file:
+            flock(lock_file, LOCK_EX)
+            try:
+                if (path_cache / MARKER_INSTALLED).is_file():
+                    log(f"Using cached galaxy requirements of '{file}'", level=7)
+
+                else:
+                    # left-over of an interrupted install
+                    rmtree(path_cache, ignore_errors=True)
+                    log(f"Installing galaxy requirements of '{file}'", level=6)
+                    _install(
+                        file=file, path_cache=path_cache, project_dir=project_dir, env_vars=env_vars,
+                        execution=execution,
+                    )
+
+            finally:
+                flock(lock_file, LOCK_UN)
+
+        for var, sub_dir in PATHS_CACHE.items():
+            paths[var].append(str(path_cache / sub_dir))
+
+    if len(paths['ANSIBLE_ROLES_PATH']) == 0:
+        return {}
+
+    return {var: ':'.join(var_paths) for var, var_paths in paths.items()}
+
+
+def merge_requirement_paths(env_vars: dict, requirement_paths: dict) -> dict:
+    for var, path in requirement_paths.items():
+        if var in env_vars:
+            env_vars[var] = f'{path}:{env_vars[var]}'
+
+        else:
+            env_vars[var] = ':'.join([path] + PATHS_DEFAULT[var])
+
+    return env_vars
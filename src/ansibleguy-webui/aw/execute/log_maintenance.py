@@ -0,0 +1,178 @@
+# lifecycle of execution-logs: finished logs are indexed for the search and compressed, old ones are removed
+#   by the retention-policy; all run in a background-thread of the scheduler
+#   the periodic sweep also catches finished logs that were missed
+
+import sqlite3
+from pathlib import Path
+from os import stat as os_stat
+from os import remove as remove_file
+from queue import Queue
+from threading import Thread
+from time import time
+from datetime import timedelta
+
+from django.utils import timezone
+from django.db.utils import DatabaseError
+
+from aw.config.main import config
+from aw.config.hardcoded import LOG_MAINTENANCE_INTERVAL, LOG_RETENTION_BATCH
+from aw.model.job import JobExecution
+from aw.utils.log_file import compress_log_file, get_log_files
+from aw.utils.log_search import index_execution_logs, remove_execution_index, get_indexed_executions, \
+    is_search_available
+from aw.utils.debug import log
+
+TASK_MAINTAIN = 'maintain'
+
+
+def finish_execution_logs(execution: dict):
+    if config.is_true('log_search') and is_search_available():
+        # before compressing; plain logs are read faster
+        index_execution_logs(execution)
+
+    compress_execution_logs(execution)
+
+
+def compress_execution_logs(execution: dict):
+    if not config.is_true('log_compress'):
+        return
+
+    for field in JobExecution.log_file_fields:
+        path = execution[field]
+        if path is not None and Path(path).is_file():
+            compress_log_file(path)
+
+
+def remove_execution_logs(execution: dict):
+    for field in JobExecution.log_file_fields:
+        for file in get_log_files(execution[field]):
+            try:
+                remove_file(file)
+
+            except FileNotFoundError:
+                pass
+
+
+def _clear_execution_logs(execution_ids: list[int]):
+    # the UI/API must not offer the removed logs anymore
+    now = timezone.now()
+    for idx in range(0, len(execution_ids), LOG_RETENTION_BATCH):
+        JobExecution.objects.filter(id__in=execution_ids[idx:idx + LOG_RETENTION_BATCH]).update(
+            updated=now,
+            **{field: None for field in JobExecution.log_file_fields},
+        )
+
+
+def _get_logs_size(execution: dict) -> int:
+    size = 0
+    for field in JobExecution.log_file_fields:
+        for file in get_log_files(execution[field]):
+            try:
+                size += os_stat(file).st_size
+
+            except FileNotFoundError:
+                pass
+
+    return size
+
+
+def maintain_logs():
+    retention_days = config.get_int('log_retention_days')
+    retention_size = config.get_int('log_retention_size') * 1024 * 1024
+    retention_keep = config.get_int('log_retention_keep')
+    search = config.is_true('log_search') and is_search_available()
+    if retention_days == 0 and retention_size == 0 and retention_keep == 0 and \
+            not config.is_true('log_compress') and not search:
+        return
+
+    indexed = get_indexed_executions() if search else set()
+
+    cutoff = None
+    if retention_days > 0:
+        cutoff = timezone.now() - timedelta(days=retention_days)
+
+    executions = JobExecution.objects.filter(
+        status__in=[JobExecution.status_id_from_name(status) for status in JobExecution.status_done],
+    ).order_by('-created').values('id', 'job_id', 'created', *JobExecution.log_file_fields)
+
+    # newest first; everything after the size-budget is exceeded gets removed
+    kept_per_job = {}
+    size_total = 0
+    size_exceeded = False
+    removed = []
+    existing = set()
+    for execution in executions.iterator():
+        existing.add(execution['id'])
+        size = _get_logs_size(execution)
+        if size == 0:
+            continue
+
+        kept_per_job[execution['job_id']] = kept_per_job.get(execution['job_id'], 0) + 1
+        if 0 < retention_size < size_total + size:
+            size_exceeded = True
+
+        if size_exceeded or (cutoff is not None and execution['created'] < cutoff) or \
+                0 < retention_keep < kept_per_job[execution['job_id']]:
+            remove_execution_logs(execution)
+            removed.append(execution['id'])
+            continue
+
+        size_total += size
+        if search and execution['id'] not in indexed:
+            index_execution_logs(execution)
+
+        compress_execution_logs(execution)
+
+    if len(removed) > 0:
+        _clear_execution_logs(removed)
+        log(f"Removed logs of {len(removed)} job-executions because of the retention-policy", level=5)
+
+    # removed logs and deleted executions
+    deleted = indexed - existing
+    if len(deleted) > 0:
+        deleted -= set(JobExecution.objects.filter(id__in=deleted).values_list('id', flat=True))
+
+    if search and (len(removed) > 0 or len(deleted) > 0):
+        remove_execution_index(set(removed) | deleted)
+
+
+class LogMaintainer:
+    def __init__(self):
+        self.tasks = Queue()
+        self.thread = None
+        self.time_maintain = 0
+
+    def start(self):
+        self.thread = Thread(target=self._run, daemon=True, name='Log-Maintenance')
+        self.thread.start()
+
+    def stop(self):
+        self.tasks.put(None)
+
+    def finished(self, execution_id: int):
+        self.tasks.put(execution_id)
+
+    def check(self):
+        if time() > (self.time_maintain + LOG_MAINTENANCE_INTERVAL):
+            self.time_maintain = time()
+            self.tasks.put(TASK_MAINTAIN)
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+
+            try:
+                if task == TASK_MAINTAIN:
+                    maintain_logs()
+
+                else:
+                    execution = JobExecution.objects.filter(id=task).values(
+                        'id', 'job_id', *JobExecution.log_file_fields,
+                    ).first()
+                    if execution is not None:
+                        finish_execution_logs(execution)
+
+            except (OSError, DatabaseError, sqlite3.Error) as err:
+                log(f"Got error while maintaining execution-logs: {err}", level=3)
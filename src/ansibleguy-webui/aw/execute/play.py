@@ -1,12 +1,17 @@
 import traceback
+from threading import Event
+from typing import Callable
 
 from ansible_runner import RunnerConfig, Runner
+from django.db import transaction
 
 from aw.config.main import config
+from aw.config.hardcoded import RUN_CANCEL_CHECK, INTERVAL_CANCEL_FALLBACK
 from aw.model.job import Job, JobExecution, JobExecutionResult
 from aw.execute.play_util import runner_cleanup, runner_prep, parse_run_result, failure, runner_logs
-from aw.execute.util import get_path_run, is_execution_status, job_logs
+from aw.execute.util import get_path_run, is_execution_status, job_logs, update_status
 from aw.execute.repository import ExecuteRepository
+from aw.execute.play_events import RunEventCollector
 from aw.utils.util import datetime_w_tz, is_null, timed_lru_cache  # get_ansible_versions
 from aw.utils.handlers import AnsibleConfigError
 from aw.utils.debug import log
@@ -16,33 +21,50 @@ class AwRunnerConfig(RunnerConfig):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.quiet = True
-        self.runner_mode = 'subprocess'
+        # pexpect-mode streams output & events while the playbook is running
+        self.runner_mode = 'pexpect'
         self.timeout = config['run_timeout']
 
+    def prepare(self):
+        super().prepare()
+        # how often the cancel-callback is checked if the playbook produces no output
+        self.pexpect_timeout = RUN_CANCEL_CHECK  # pylint: disable=W0201
 
-def ansible_playbook(job: Job, execution: (JobExecution, None)):
-    time_start = datetime_w_tz()
+
+def _cancel_callback(execution: JobExecution, cancel: (Event, None), events: RunEventCollector) -> Callable:
+    # stop-requests are pushed to the scheduler; the database is only checked as fallback
+    @timed_lru_cache(seconds=INTERVAL_CANCEL_FALLBACK)
+    def _cancel_job_db() -> bool:
+        return is_execution_status(execution, 'Stopping')
+
+    def _cancel_job() -> bool:
+        # the runner checks it at least every RUN_CANCEL_CHECK seconds
+        events.tick()
+        return (cancel is not None and cancel.is_set()) or _cancel_job_db()
+
+    return _cancel_job
+
+
+def ansible_playbook(job: Job, execution: (JobExecution, None), cancel: Event = None):
     path_run = get_path_run()
     if is_null(execution):
         execution = JobExecution(user=None, job=job, comment='Scheduled')
 
-    result = JobExecutionResult(time_start=time_start)
-    result.save()
-    execution.result = result
-    execution.save()
-
+    result = JobExecutionResult(time_start=datetime_w_tz())
     log_files = job_logs(job=job, execution=execution)
 
-    @timed_lru_cache(seconds=1)  # check actual status every N seconds; lower DB queries
-    def _cancel_job() -> bool:
-        return is_execution_status(execution, 'Stopping')
+    # bookkeeping is written once per phase (start, run, finish) to keep the database-locks short
+    with transaction.atomic():
+        result.save()
+        execution.result = result
+        update_status(execution, status='Starting', save=False)
+        execution.save()
 
     exec_repo = ExecuteRepository(repository=job.repository, execution=execution, path_run=path_run)
     try:
         exec_repo.create_or_update_repository()
         project_dir = exec_repo.get_project_dir()
         opts = runner_prep(job=job, execution=execution, path_run=path_run, project_dir=project_dir)
-        execution.save()
 
         runner_cfg = AwRunnerConfig(**opts)
         runner_logs(cfg=runner_cfg, log_files=log_files)
@@ -50,15 +72,22 @@ def ansible_playbook(job: Job, execution: (JobExecution, None)):
         command = ' '.join(runner_cfg.command)
         log(msg=f"Running job '{job.name}': '{command}'", level=5)
         execution.command = command
+        update_status(execution, status='Running', save=False)
         execution.save()
 
-        runner = Runner(config=runner_cfg, cancel_callback=_cancel_job)
+        events = RunEventCollector(result=result)
+        runner = Runner(
+            config=runner_cfg,
+            cancel_callback=_cancel_callback(execution=execution, cancel=cancel, events=events),
+            event_handler=events.handle,
+        )
         runner.run()
 
         parse_run_result(
             result=result,
             execution=execution,
             runner=runner,
+            events=events,
         )
         del runner
 
@@ -0,0 +1,185 @@
+from time import time
+
+from django.db import transaction
+
+from aw.config.hardcoded import RUN_EVENT_FLUSH_INTERVAL, RUN_EVENT_FLUSH_SIZE
+from aw.model.job import JobExecutionResult, JobExecutionResultHost, JobExecutionResultTask
+from aw.utils.debug import log
+
+# see: https://ansible.readthedocs.io/projects/runner/en/latest/intro/#runner-artifact-job-events
+
+EVENT_HOST_STATS = {
+    'runner_on_ok': 'tasks_ok',
+    'runner_on_failed': 'tasks_failed',
+    'runner_on_skipped': 'tasks_skipped',
+    'runner_on_unreachable': 'unreachable',
+    'runner_on_async_failed': 'tasks_failed',
+}
+EVENT_TASK_STATS = {
+    'runner_on_ok': 'hosts_ok',
+    'runner_on_failed': 'hosts_failed',
+    'runner_on_skipped': 'hosts_skipped',
+    'runner_on_unreachable': 'hosts_unreachable',
+    'runner_on_async_failed': 'hosts_failed',
+}
+# raw output-lines that are not bound to a task; high volume and already contained in the stdout-log
+EVENTS_SKIP_ARTIFACT = ['verbose']
+# final stats-event => result-host attribute
+STATS_HOST = {
+    'ok': 'tasks_ok',
+    'failures': 'tasks_failed',
+    'skipped': 'tasks_skipped',
+    'ignored': 'tasks_ignored',
+    'rescued': 'tasks_rescued',
+    'changed': 'tasks_changed',
+}
+
+
+class RunEventCollector:
+    # aggregates ansible-runner job-events into per-host & per-task results while the playbook is running
+    #   writes are batched so the database is not hit for every single event
+    def __init__(self, result: JobExecutionResult):
+        self.result = result
+        self.hosts = {}  # hostname => JobExecutionResultHost
+        self.tasks = {}  # task-uuid => JobExecutionResultTask
+        self.dirty = {}  # unsaved model-instances are not hashable; keyed by object-id
+        self.pending = 0
+        self.time_flush = time()
+        self.stats = None
+
+    def handle(self, event: dict) -> bool:
+        # event-handler of the ansible-runner; returning False skips writing the event to the artifact-directory
+        event_type = event.get('event', None)
+        data = event.get('event_data', {})
+        write_artifact = event_type not in EVENTS_SKIP_ARTIFACT
+
+        if event_type == 'playbook_on_task_start':
+            self._task(data)
+
+        elif event_type in EVENT_HOST_STATS:
+            self._host_event(event_type=event_type, data=data)
+
+        elif event_type == 'playbook_on_stats':
+            self.stats = data
+
+        else:
+            return write_artifact
+
+        self.pending += 1
+        if self.pending >= RUN_EVENT_FLUSH_SIZE:
+            self.flush()
+
+        else:
+            self.tick()
+
+        return write_artifact
+
+    def tick(self):
+        # also called periodically while the playbook is running; results of events that were followed by
+        #   a long-running task are saved without waiting for the next event
+        if self.pending > 0 and time() > (self.time_flush + RUN_EVENT_FLUSH_INTERVAL):
+            self.flush()
+
+    def _changed(self, obj: (JobExecutionResultHost, JobExecutionResultTask)):
+        self.dirty[id(obj)] = obj
+
+    def _task(self, data: dict) -> (JobExecutionResultTask, None):
+        task_uuid = data.get('task_uuid', None)
+        if task_uuid is None:
+            return None
+
+        if task_uuid not in self.tasks:
+            name = data.get('task', '') or data.get('task_action', '')
+            task = JobExecutionResultTask(name=name[:300], result=self.result)
+            self.tasks[task_uuid] = task
+            self._changed(task)
+
+        return self.tasks[task_uuid]
+
+    def _host(self, hostname: str) -> JobExecutionResultHost:
+        if hostname not in self.hosts:
+            host = JobExecutionResultHost(hostname=hostname[:300], result=self.result)
+            self.hosts[hostname] = host
+            self._changed(host)
+
+        return self.hosts[hostname]
+
+    def _host_event(self, event_type: str, data: dict):
+        hostname = data.get('host', None)
+        if hostname is None:
+            return
+
+        host = self._host(hostname)
+        task = self._task(data)
+        attr_host = EVENT_HOST_STATS[event_type]
+        attr_task = EVENT_TASK_STATS[event_type]
+
+        if event_type == 'runner_on_failed' and data.get('ignore_errors', False):
+            attr_host = 'tasks_ignored'
+            attr_task = 'hosts_ok'
+
+        if attr_host == 'unreachable':
+            host.unreachable = True
+
+        else:
+            setattr(host, attr_host, getattr(host, attr_host) + 1)
+
+        res = data.get('res', {})
+        if event_type == 'runner_on_ok' and isinstance(res, dict) and res.get('changed', False):
+            host.tasks_changed += 1
+            if task is not None:
+                task.hosts_changed += 1
+
+        if task is not None:
+            setattr(task, attr_task, getattr(task, attr_task) + 1)
+            self._changed(task)
+
+        self._changed(host)
+
+    def _apply_stats(self):
+        # the final stats are authoritative (rescued, ignored, ..)
+        for hostname in self.stats.get('processed', {}):
+            host = self._host(hostname)
+            host.unreachable = hostname in self.stats.get('dark', {})
+            for stat, attr in STATS_HOST.items():
+                setattr(host, attr, self.stats.get(stat, {}).get(hostname, 0))
+
+            self._changed(host)
+
+    def flush(self):
+        if len(self.dirty) > 0:
+            created = {JobExecutionResultHost: [], JobExecutionResultTask: []}
+            updated = {JobExecutionResultHost: [], JobExecutionResultTask: []}
+            for obj in self.dirty.values():
+                if obj.pk is None:
+                    created[type(obj)].append(obj)
+
+                else:
+                    updated[type(obj)].append(obj)
+
+            with transaction.atomic():
+                for model, objs in created.items():
+                    if len(objs) > 0:
+                        model.objects.bulk_create(objs)
+
+                for model, objs in updated.items():
+                    if len(objs) > 0:
+                        model.objects.bulk_update(objs, fields=model.STATS)
+
+            log(
+                msg=f"Saved results of {len(self.dirty)} hosts/tasks "
+                    f"(created: {sum(len(objs) for objs in created.values())})",
+                level=7,
+            )
+
+        self.dirty.clear()
+        self.pending = 0
+        self.time_flush = time()
+
+    def finish(self) -> bool:
+        # returns if any host failed
+        if self.stats is not None:
+            self._apply_stats()
+
+        self.flush()
+        return any(host.unreachable or host.tasks_failed > 0 for host in self.hosts.values())
@@ -0,0 +1,47 @@
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+from cli_init import init_cli
+
+init_cli()
+
+# pylint: disable=C0413
+from aw.execute import play
+from aw.utils.handlers import AnsibleGalaxyError
+
+
+class _Dummy:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def save(self):
+        pass
+
+
+def test_galaxy_error_fails_execution(monkeypatch, tmp_path):
+    # errors while preparing the run must fail the execution and clean up
+    calls = []
+
+    def _runner_prep(**kwargs):
+        raise AnsibleGalaxyError('Failed to install galaxy requirements')
+
+    monkeypatch.setattr(play, 'get_path_run', lambda: tmp_path)
+    monkeypatch.setattr(play, 'JobExecutionResult', _Dummy)
+    monkeypatch.setattr(play, 'job_logs', lambda **kwargs: {})
+    monkeypatch.setattr(play.transaction, 'atomic', nullcontext)
+    monkeypatch.setattr(play, 'update_status', lambda *args, **kwargs: None)
+    monkeypatch.setattr(play, 'ExecuteRepository', lambda **kwargs: SimpleNamespace(
+        create_or_update_repository=lambda: None,
+        get_project_dir=lambda: str(tmp_path),
+    ))
+    monkeypatch.setattr(play, 'runner_prep', _runner_prep)
+    monkeypatch.setattr(play, 'failure', lambda **kwargs: calls.append(kwargs))
+
+    try:
+        play.ansible_playbook(job=_Dummy(name='test', repository=None), execution=_Dummy(id=1))
+
+    except AnsibleGalaxyError:
+        pass
+
+    assert len(calls) == 1
+    assert calls[0]['error_s'] == 'Failed to install galaxy requirements'
@@ -6,6 +6,7 @@ from os import remove as remove_file
 from os import stat as os_stat
 
 from ansible_runner import Runner, RunnerConfig
+from django.db import transaction
 try:
     from ara.setup.callback_plugins import callback_plugins as ara_callback_plugins
 
@@ -14,7 +15,7 @@ except (ImportError, ModuleNotFoundError):
 
 from aw.config.main import config
 from aw.utils.util import is_set, datetime_w_tz, write_file_0640
-from aw.model.job import Job, JobExecution, JobExecutionResult, JobExecutionResultHost, JobError
+from aw.model.job import Job, JobExecution, JobExecutionResult, JobError
 from aw.model.job_credential import BaseJobCredentials
 from aw.execute.util import update_status, overwrite_and_delete_file, decode_job_env_vars, \
     create_dirs, is_execution_status, config_error
@@ -22,6 +23,9 @@ from aw.utils.debug import log
 from aw.execute.play_credentials import get_credentials_to_use, commandline_arguments_credentials, \
     write_pwd_file, get_pwd_file
 from aw.execute.repository import ExecuteRepository
+from aw.execute.play_events import RunEventCollector
+from aw.execute.galaxy import install_requirements, merge_requirement_paths
+from aw.execute.control import send_control
 
 # see: https://ansible.readthedocs.io/projects/runner/en/latest/intro/
 
@@ -67,7 +71,7 @@ def _commandline_arguments(job: Job, execution: JobExecution, path_run: Path) ->
     return ' '.join(cmd_arguments)
 
 
-def _environmental_variables(job: Job, execution: JobExecution) -> dict:
+def _environmental_variables(job: Job, execution: JobExecution, project_dir: str) -> dict:
     # merge global, job + execution env-vars
     env_vars = {}
     if is_set(config['ara_server']):
@@ -101,7 +105,10 @@ def _environmental_variables(job: Job, execution: JobExecution) -> dict:
             **decode_job_env_vars(env_vars_csv=execution.environment_vars, src='Execution')
         }
 
-    return env_vars
+    return merge_requirement_paths(
+        env_vars=env_vars,
+        requirement_paths=install_requirements(project_dir=project_dir, env_vars=env_vars, execution=execution),
+    )
 
 
 def _execution_or_job(job: Job, execution: JobExecution, attr: str):
@@ -133,7 +140,7 @@ def _runner_options(job: Job, execution: JobExecution, path_run: Path, project_d
         'tags': _execution_or_job(job, execution, 'tags'),
         'skip_tags': _execution_or_job(job, execution, 'tags_skip'),
         'verbosity': verbosity,
-        'envvars': _environmental_variables(job=job, execution=execution),
+        'envvars': _environmental_variables(job=job, execution=execution, project_dir=project_dir),
         'cmdline': cmdline_args if is_set(cmdline_args) else None,
     }
 
@@ -141,8 +148,6 @@ def _runner_options(job: Job, execution: JobExecution, path_run: Path, project_d
 
 
 def runner_prep(job: Job, execution: JobExecution, path_run: Path, project_dir: str) -> dict:
-    update_status(execution, status='Starting')
-
     opts = _runner_options(job=job, execution=execution, path_run=path_run, project_dir=project_dir)
     opts['playbook'] = job.playbook_file
     if is_set(job.inventory_file):
@@ -166,27 +171,22 @@ def runner_prep(job: Job, execution: JobExecution, path_run: Path, project_dir:
     for secret_attr in BaseJobCredentials.SECRET_ATTRS:
         write_pwd_file(credentials, attr=secret_attr, path_run=path_run)
 
-    update_status(execution, status='Running')
     return opts
 
 
 def runner_logs(cfg: RunnerConfig, log_files: dict):
-    logs_src = {
-        'stdout': os_path.join(cfg.artifact_dir, 'stdout'),
-        'stderr': os_path.join(cfg.artifact_dir, 'stderr'),
-    }
+    log_src = os_path.join(cfg.artifact_dir, 'stdout')
 
     for log_file in log_files.values():
         write_file_0640(file=log_file, content='')
 
     # link logs from artifacts to log-directory; have not found a working way of overriding the target files..
-    for log_type in ['stdout', 'stderr']:
-        try:
-            symlink(log_files[log_type], logs_src[log_type])
+    try:
+        symlink(log_files['stdout'], log_src)
 
-        except FileExistsError:
-            remove_file(logs_src[log_type])
-            symlink(log_files[log_type], logs_src[log_type])
+    except FileExistsError:
+        remove_file(log_src)
+        symlink(log_files['stdout'], log_src)
 
 
 def runner_cleanup(execution: JobExecution, path_run: Path, exec_repo: ExecuteRepository):
@@ -211,69 +211,51 @@ def runner_cleanup(execution: JobExecution, path_run: Path, exec_repo: ExecuteRe
         except (FileNotFoundError, TypeError):
             pass
 
+    # the logs of the finished execution are indexed and compressed in the background
+    send_control('log_finished', execution=execution.id)
     rmtree(path_run, ignore_errors=True)
 
 
-def _run_stats(runner: Runner, result: JobExecutionResult) -> bool:
-    any_task_failed = False
-    for host in runner.stats['processed']:
-        result_host = JobExecutionResultHost(hostname=host)
-
-        result_host.unreachable = host in runner.stats['dark']
-        result_host.tasks_skipped = runner.stats['skipped'][host] if host in runner.stats['skipped'] else 0
-        result_host.tasks_ok = runner.stats['ok'][host] if host in runner.stats['ok'] else 0
-        result_host.tasks_failed = runner.stats['failures'][host] if host in runner.stats['failures'] else 0
-        result_host.tasks_ignored = runner.stats['ignored'][host] if host in runner.stats['ignored'] else 0
-        result_host.tasks_rescued = runner.stats['rescued'][host] if host in runner.stats['rescued'] else 0
-        result_host.tasks_changed = runner.stats['changed'][host] if host in runner.stats['changed'] else 0
-
-        if result_host.unreachable:
-            any_task_failed = True
-
-        elif result_host.tasks_failed > 0:
-            any_task_failed = True
-            # todo: create errors
-
-        result_host.result = result
-        result_host.save()
-
-    return any_task_failed
-
-
-def parse_run_result(execution: JobExecution, result: JobExecutionResult, runner: Runner):
+def parse_run_result(
+        execution: JobExecution, result: JobExecutionResult, runner: Runner, events: RunEventCollector,
+):
     result.time_fin = datetime_w_tz()
     result.failed = runner.errored
-    result.save()
 
-    any_task_failed = False
-    if runner.stats is not None:
-        any_task_failed = _run_stats(runner=runner, result=result)
+    with transaction.atomic():
+        result.save()
+        any_task_failed = events.finish()
 
-    if runner.errored or runner.timed_out or runner.rc != 0 or any_task_failed:
-        update_status(execution, status='Failed')
+        if runner.canceled:
+            # killed runs always exit with a non-zero return-code
+            update_status(execution, status='Stopped')
 
-    else:
-        status = 'Finished'
-        if is_execution_status(execution, 'Stopping') or runner.canceled:
-            status = 'Stopped'
+        elif runner.errored or runner.timed_out or runner.rc != 0 or any_task_failed:
+            update_status(execution, status='Failed')
 
-        update_status(execution, status=status)
+        else:
+            status = 'Finished'
+            if is_execution_status(execution, 'Stopping'):
+                status = 'Stopped'
+
+            update_status(execution, status=status)
 
 
 def failure(
         execution: JobExecution, exec_repo: ExecuteRepository, path_run: Path,
         result: JobExecutionResult, error_s: str, error_m: str
 ):
-    update_status(execution, status='Failed')
     job_error = JobError(
         short=error_s,
         med=error_m,
     )
-    job_error.save()
     result.time_fin = datetime_w_tz()
     result.failed = True
-    result.error = job_error
-    result.save()
 
-    execution.save()
-    runner_cleanup(execution=JobExecution ,path_run=path_run, exec_repo=exec_repo)
+    with transaction.atomic():
+        job_error.save()
+        result.error = job_error
+        result.save()
+        update_status(execution, status='Failed')
+
+    runner_cleanup(execution=execution, path_run=path_run, exec_repo=exec_repo)
@@ -0,0 +1,317 @@
+# bounded pool of execution-workers; limits how many playbooks run at once
+
+from collections import deque
+from threading import Thread, Condition, Event
+from typing import Callable
+import traceback
+
+from django.db import transaction
+from django.utils import timezone
+
+from aw.config.main import config
+from aw.utils.debug import log
+from aw.utils.util import is_null
+from aw.config.hardcoded import THREAD_JOIN_TIMEOUT
+from aw.model.job import Job, JobExecution, JobExecutionResult, JobError
+from aw.execute.play import ansible_playbook
+from aw.execute.process import ExecutionProcess
+from aw.execute.util import update_status
+from aw.utils.handlers import AnsibleConfigError, AnsibleRepositoryError
+
+EXECUTION_ORPHANED = ['Waiting', 'Starting', 'Running', 'Stopping']
+
+
+class PoolItem:
+    def __init__(self, job: Job, execution: JobExecution, callback: Callable = None, priority: int = 0):
+        self.job = job
+        self.execution = execution
+        self.callback = callback
+        self.priority = priority
+        self.done = Event()
+        self.cancel = Event()
+        self.error = None
+
+    @property
+    def job_id(self) -> int:
+        return self.job.id
+
+    @property
+    def repository_id(self) -> (int, None):
+        return self.job.repository_id
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def __str__(self) -> str:
+        return f"'{self.job.name}' (Job-ID {self.job.id}; Execution-ID {self.execution.id})"
+
+
+class ExecutionPool:
+    def __init__(self):
+        self.size = max(config.get_int('run_concurrency', fallback=1), 1)
+        self.limit_job = config.get_int('run_concurrency_job')
+        self.limit_repository = config.get_int('run_concurrency_repository')
+        self.isolate_process = config.is_true('run_isolate_process')
+        self.backlog = deque()
+        self.running = []
+        self.workers = []
+        self.processes = []
+        self.state = Condition()
+        self.stopping = False
+
+    @staticmethod
+    def _fail_orphaned():
+        # executions that were active when the previous scheduler exited are not backed by any worker
+        #   they would never finish and keep their repository-checkouts in use
+        orphaned = list(JobExecution.objects.filter(
+            status__in=[JobExecution.status_id_from_name(status) for status in EXECUTION_ORPHANED],
+        ).only('id', 'created', 'result_id'))
+        if len(orphaned) == 0:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            error = JobError(
+                short='Aborted: scheduler restarted',
+                med='The execution was still active when the scheduler stopped and was not finished',
+            )
+            error.save()
+            JobExecutionResult.objects.filter(
+                id__in=[execution.result_id for execution in orphaned if execution.result_id is not None],
+            ).update(time_fin=now, failed=True, error=error)
+
+            # waiting executions were never started
+            unstarted = [execution for execution in orphaned if execution.result_id is None]
+            results = JobExecutionResult.objects.bulk_create([
+                JobExecutionResult(time_start=execution.created, time_fin=now, failed=True, error=error)
+                for execution in unstarted
+            ])
+            for execution, result in zip(unstarted, results):
+                execution.result = result
+
+            JobExecution.objects.bulk_update(unstarted, fields=['result'])
+            JobExecution.objects.filter(id__in=[execution.id for execution in orphaned]).update(
+                status=JobExecution.status_id_from_name('Failed'),
+                updated=now,
+            )
+
+        log(f"Marked {len(orphaned)} orphaned executions of a previous run as failed", level=4)
+
+    def start(self):
+        self._fail_orphaned()
+        log(
+            f"Starting execution-pool with {self.size} workers (per-job limit: {self.limit_job or 'none'}; "
+            f"per-repository limit: {self.limit_repository or 'none'})",
+            level=5,
+        )
+        for nr in range(1, self.size + 1):
+            process = None
+            if self.isolate_process:
+                # every worker-thread hands its executions to its own pre-started process
+                process = ExecutionProcess(nr)
+                process.start()
+                self.processes.append(process)
+
+            worker = Thread(target=self._worker, args=(process,), daemon=True, name=f"Execution-Worker #{nr}")
+            self.workers.append(worker)
+            worker.start()
+
+    def stop(self):
+        with self.state:
+            if self.stopping:
+                return
+
+            self.stopping = True
+            dropped = list(self.backlog)
+            self.backlog.clear()
+            self.state.notify_all()
+
+        with transaction.atomic():
+            for item in dropped:
+                update_status(item.execution, status='Stopped')
+
+        for item in dropped:
+            item.done.set()
+
+        if len(dropped) > 0:
+            log(f"Dropped {len(dropped)} waiting executions from the backlog", level=3)
+
+        for worker in self.workers:
+            worker.join(THREAD_JOIN_TIMEOUT)
+
+        for process in self.processes:
+            process.stop()
+
+        log('Execution-pool stopped', level=4)
+
+    def _enqueue(self, item: PoolItem):
+        # higher priority first; FIFO inside the same priority
+        if item.priority == 0 or len(self.backlog) == 0 or self.backlog[-1].priority >= item.priority:
+            self.backlog.append(item)
+            return
+
+        for idx, queued in enumerate(self.backlog):
+            if queued.priority < item.priority:
+                self.backlog.insert(idx, item)
+                return
+
+    def _overlap(self, job: Job) -> tuple[(str, None), list[PoolItem]]:
+        # enforce the overlap-policy of the job; returns why the new execution is skipped and which got replaced
+        running = [item for item in self.running if item.job_id == job.id]
+        waiting = [item for item in self.backlog if item.job_id == job.id]
+        policy = job.overlap_name
+
+        if policy == 'Skip if running' and len(running) + len(waiting) > 0:
+            log(f"Skipping execution of job '{job.name}' (Job-ID {job.id}) as it is already running", level=4)
+            return 'job is already running', []
+
+        if policy == 'Queue one' and len(waiting) > 0:
+            # coalesce triggers; one follow-up execution is already waiting
+            log(f"Execution of job '{job.name}' (Job-ID {job.id}) is already waiting", level=5)
+            return 'an execution of the job is already waiting', []
+
+        if policy == 'Replace running':
+            for item in running:
+                log(f"Replacing running execution {item}", level=4)
+                item.cancel.set()
+
+            for item in waiting:
+                self.backlog.remove(item)
+
+            return None, waiting
+
+        return None, []
+
+    @staticmethod
+    def _skipped(job: Job, execution: JobExecution, reason: str):
+        # skipped triggers are kept in the execution-history so users can see why nothing ran
+        now = timezone.now()
+        with transaction.atomic():
+            error = JobError(
+                short=f"Skipped: {reason}",
+                med=f"Not executed because of the overlap-policy '{job.overlap_name}' of the job",
+            )
+            error.save()
+            result = JobExecutionResult(time_start=now, time_fin=now, error=error)
+            result.save()
+            execution.result = result
+            update_status(execution, status='Stopped')
+
+    def submit(
+            self, job: Job, execution: JobExecution = None, callback: Callable = None, priority: int = 0,
+    ) -> (PoolItem, None):
+        if is_null(execution):
+            execution = JobExecution(user=None, job=job, comment='Scheduled')
+
+        with self.state:
+            if self.stopping:
+                return None
+
+            skip, replaced = self._overlap(job)
+            if skip is None:
+                # persist as 'Waiting' so the backlog is visible to the UI/API
+                execution.save()
+                item = PoolItem(job=job, execution=execution, callback=callback, priority=priority)
+                self._enqueue(item)
+                log(f"Execution {item} added to backlog (waiting: {len(self.backlog)})", level=6)
+                self.state.notify()
+
+        if skip is not None:
+            self._skipped(job=job, execution=execution, reason=skip)
+            return None
+
+        for old in replaced:
+            update_status(old.execution, status='Stopped')
+            old.done.set()
+
+        return item
+
+    def cancel(self, execution_id: int) -> bool:
+        with self.state:
+            for item in self.running:
+                if item.execution.id == execution_id:
+                    log(f"Stopping execution {item}", level=5)
+                    item.cancel.set()
+                    return True
+
+        return False
+
+    def _count_running(self, attr: str, value: int) -> int:
+        return len([item for item in self.running if getattr(item, attr) == value])
+
+    def _limit_reached(self, attr: str, value: (int, None), limit: int) -> bool:
+        if limit <= 0 or value is None:
+            return False
+
+        return self._count_running(attr, value) >= limit
+
+    def _runnable(self, item: PoolItem) -> bool:
+        # only the 'Allow' overlap-policy lets executions of the same job run in parallel
+        limit_job = self.limit_job if item.job.overlap_name == 'Allow' else 1
+        return not self._limit_reached('job_id', item.job_id, limit_job) and \
+            not self._limit_reached('repository_id', item.repository_id, self.limit_repository)
+
+    def _next_item(self) -> (PoolItem, None):
+        # first runnable item in backlog order; items that hit a limit keep their position
+        for item in self.backlog:
+            if self._runnable(item):
+                self.backlog.remove(item)
+                self.running.append(item)
+                return item
+
+        return None
+
+    def _worker(self, process: (ExecutionProcess, None)):
+        while True:
+            with self.state:
+                item = self._next_item()
+                while item is None:
+                    if self.stopping:
+                        return
+
+                    self.state.wait()
+                    item = self._next_item()
+
+            self._run(item=item, process=process)
+
+            with self.state:
+                self.running.remove(item)
+                self.state.notify_all()
+
+    @staticmethod
+    def _run(item: PoolItem, process: (ExecutionProcess, None)):
+        # pylint: disable=W0718
+        log(f"Starting execution {item}", level=5)
+        try:
+            if process is None:
+                ansible_playbook(job=item.job, execution=item.execution, cancel=item.cancel)
+
+            else:
+                process.run(job=item.job, execution=item.execution, cancel=item.cancel)
+
+        except (AnsibleConfigError, AnsibleRepositoryError, OSError) as err:
+            item.error = err
+            log(msg=f"Got invalid config/environment for execution {item}: \"{err}\"", level=3)
+
+        except Exception as err:
+            item.error = err
+            log(
+                msg=f"Got unexpected error while running execution {item}: \"{err}\"\n"
+                    f"{traceback.format_exc(limit=256)}",
+                level=2,
+            )
+
+        finally:
+            item.done.set()
+
+        if item.callback is not None:
+            item.callback(item)
+
+    def status(self) -> dict:
+        with self.state:
+            return {
+                'running': [str(item) for item in self.running],
+                'waiting': [str(item) for item in self.backlog],
+            }
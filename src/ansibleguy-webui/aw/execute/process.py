@@ -0,0 +1,183 @@
+# pre-started worker-processes; keep the output- & event-processing of ansible-runner out of the scheduler process
+
+import resource
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from pickle import PicklingError
+from queue import Queue
+from threading import Thread, Event
+
+from django.db import connections
+from django.utils import timezone
+
+from aw.config.main import config
+from aw.config.hardcoded import RUN_CANCEL_CHECK, THREAD_JOIN_TIMEOUT
+from aw.model.job import Job, JobExecution
+from aw.execute.play import ansible_playbook
+from aw.execute.process_worker import process_main
+from aw.utils.debug import log
+
+ACTION_RUN = 'run'
+ACTION_CANCEL = 'cancel'
+ACTION_STOP = 'stop'
+
+
+class ExecutionProcessError(Exception):
+    pass
+
+
+def _set_limits():
+    # inherited by the ansible-processes that are started by this worker
+    limit_memory = config.get_int('run_limit_memory')
+    if limit_memory > 0:
+        limit_memory = limit_memory * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit_memory, limit_memory))
+
+    limit_files = config.get_int('run_limit_files')
+    if limit_files > 0:
+        _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard != resource.RLIM_INFINITY:
+            limit_files = min(limit_files, hard)
+
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit_files, hard))
+
+
+def _process_receiver(conn: Connection, tasks: Queue, cancel: Event):
+    while True:
+        try:
+            action, *data = conn.recv()
+
+        except (EOFError, OSError):
+            tasks.put(None)
+            return
+
+        if action == ACTION_RUN:
+            tasks.put(data)
+
+        elif action == ACTION_CANCEL:
+            cancel.set()
+
+        elif action == ACTION_STOP:
+            tasks.put(None)
+            return
+
+
+def _set_failed(execution: JobExecution):
+    # the worker-process updated the row; a full save of this stale instance would overwrite its result & logs
+    JobExecution.objects.filter(id=execution.id).update(
+        status=execution.status_id_from_name('Failed'),
+        updated=timezone.now(),
+    )
+
+
+def worker_main(conn: Connection, recycle: int):
+    # pylint: disable=W0718
+    _set_limits()
+
+    tasks = Queue()
+    cancel = Event()
+    Thread(target=_process_receiver, args=(conn, tasks, cancel), daemon=True).start()
+
+    for _ in range(recycle):
+        task = tasks.get()
+        if task is None:
+            break
+
+        job_id, execution_id = task
+        cancel.clear()
+        error = None
+        try:
+            job = Job.objects.get(id=job_id)
+            ansible_playbook(job=job, execution=JobExecution.objects.get(id=execution_id), cancel=cancel)
+
+        except Exception as err:
+            error = err
+
+        try:
+            conn.send(error)
+
+        except (PicklingError, TypeError, AttributeError):
+            conn.send(ExecutionProcessError(str(error)))
+
+    connections.close_all()
+    conn.close()
+
+
+class ExecutionProcess:
+    def __init__(self, nr: int):
+        self.name = f"Execution-Process #{nr}"
+        self.recycle = max(config.get_int('run_process_recycle', fallback=1), 1)
+        # forking the multithreaded scheduler could copy locks held by its other threads
+        self.context = get_context('forkserver')
+        self.process = None
+        self.conn = None
+        self.runs = 0
+
+    def start(self):
+        self.conn, conn_child = self.context.Pipe()
+        self.process = self.context.Process(
+            target=process_main,
+            args=(conn_child, self.recycle),
+            name=self.name,
+            daemon=True,
+        )
+        self.process.start()
+        conn_child.close()
+        self.runs = 0
+        log(f"Started {self.name} (PID {self.process.pid})", level=6)
+
+    def _ensure_running(self):
+        if self.process is not None and self.process.is_alive() and self.runs < self.recycle:
+            return
+
+        if self.process is not None:
+            log(f"Recycling {self.name} after {self.runs} runs", level=6)
+            self.stop()
+
+        self.start()
+
+    def run(self, job: Job, execution: JobExecution, cancel: Event):
+        self._ensure_running()
+        self.conn.send((ACTION_RUN, job.id, execution.id))
+        self.runs += 1
+        cancel_sent = False
+
+        while not self.conn.poll(RUN_CANCEL_CHECK):
+            if not self.process.is_alive():
+                _set_failed(execution)
+                raise ExecutionProcessError(
+                    f"{self.name} exited unexpectedly (exit-code {self.process.exitcode}) - "
+                    'it might have hit a resource-limit'
+                )
+
+            if cancel.is_set() and not cancel_sent:
+                self.conn.send((ACTION_CANCEL,))
+                cancel_sent = True
+
+        try:
+            error = self.conn.recv()
+
+        except EOFError:
+            _set_failed(execution)
+            raise ExecutionProcessError(f"{self.name} exited unexpectedly") from None
+
+        if error is not None:
+            raise error
+
+    def stop(self):
+        if self.process is None:
+            return
+
+        try:
+            self.conn.send((ACTION_STOP,))
+
+        except OSError:
+            pass
+
+        self.process.join(THREAD_JOIN_TIMEOUT)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(THREAD_JOIN_TIMEOUT)
+
+        self.conn.close()
+        self.process = None
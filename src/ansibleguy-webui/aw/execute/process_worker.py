@@ -0,0 +1,14 @@
+# entrypoint of the execution-processes
+#   they are started clean (not forked from the multithreaded scheduler) so django needs to be set up first
+
+
+def process_main(conn, recycle: int):
+    # pylint: disable=C0415
+    from django import setup as django_setup
+    from aw.config.main import init_config
+
+    init_config()
+    django_setup()
+
+    from aw.execute.process import worker_main
+    worker_main(conn=conn, recycle=recycle)
@@ -3,16 +3,17 @@ from aw.utils.debug import log
 from aw.base import USERS
 
 
-def queue_get() -> (tuple[Job, USERS], None):
-    next_queue_item = JobQueue.objects.order_by('-created').first()
+def queue_get() -> (tuple[Job, USERS, int], None):
+    # strict FIFO inside the same priority
+    next_queue_item = JobQueue.objects.select_related('job', 'user').order_by('-priority', 'created', 'id').first()
     if next_queue_item is None:
         return None
 
-    job, user = next_queue_item.job, next_queue_item.user
+    job, user, priority = next_queue_item.job, next_queue_item.user, next_queue_item.priority
     next_queue_item.delete()
-    return job, user
+    return job, user, priority
 
 
-def queue_add(job: Job, user: USERS):
-    log(msg=f"Job '{job.name}' added to execution queue", level=4)
-    JobQueue(job=job, user=user).save()
+def queue_add(job: Job, user: USERS, priority: int = 0):
+    log(msg=f"Job '{job.name}' added to execution queue (priority {priority})", level=4)
+    JobQueue(job=job, user=user, priority=priority).save()
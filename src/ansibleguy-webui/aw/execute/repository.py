@@ -1,21 +1,38 @@
 from pathlib import Path
 from shutil import rmtree
 from re import sub as regex_replace
+from hashlib import sha256
+from shlex import quote as shell_quote
+from fcntl import flock, LOCK_EX, LOCK_NB, LOCK_UN
+from contextlib import contextmanager
+from time import time, sleep
+from datetime import timedelta
+from threading import Thread, Lock
+from json import dumps as json_dumps
+from json import loads as json_loads
+from json import JSONDecodeError
 
 from django.utils import timezone
 
 from aw.config.main import config
-from aw.config.hardcoded import REPO_CLONE_TIMEOUT
+from aw.config.hardcoded import REPO_CLONE_TIMEOUT, REPO_LOCK_TIMEOUT, REPO_LOCK_CHECK
 from aw.model.job import Job, JobExecution
-from aw.utils.util import is_null, is_set, write_file_0640
+from aw.utils.util import is_null, is_set, write_file_0640, write_file_0600
 from aw.utils.subps import process
 from aw.execute.play_credentials import write_pwd_file, get_pwd_file
 from aw.execute.util import overwrite_and_delete_file, update_status, get_path_run, job_logs
+from aw.execute.checkout import get_path_checkout, checkout_acquire, checkout_add, checkout_release, \
+    checkout_remove
 from aw.model.job_credential import BaseJobCredentials
 from aw.utils.handlers import AnsibleRepositoryError
 from aw.model.repository import Repository
+from aw.utils.debug import log
 from aw.base import USERS
 
+GIT_ASKPASS_FILE = '.aw_askpass'
+REPO_UPDATE_ACTIVE = ['Waiting', 'Running']
+PREFETCH_MARKER = 'aw_prefetch.json'
+
 
 class ExecuteRepository:
     def __init__(self, repository: Repository, execution: JobExecution = None, path_run: Path = None):
@@ -23,39 +40,115 @@ class ExecuteRepository:
         self.path_run = path_run
         self.execution = execution
         self.path_repo = None
+        self.commit = None  # isolated repositories: shared checkout of this commit is used
+        self.checkout_used = False
 
     def create_repository(self, env: dict):
         if is_set(self.repository.git_override_initialize):
             self._run_repo_config_cmds(
                 cmds=self.repository.git_override_initialize,
                 env=env,
+                step='clone (override)',
             )
             return
 
-        git_clone = ['git', 'clone', '--branch', self.repository.git_branch]
-
-        if is_set(self.repository.git_limit_depth):
-            git_clone.extend(['--depth', str(self.repository.git_limit_depth)])
-
         if self.path_repo is None:
             self.path_repo = self.get_path_repo()
 
-        git_clone.extend([self._git_origin_with_credentials(), str(self.path_repo)])
+        if self.repository.git_isolate:
+            self._create_worktree(env=env)
+
+        else:
+            git_clone = ['git', 'clone', '--branch', self.repository.git_branch]
+
+            if is_set(self.repository.git_limit_depth):
+                git_clone.extend(['--depth', str(self.repository.git_limit_depth)])
+
+            if self.repository.git_partial:
+                git_clone.append('--filter=blob:none')
+
+            if self.repository.git_sparse:
+                git_clone.append('--sparse')
 
-        git_cmds = [' '.join(git_clone)]
+            git_clone.extend([self._git_origin(), str(self.path_repo)])
+            self._repo_process(cmd=' '.join(git_clone), env=env, step='clone')
+
+            if self.repository.git_sparse:
+                self._repo_process(cmd=self._git_sparse_checkout(), env=env, step='sparse-checkout')
 
         if self.repository.git_lfs:
-            git_cmds.append('git lfs fetch')
-            git_cmds.append('git lfs checkout')
+            self._repo_process(cmd='git lfs fetch', env=env, step='lfs-fetch')
+            self._repo_process(cmd='git lfs checkout', env=env, step='lfs-checkout')
+
+    def _create_worktree(self, env: dict):
+        if not self.repository.git_sparse:
+            self._repo_process(
+                cmd=f'git worktree add --detach {self.path_repo} {self.commit}', env=env,
+                cwd=get_path_mirror(self.repository), step='checkout',
+            )
+            return
+
+        self._repo_process(
+            cmd=f'git worktree add --no-checkout --detach {self.path_repo} {self.commit}', env=env,
+            cwd=get_path_mirror(self.repository), step='checkout',
+        )
+        self._repo_process(cmd=self._git_sparse_checkout(), env=env, step='sparse-checkout')
+        self._repo_process(cmd='git reset --hard', env=env, step='checkout')
+
+    def _git_sparse_checkout(self) -> str:
+        return ' '.join(['git', 'sparse-checkout', 'set'] + [
+            shell_quote(path) for path in get_sparse_paths(self.repository)
+        ])
+
+    def _update_mirror(self, env: dict) -> str:
+        # isolated repositories share one local mirror per origin; only new objects are fetched
+        path_mirror = get_path_mirror(self.repository)
+        depth = ''
+        if is_set(self.repository.git_limit_depth):
+            depth = f' --depth {self.repository.git_limit_depth}'
+
+        if self.repository.git_partial:
+            depth += ' --filter=blob:none'
+
+        origin = self._git_origin()
+        ref = get_git_ref(self.repository)
+        if not (path_mirror / 'HEAD').is_file():
+            self._repo_process(cmd=f'git clone --mirror{depth} {origin} {path_mirror}', env=env, step='clone')
+
+        elif take_prefetched(path_git=path_mirror, ref=ref) is not None:
+            self._log_file_write('Using prefetched commits')
 
-        for cmd in git_cmds:
-            self._repo_process(cmd=cmd, env=env)
+        else:
+            self._repo_process(cmd=f'git remote set-url origin {origin}', env=env, cwd=path_mirror, step='fetch')
+            self._repo_process(cmd=f'git fetch --prune{depth} origin', env=env, cwd=path_mirror, step='fetch')
+
+        return self._repo_process(
+            cmd=f"git rev-parse --verify '{ref}^{{commit}}'", env=env, cwd=path_mirror, step='resolve-commit',
+        )
+
+    def _checkout_cached(self, env: dict) -> bool:
+        # executions that use the same commit share one read-only checkout
+        if not self.repository.git_isolate or is_set(self.repository.git_override_initialize):
+            return False
+
+        self.commit = self._update_mirror(env=env)
+        self.path_repo = self.get_path_repo()
+        if checkout_acquire(path=self.path_repo, execution=self.execution):
+            self.checkout_used = True
+            self._log_file_write(f"Using existing checkout of commit {self.commit}")
+            return True
+
+        # left-over of an interrupted checkout
+        checkout_remove(path=self.path_repo, path_mirror=get_path_mirror(self.repository))
+        self.path_repo.mkdir(mode=0o750, parents=True)
+        return False
 
     def update_repository(self, env: dict):
         if is_set(self.repository.git_override_update):
             self._run_repo_config_cmds(
                 cmds=self.repository.git_override_update,
                 env=env,
+                step='update (override)',
             )
             return
 
@@ -64,22 +157,180 @@ class ExecuteRepository:
         if is_set(self.repository.git_limit_depth):
             git_pull.extend(['--depth', str(self.repository.git_limit_depth)])
 
-        git_cmds = [
-            'git reset --hard',
-            ' '.join(git_pull),
-        ]
+        git_cmds = [('reset', 'git reset --hard')]
+        if not is_set(self.repository.git_override_initialize):
+            # clones of older versions stored the credentials in the remote-url
+            git_cmds.append(('remote', f'git remote set-url origin {self._git_origin()}'))
+
+        if self.path_repo is None:
+            self.path_repo = self.get_path_repo()
+
+        if self.repository.git_sparse:
+            git_cmds.append(('sparse-checkout', self._git_sparse_checkout()))
+
+        elif (self.path_repo / '.git/info/sparse-checkout').is_file():
+            git_cmds.append(('sparse-checkout', 'git sparse-checkout disable'))
+
+        changed = True
+        commit = take_prefetched(path_git=self.path_repo / '.git', ref=get_git_ref(self.repository))
+        if commit is not None:
+            self._log_file_write(f"Using prefetched commit {commit}")
+            git_cmds.append(('merge', f'git merge {commit}'))
+
+        elif config.is_true('repo_check_remote') and self._remote_unchanged(env=env):
+            self._log_file_write('Remote is unchanged - skipping fetch')
+            changed = False
+
+        else:
+            git_cmds.append(('pull', ' '.join(git_pull)))
 
         if self.repository.git_lfs:
-            git_cmds.append('git lfs fetch')
-            git_cmds.append('git lfs checkout')
+            if changed:
+                git_cmds.append(('lfs-fetch', 'git lfs fetch'))
+
+            git_cmds.append(('lfs-checkout', 'git lfs checkout'))
 
-        for cmd in git_cmds:
-            self._repo_process(cmd=cmd, env=env)
+        for step, cmd in git_cmds:
+            self._repo_process(cmd=cmd, env=env, step=step)
 
-    def create_or_update_repository(self):
+    def create_or_update_repository(self, force: bool = False):
         if is_null(self.repository) or self.repository.rtype_name == 'Static':
             return
 
+        if self.repository.git_isolate:
+            if is_set(self.repository.git_override_initialize):
+                self._create_or_update_repository()
+
+            else:
+                with self._lock(get_path_mirror(self.repository).with_suffix('.lock')):
+                    self._create_or_update_repository()
+
+            return
+
+        # executions that share a repository must not run git in the same working-tree at the same time
+        path_repo = get_path_repo_wo_isolate(self.repository)
+        with self._lock(path_repo.parent / f'.{path_repo.name}.lock'):
+            # another execution might have updated it while we were waiting
+            self.repository.refresh_from_db(fields=['time_update', 'status'])
+            if not force and self._is_fresh():
+                return
+
+            self._create_or_update_repository()
+
+    @contextmanager
+    def _lock(self, path_lock: Path):
+        with open(path_lock, 'w', encoding='utf-8') as lock_file:
+            if not try_lock(lock_file=lock_file, timeout=REPO_LOCK_TIMEOUT):
+                self._error(msg=f"Timed out waiting for the update of repository '{self.repository.name}'")
+
+            try:
+                yield
+
+            finally:
+                flock(lock_file, LOCK_UN)
+
+    def prefetch(self):
+        # pylint: disable=W0718
+        # fetch new commits ahead of a scheduled execution; it will only have to fast-forward
+        if is_null(self.repository) or self.repository.rtype_name != 'Git' or \
+                is_set(self.repository.git_override_initialize) or is_set(self.repository.git_override_update):
+            return
+
+        try:
+            env = self._git_env()
+            depth = ''
+            if is_set(self.repository.git_limit_depth):
+                depth = f' --depth {self.repository.git_limit_depth}'
+
+            ref = get_git_ref(self.repository)
+            if self.repository.git_isolate:
+                path_git = get_path_mirror(self.repository)
+                path_lock = path_git.with_suffix('.lock')
+                cmds = [
+                    f'git remote set-url origin {self._git_origin()}',
+                    f'git fetch --prune{depth} origin',
+                    f"git rev-parse --verify '{ref}^{{commit}}'",
+                ]
+
+            else:
+                path_repo = get_path_repo_wo_isolate(self.repository)
+                path_git = path_repo / '.git'
+                path_lock = path_repo.parent / f'.{path_repo.name}.lock'
+                cmds = [f'git fetch{depth}', "git rev-parse --verify '@{u}^{commit}'"]
+
+            if not (path_git / 'HEAD').is_file():
+                # it will be cloned by the first execution
+                return
+
+            with open(path_lock, 'w', encoding='utf-8') as lock_file:
+                if not try_lock(lock_file=lock_file, timeout=0):
+                    log(f"Skipping prefetch of repository '{self.repository.name}' - it is being updated", level=6)
+                    return
+
+                try:
+                    # a marker of an earlier prefetch must not outlive a failed one
+                    (path_git / PREFETCH_MARKER).unlink(missing_ok=True)
+                    for cmd in cmds:
+                        result = process(cmd=cmd, cwd=path_git, env=env, shell=True, timeout_sec=REPO_CLONE_TIMEOUT)
+                        if result['rc'] != 0:
+                            log(f"Prefetch of repository '{self.repository.name}' failed: {result['stderr']}", level=4)
+                            return
+
+                    set_prefetched(path_git=path_git, ref=ref, commit=result['stdout'].strip())
+
+                finally:
+                    flock(lock_file, LOCK_UN)
+
+            log(f"Prefetched repository '{self.repository.name}'", level=6)
+
+        except Exception as err:
+            log(f"Prefetch of repository '{self.repository.name}' failed: {err}", level=4)
+
+        finally:
+            self._cleanup_credentials()
+            rmtree(self.path_run, ignore_errors=True)
+
+    def _is_fresh(self) -> bool:
+        window = config.get_int('repo_fresh_window')
+        if window <= 0 or self.repository.status_name != 'Finished' or is_null(self.repository.time_update) or \
+                not (get_path_repo_wo_isolate(self.repository) / '.git/HEAD').is_file():
+            return False
+
+        age = int((timezone.now() - self.repository.time_update).total_seconds())
+        if age > window:
+            return False
+
+        msg = f"Skipping update of repository '{self.repository.name}' - it was updated {age}s ago"
+        log(msg=msg, level=6)
+        if self.execution is not None:
+            write_file_0640(file=self.execution.log_stdout_repo, content=f"{msg}\n")
+
+        return True
+
+    def _remote_unchanged(self, env: dict) -> bool:
+        # cheap check if the remote branch still points to the local commit
+        if self.path_repo is None:
+            self.path_repo = self.get_path_repo()
+
+        ref = self.repository.git_branch if is_set(self.repository.git_branch) else 'HEAD'
+        local = process(
+            cmd=['git', 'rev-parse', 'HEAD'], cwd=self.path_repo, env=env, timeout_sec=REPO_CLONE_TIMEOUT,
+        )
+        remote = process(
+            cmd=['git', 'ls-remote', self._git_origin(), ref],
+            cwd=self.path_repo, env=env, timeout_sec=REPO_CLONE_TIMEOUT,
+        )
+        if local['rc'] != 0 or remote['rc'] != 0:
+            return False
+
+        for line in remote['stdout'].splitlines():
+            commit, ref_remote = line.split('\t', 1)
+            if ref_remote in [ref, f'refs/heads/{ref}', f'refs/tags/{ref}', f'refs/tags/{ref}^{{}}']:
+                return commit == local['stdout']
+
+        return False
+
+    def _create_or_update_repository(self):
         if self.execution is not None:
             self.repository.log_stderr = self.execution.log_stderr_repo
             self.repository.log_stdout = self.execution.log_stdout_repo
@@ -87,13 +338,17 @@ class ExecuteRepository:
 
         try:
             update_status(self.repository, status='Running')
-            path_repo = self.get_path_repo()
-
             env = self._git_env()
             if len(env) > 0:
                 self._log_file_write(f"USING ENVIRONMENT: {env}")
 
-            self._run_repo_config_cmds(cmds=self.repository.git_hook_pre, env=env)
+            if self._checkout_cached(env=env):
+                self.repository.update_progress = None
+                update_status(self.repository, status='Finished')
+                return
+
+            path_repo = self.get_path_repo()
+            self._run_repo_config_cmds(cmds=self.repository.git_hook_pre, env=env, step='pre-hook')
 
             if self.repository.git_isolate or not (Path(path_repo) / '.git/HEAD').is_file():
                 self.create_repository(env=env)
@@ -103,16 +358,25 @@ class ExecuteRepository:
 
             self.repository.time_update = timezone.now()
 
-            self._run_repo_config_cmds(cmds=self.repository.git_hook_post, env=env)
+            self._run_repo_config_cmds(cmds=self.repository.git_hook_post, env=env, step='post-hook')
+
+            if self.commit is not None:
+                checkout_add(path=path_repo, path_mirror=get_path_mirror(self.repository), execution=self.execution)
+                self.checkout_used = True
 
+            self.repository.update_progress = None
             update_status(self.repository, status='Finished')
 
         # pylint: disable=W0718
         except Exception as err:
+            if self.commit is not None and not self.checkout_used:
+                checkout_remove(path=self.get_path_repo(), path_mirror=get_path_mirror(self.repository))
+
             self._error(msg=f"Got unexpected error: '{err}'")
 
     def _error(self, msg: str):
         write_file_0640(file=self.repository.log_stderr, content=msg)
+        self.repository.update_progress = None
         update_status(self.repository, status='Failed')
         raise AnsibleRepositoryError(msg).with_traceback(None) from None
 
@@ -145,6 +409,20 @@ class ExecuteRepository:
         if env['GIT_SSH_COMMAND'] == 'ssh':
             env.pop('GIT_SSH_COMMAND')
 
+        if self._git_uses_password():
+            # git asks for the password of the http-origin instead of it being part of the remote-url
+            path_run_repo = self.get_path_run_repo()
+            path_run_repo.mkdir(mode=0o700, parents=True, exist_ok=True)
+            write_pwd_file(credentials=self.repository.git_credentials, attr='connect_pass', path_run=path_run_repo)
+            path_askpass = path_run_repo / GIT_ASKPASS_FILE
+            if not path_askpass.is_file():
+                path_pwd = get_pwd_file(path_run=path_run_repo, attr='connect_pass')
+                write_file_0600(file=path_askpass, content=f"#!/bin/sh\ncat {shell_quote(path_pwd)}\n")
+                path_askpass.chmod(0o700)
+
+            env['GIT_ASKPASS'] = str(path_askpass)
+            env['GIT_TERMINAL_PROMPT'] = '0'
+
         return env
 
     def get_project_dir(self) -> str:
@@ -157,18 +435,36 @@ class ExecuteRepository:
         if is_null(self.repository) or self.repository.rtype_name == 'Static':
             return
 
+        self._cleanup_credentials()
+
+        if self.repository.git_isolate:
+            if self.commit is not None:
+                checkout_release(path=self.get_path_repo(), execution=self.execution)
+
+            else:
+                rmtree(self.get_path_repo(), ignore_errors=True)
+
+    def _cleanup_credentials(self):
         path_run_repo = self.get_path_run_repo()
         for attr in BaseJobCredentials.SECRET_ATTRS:
             overwrite_and_delete_file(get_pwd_file(path_run=path_run_repo, attr=attr))
 
-        if self.repository.git_isolate:
-            rmtree(self.get_path_repo(), ignore_errors=True)
+        overwrite_and_delete_file(path_run_repo / GIT_ASKPASS_FILE)
 
     def get_path_repo(self) -> Path:
         path_repo = get_path_repo_wo_isolate(self.repository)
 
         if self.repository.git_isolate:
-            path_repo = path_repo / self.execution.id
+            if self.commit is not None:
+                name = self.commit
+                variant = get_checkout_variant(self.repository)
+                if variant is not None:
+                    # checkouts of the same commit with other hooks, lfs, depth or sparse-paths must not be shared
+                    name += f'-{variant}'
+
+                return get_path_checkout(path_mirror=get_path_mirror(self.repository), name=name)
+
+            path_repo = path_repo / str(self.execution.id)
             path_repo.mkdir(mode=0o750, parents=True, exist_ok=True)
 
         return path_repo
@@ -180,45 +476,70 @@ class ExecuteRepository:
 
         return path_repo
 
-    def _repo_process(self, cmd: str, env: dict):
+    def _repo_process(self, cmd: str, env: dict, step: str, cwd: Path = None) -> str:
         if self.path_repo is None:
             self.path_repo = self.get_path_repo()
 
-        result = process(cmd=cmd, cwd=self.path_repo, env=env, shell=True, timeout_sec=REPO_CLONE_TIMEOUT)
-        self._log_file_write(f"COMMAND: {cmd}\n{result['stdout']}")
+        if cwd is None:
+            cwd = self.path_repo
+
+        self._progress(step)
+        result = process(cmd=cmd, cwd=cwd, env=env, shell=True, timeout_sec=REPO_CLONE_TIMEOUT)
+        self._log_file_write(self._redact(f"COMMAND: {cmd}\n{result['stdout']}"))
         if result['rc'] != 0:
-            self._error(
+            self._error(self._redact(
                 f"Repository command failed: '{cmd}'\n"
                 f"Got error: '{result['stderr']}'\n"
                 f"Got output: '{result['stdout']}'"
-            )
+            ))
+
+        return result['stdout']
+
+    def _progress(self, step: str):
+        # fixed labels only; the commands might contain credentials
+        self.repository.update_progress = step
+        Repository.objects.filter(id=self.repository.id).update(
+            update_progress=self.repository.update_progress,
+            updated=timezone.now(),
+        )
 
-    def _run_repo_config_cmds(self, cmds: str, env: dict):
+    def _run_repo_config_cmds(self, cmds: str, env: dict, step: str):
         if is_set(cmds):
             for cmd in cmds.split(','):
-                self._repo_process(cmd=cmd, env=env)
+                self._repo_process(cmd=cmd, env=env, step=step)
 
-    def _git_origin_with_credentials(self) -> str:
+    def _git_origin(self) -> str:
+        # only the user is part of the origin; it is stored in the git-config of the repository
+        #   the password is passed to every command (see: '_git_env')
         origin = self.repository.git_origin
 
         if is_set(self.repository.git_credentials):
             credentials = self.repository.git_credentials
 
-            if origin.find('://') != -1 and origin.find('ssh://') == -1:
-                # not ssh
-                if origin.find('@') == -1 and \
-                    is_set(credentials.connect_user) and \
-                        is_set(credentials.connect_pass):
-                    proto, origin_host = origin.split('://')
-                    origin = f'{proto}://{credentials.connect_user}:{credentials.connect_pass}@{origin_host}'
+            if origin.find('@') == -1 and is_set(credentials.connect_user):
+                if origin.find('://') != -1:
+                    proto, origin_host = origin.split('://', 1)
+                    origin = f'{proto}://{credentials.connect_user}@{origin_host}'
 
-            else:
-                # ssh
-                if origin.find('@') == -1 and is_set(credentials.connect_user):
+                else:
+                    # ssh
                     origin = f'{credentials.connect_user}@{origin}'
 
         return origin
 
+    def _git_uses_password(self) -> bool:
+        origin = self.repository.git_origin
+        return is_set(self.repository.git_credentials) and is_set(self.repository.git_credentials.connect_pass) and \
+            origin.find('://') != -1 and origin.find('ssh://') == -1
+
+    def _redact(self, text: str) -> str:
+        # hooks and override-commands might contain credentials
+        text = regex_replace(pattern=r'(://[^/\s:@]+:)[^/\s@]+@', repl=r'\1***@', string=text)
+        if self._git_uses_password():
+            text = text.replace(self.repository.git_credentials.connect_pass, '***')
+
+        return text
+
     def _log_file_write(self, content: str):
         write_file_0640(
             file=self.repository.log_stdout,
@@ -236,6 +557,105 @@ def get_path_repo_wo_isolate(repository: Repository) -> Path:
     return path_repo
 
 
+def try_lock(lock_file, timeout: int) -> bool:
+    time_timeout = time() + timeout
+    while True:
+        try:
+            flock(lock_file, LOCK_EX | LOCK_NB)
+            return True
+
+        except BlockingIOError:
+            if time() >= time_timeout:
+                return False
+
+            sleep(REPO_LOCK_CHECK)
+
+
+def get_git_ref(repository: Repository) -> str:
+    return repository.git_branch if is_set(repository.git_branch) else 'HEAD'
+
+
+def set_prefetched(path_git: Path, ref: str, commit: str):
+    write_file_0640(
+        file=path_git / PREFETCH_MARKER,
+        content=json_dumps({'ref': ref, 'commit': commit, 'time': time()}),
+    )
+
+
+def take_prefetched(path_git: Path, ref: str) -> (str, None):
+    # commit the scheduled prefetch fetched for this ref; executions right after it do not need to fetch again
+    #   the marker is only used once - later executions fetch on their own
+    path_marker = path_git / PREFETCH_MARKER
+    if not path_marker.is_file():
+        return None
+
+    try:
+        with open(path_marker, 'r', encoding='utf-8') as _marker:
+            marker = json_loads(_marker.read())
+
+    except (JSONDecodeError, OSError):
+        marker = {}
+
+    path_marker.unlink(missing_ok=True)
+    lead = config.get_int('repo_prefetch_lead')
+    if lead <= 0 or not isinstance(marker, dict) or marker.get('ref') != ref or \
+            not is_set(marker.get('commit')) or time() - marker.get('time', 0) >= 2 * lead:
+        return None
+
+    return marker['commit']
+
+
+def get_sparse_paths(repository: Repository) -> list[str]:
+    # directories to check out; files in the repository root are always included
+    paths = []
+    if is_set(repository.git_playbook_base):
+        paths.append(repository.git_playbook_base)
+
+    if is_set(repository.git_sparse_paths):
+        paths.extend(repository.git_sparse_paths.split(','))
+
+    return [path.strip().strip('/') for path in paths if path.strip().strip('/') not in ['', '.']]
+
+
+def get_checkout_variant(repository: Repository) -> (str, None):
+    # settings that change the content of a checkout beside its commit
+    variant = []
+    if repository.git_sparse:
+        variant.append(f"sparse={','.join(get_sparse_paths(repository))}")
+
+    if is_set(repository.git_hook_pre):
+        variant.append(f'hook_pre={repository.git_hook_pre}')
+
+    if is_set(repository.git_hook_post):
+        variant.append(f'hook_post={repository.git_hook_post}')
+
+    if repository.git_lfs:
+        variant.append('lfs')
+
+    if is_set(repository.git_limit_depth):
+        variant.append(f'depth={repository.git_limit_depth}')
+
+    if len(variant) == 0:
+        return None
+
+    return sha256('\n'.join(variant).encode('utf-8')).hexdigest()[:8]
+
+
+def get_path_mirror(repository: Repository) -> Path:
+    # one bare mirror per origin and depth; shared by all isolated repositories using it
+    origin = repository.git_origin.split(' -p', 1)[0]
+    if repository.git_partial:
+        origin += ' blob:none'
+
+    if is_set(repository.git_limit_depth):
+        # shallow and full mirrors would re-shallow or deepen each other on every fetch
+        origin += f' depth:{repository.git_limit_depth}'
+
+    path_mirror = Path(config['path_run']) / 'repositories' / '.mirror'
+    path_mirror.mkdir(mode=0o750, parents=True, exist_ok=True)
+    return path_mirror / f"{sha256(origin.encode('utf-8')).hexdigest()[:20]}.git"
+
+
 def api_update_repository(repository: Repository, user: USERS):
     if is_null(repository) or repository.rtype_name == 'Static' or repository.git_isolate:
         return
@@ -250,4 +670,73 @@ def api_update_repository(repository: Repository, user: USERS):
 
     ExecuteRepository(
         repository=repository, path_run=get_path_run(),
-    ).create_or_update_repository()
+    ).create_or_update_repository(force=True)
+
+
+def claim_repository_update(repository: Repository) -> bool:
+    # at most one update per repository is in flight; requests while it runs are attached to it
+    #   claims of updates that show no progress for a long time are considered stale
+    active = [Repository.status_id_from_name(status) for status in REPO_UPDATE_ACTIVE]
+    return Repository.objects.filter(id=repository.id).exclude(
+        status__in=active,
+        updated__gte=timezone.now() - timedelta(seconds=REPO_LOCK_TIMEOUT),
+    ).update(
+        status=active[0],
+        update_progress='Queued',
+        updated=timezone.now(),
+    ) == 1
+
+
+def release_repository_update(repository_id: int, status: str):
+    # updates that did not set a final status (skipped or unexpected errors) must not keep their claim
+    active = [Repository.status_id_from_name(status) for status in REPO_UPDATE_ACTIVE]
+    Repository.objects.filter(id=repository_id, status__in=active).update(
+        status=Repository.status_id_from_name(status),
+        update_progress=None,
+        updated=timezone.now(),
+    )
+
+
+class RepositoryUpdater:
+    # runs the repository-updates requested via API in the background; one at a time per repository
+    def __init__(self):
+        self.running = {}  # repository-id => Thread
+        self.lock = Lock()
+
+    def submit(self, repository_id: int, user_id: (int, None)):
+        with self.lock:
+            thread = self.running.get(repository_id, None)
+            if thread is not None and thread.is_alive():
+                log(f"Update of repository {repository_id} is already running", level=6)
+                return
+
+            thread = Thread(
+                target=self._run,
+                args=(repository_id, user_id),
+                daemon=True,
+                name=f'Repository-Update #{repository_id}',
+            )
+            self.running[repository_id] = thread
+            thread.start()
+
+    def _run(self, repository_id: int, user_id: (int, None)):
+        status = 'Failed'
+        try:
+            user = None
+            if user_id is not None:
+                user = USERS.objects.filter(id=user_id).first()
+
+            api_update_repository(repository=Repository.objects.get(id=repository_id), user=user)
+            status = 'Finished'
+
+        except Repository.DoesNotExist:
+            pass
+
+        except AnsibleRepositoryError as err:
+            # the error is saved as repository-status and -log
+            log(f"Update of repository {repository_id} failed: {err}", level=4)
+
+        finally:
+            release_repository_update(repository_id=repository_id, status=status)
+            with self.lock:
+                self.running.pop(repository_id, None)
@@ -1,15 +1,20 @@
 from threading import Thread, ThreadError
 from time import sleep, time
+from datetime import timedelta
 from typing import Callable
 
 from django.core.validators import ValidationError
 from django.db.utils import OperationalError, IntegrityError
 
 from aw.settings import DB_FILE
-from aw.execute.threader import ThreadManager
+from aw.execute.dispatcher import CronDispatcher
+from aw.execute.pool import ExecutionPool
+from aw.execute.control import ControlChannel
+from aw.execute.repository import RepositoryUpdater
+from aw.execute.log_maintenance import LogMaintainer
 from aw.utils.debug import log
 from aw.utils.util import is_null
-from aw.config.hardcoded import INTERVAL_CHECK, INTERVAL_RELOAD
+from aw.config.hardcoded import INTERVAL_CHECK, INTERVAL_RELOAD, RELOAD_OVERLAP
 from aw.model.job import Job, JobExecution, validate_cronjob
 from aw.execute.queue import queue_get
 
@@ -18,7 +23,20 @@ class Scheduler:
     WAIT_TIME = 1
 
     def __init__(self):
-        self.thread_manager = ThreadManager()
+        self.pool = ExecutionPool()
+        self.dispatcher = CronDispatcher(pool=self.pool)
+        self.control = ControlChannel()
+        self.repository_updater = RepositoryUpdater()
+        self.log_maintainer = LogMaintainer()
+        # action => handler that gets all messages of that action received at once
+        self.control_handlers = {
+            'queue': lambda _: self.check(),
+            'reload': lambda _: self.reload(),
+            'stop': self._stop_executions,
+            'repo_update': self._update_repositories,
+            'log_finished': self._finish_logs,
+        }
+        self.last_sync = None
         self.stopping = False
         self.reloading = False
 
@@ -26,18 +44,21 @@ class Scheduler:
         if not self.stopping:
             log('Stopping scheduler..', level=3)
             self.stopping = True
-            log('Stopping job-threads..', level=6)
-            self.thread_manager.stop()
+            log('Stopping cron-dispatcher..', level=6)
+            self.dispatcher.stop()
+            log('Stopping execution-pool..', level=6)
+            self.pool.stop()
+            self.log_maintainer.stop()
+            self.control.close()
             sleep(self.WAIT_TIME)
 
-    def _add_thread(self, job: Job, execution: JobExecution = None, once: bool = False):
-        self.thread_manager.add_thread(job=job, execution=execution, once=once)
-        self.thread_manager.start_thread(job=job)
-
     def start(self):
         log('Starting..', level=3)
-        log('Starting job-threads..', level=4)
+        log('Starting execution-pool and cron-dispatcher..', level=4)
         try:
+            self.pool.start()
+            self.dispatcher.start()
+            self.log_maintainer.start()
             self.reload()
             self._run()
 
@@ -70,7 +91,8 @@ class Scheduler:
                         self.reload()
                         time_last_reload = time()
 
-                    sleep(self.WAIT_TIME)
+                    self.log_maintainer.check()
+                    self._wait_for_control()
 
                 except ThreadError as err:
                     log(msg=f'Got thread error: {err}', level=2)
@@ -80,8 +102,45 @@ class Scheduler:
             self.stop()
             return
 
+    def _wait_for_control(self):
+        # web-workers wake us up right away; the periodic check only is a fallback
+        actions = {}
+        for message in self.control.receive(timeout=self.WAIT_TIME):
+            action = message['action']
+            if action not in self.control_handlers:
+                log(f"Got unknown control-action: '{action}'", level=4)
+                continue
+
+            # multiple wake-ups for the same action are handled at once
+            actions.setdefault(action, []).append(message)
+
+        for action, messages in actions.items():
+            log(f"Got control-action: '{action}' ({len(messages)}x)", level=7)
+            self.control_handlers[action](messages)
+
+    def _update_repositories(self, messages: list[dict]):
+        for message in messages:
+            if 'repository' in message:
+                self.repository_updater.submit(repository_id=message['repository'], user_id=message.get('user', None))
+
+    def _finish_logs(self, messages: list[dict]):
+        for message in messages:
+            if 'execution' in message:
+                self.log_maintainer.finished(message['execution'])
+
+    def _stop_executions(self, messages: list[dict]):
+        for message in messages:
+            execution_id = message.get('execution', None)
+            if not self.pool.cancel(execution_id):
+                log(f"Unable to stop execution {execution_id} as it is not running", level=5)
+
     def status(self):
-        log(msg=f"Running job-threads: {self.thread_manager.list_pretty()}", level=4)
+        log(msg=f"Scheduled jobs: {self.dispatcher.list_pretty()}", level=4)
+        pool_status = self.pool.status()
+        log(
+            msg=f"Running executions: {pool_status['running']} | Waiting executions: {pool_status['waiting']}",
+            level=4,
+        )
 
     def check(self):
         log('Checking for queued jobs', level=7)
@@ -90,10 +149,15 @@ class Scheduler:
             if queue_item is None:
                 break
 
-            job, user = queue_item
+            job, user, priority = queue_item
+            username = user.username if user is not None else None
 
-            log(f"Adding job-thread for queued job: '{job.name}' (triggered by user '{user.username}')", level=4)
-            self._add_thread(job=job, execution=JobExecution(user=user, job=job, comment='Triggered'), once=True)
+            log(f"Adding queued job to execution-pool: '{job.name}' (triggered by user '{username}')", level=4)
+            self.pool.submit(
+                job=job,
+                execution=JobExecution(user=user, job=job, comment='Triggered'),
+                priority=priority,
+            )
 
     def reload(self, signum=None):
         if not self.reloading and not self.stopping:
@@ -101,9 +165,11 @@ class Scheduler:
 
             if signum is not None:
                 log('Reloading..', level=3)
+                # full re-sync on manual reload
+                self.last_sync = None
 
+            self.dispatcher.update_timezone()
             self._reload_action(**self._reload_check())
-            self.thread_manager.clean_stopped_threads()
             self.reloading = False
 
     def _reload_action(self, added: list, removed: list, changed: list):
@@ -112,35 +178,48 @@ class Scheduler:
         log('Checking jobs for config-changes', level=7)
         if len(added) > 0:
             any_changed = True
-            log(f"Adding job-threads: {[job.name for job in added]}", level=4)
+            log(f"Adding job-schedules: {[job.name for job in added]}", level=4)
             for job in added:
-                self._add_thread(job=job)
+                self.dispatcher.add(job)
 
         if len(removed) > 0:
             any_changed = True
-            log(f"Removing job-threads: {[job.name for job in removed]}", level=4)
+            log(f"Removing job-schedules: {[job.name for job in removed]}", level=4)
             for job in removed:
-                self.thread_manager.stop_thread(job)
+                self.dispatcher.remove(job)
 
         if len(changed) > 0:
             any_changed = True
-            log(f"Replacing job-threads: {[job.name for job in changed]}", level=4)
+            log(f"Replacing job-schedules: {[job.name for job in changed]}", level=4)
             for job in changed:
-                self.thread_manager.replace_thread(job)
+                self.dispatcher.replace(job)
 
         if any_changed:
-            sleep(1)  # wait for threads to initialize
             self.status()
 
+    def _reload_changed(self) -> list[Job]:
+        # only jobs that were modified since the last sync; a small overlap catches saves committed out of order
+        if self.last_sync is None:
+            jobs = list(Job.objects.select_related('repository'))
+
+        else:
+            jobs = list(Job.objects.select_related('repository').filter(
+                updated__gte=self.last_sync - timedelta(seconds=RELOAD_OVERLAP),
+            ))
+
+        for job in jobs:
+            if self.last_sync is None or job.updated > self.last_sync:
+                self.last_sync = job.updated
+
+        return jobs
+
     def _reload_check(self) -> dict:
         result = {'added': [], 'removed': [], 'changed': []}
-        running = self.thread_manager.list()
-        running_ids = [job.id for job in running]
-        configured = Job.objects.all()
-        configured_ids = [job.id for job in configured]
+        configured_ids = set(Job.objects.values_list('id', flat=True))
 
-        for job in configured:
-            if job.id not in running_ids:
+        for job in self._reload_changed():
+            run_job = self.dispatcher.get(job.id)
+            if run_job is None:
                 if is_null(job.schedule):
                     log(f"Ignoring job '{job.name}' because it has no schedule", level=6)
                     continue
@@ -157,7 +236,6 @@ class Scheduler:
                     log(f"Got invalid job schedule '{job.schedule}'", level=4)
 
             else:
-                run_job = [run_job for run_job in running if run_job.id == job.id][0]
                 for field in Job.CHANGE_FIELDS:
                     if getattr(run_job, field) != getattr(job, field):
                         if run_job.enabled and not job.enabled:
@@ -169,7 +247,7 @@ class Scheduler:
                         log(f"Job '{job.name}' config changed", level=6)
                         break
 
-        for job in running:
+        for job in self.dispatcher.list():
             if job.id not in configured_ids:
                 result['removed'].append(job)
 
@@ -179,4 +257,6 @@ class Scheduler:
 def init_scheduler(handle_signals: Callable):
     scheduler = Scheduler()
     handle_signals(scheduler)
+    # needs to be bound before the web-workers are forked
+    scheduler.control.open()
     Thread(target=scheduler.start).start()
@@ -50,9 +50,10 @@ def decode_job_env_vars(env_vars_csv: str, src: str) -> dict:
         return {}
 
 
-def update_status(obj: (JobExecution, Repository), status: str):
+def update_status(obj: (JobExecution, Repository), status: str, save: bool = True):
     obj.status = obj.status_id_from_name(status)
-    obj.save()
+    if save:
+        obj.save()
 
 
 def is_execution_status(execution: JobExecution, status: str) -> bool:
@@ -94,15 +95,15 @@ def job_logs(job: Job, execution: JobExecution) -> dict:
     timestamp = datetime_w_tz().strftime(FILE_TIME_FORMAT)
     log_file = f"{config['path_log']}/{safe_job_name}_{timestamp}_{safe_user_name}"
 
+    # the runner executes the playbook in a pty (pexpect-mode); its stderr is part of the stdout-log
     log_files = {
         'stdout': f'{log_file}_stdout.log',
-        'stderr': f'{log_file}_stderr.log',
         'stdout_repo': f'{log_file}_stdout_repo.log',
         'stderr_repo': f'{log_file}_stderr_repo.log',
     }
 
     execution.log_stdout = log_files['stdout']
-    execution.log_stderr = log_files['stderr']
+    execution.log_stderr = None
     execution.log_stdout_repo = log_files['stdout_repo']
     execution.log_stderr_repo = log_files['stderr_repo']
 
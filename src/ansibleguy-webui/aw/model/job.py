@@ -35,6 +35,14 @@ CHOICES_JOB_VERBOSITY = (
 )
 
 
+CHOICES_JOB_OVERLAP = (
+    (0, 'Allow'),
+    (1, 'Skip if running'),
+    (2, 'Queue one'),
+    (3, 'Replace running'),
+)
+
+
 class BaseJob(BaseModel):
     BAD_ANSIBLE_FLAGS = [
         'step', 'ask-vault-password', 'ask-vault-pass', 'k', 'ask-pass',
@@ -80,7 +88,7 @@ class Job(BaseJob):
     CHANGE_FIELDS = [
         'name', 'playbook_file', 'inventory_file', 'repository', 'schedule', 'enabled', 'limit', 'verbosity',
         'mode_diff', 'mode_check', 'tags', 'tags_skip', 'verbosity', 'comment', 'environment_vars', 'cmd_args',
-        'credentials_default', 'credentials_needed', 'form',
+        'credentials_default', 'credentials_needed', 'form', 'overlap',
     ]
     form_fields_primary = ['name', 'playbook_file', 'inventory_file', 'repository']
     form_fields = CHANGE_FIELDS
@@ -103,11 +111,17 @@ class Job(BaseJob):
     )
     repository = models.ForeignKey(Repository, on_delete=models.SET_NULL, related_name='job_fk_repo', **DEFAULT_NONE)
     form = models.ForeignKey(JobExecutionForm, on_delete=models.SET_NULL, related_name='job_fk_form', **DEFAULT_NONE)
+    # what to do if the job is triggered while an execution of it is running
+    overlap = models.PositiveSmallIntegerField(choices=CHOICES_JOB_OVERLAP, default=0)
 
     def __str__(self) -> str:
         limit = '' if self.limit is None else f' [{self.limit}]'
         return f"Job '{self.name}' ({self.playbook_file} => {self.inventory_file}{limit})"
 
+    @property
+    def overlap_name(self) -> str:
+        return get_choice_value_by_key(choices=CHOICES_JOB_OVERLAP, find=self.overlap)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=['name'], name='job_name_unique')
@@ -182,14 +196,38 @@ class JobExecutionResultHost(BareModel):
         return f"Job execution {self.created} of host '{self.hostname}': {result}"
 
 
+class JobExecutionResultTask(BareModel):
+    STATS = ['hosts_ok', 'hosts_changed', 'hosts_failed', 'hosts_skipped', 'hosts_unreachable']
+    # ansible_runner job_events of a task
+    name = models.CharField(max_length=300, null=False)
+    hosts_ok = models.PositiveSmallIntegerField(default=0)
+    hosts_changed = models.PositiveSmallIntegerField(default=0)
+    hosts_failed = models.PositiveSmallIntegerField(default=0)
+    hosts_skipped = models.PositiveSmallIntegerField(default=0)
+    hosts_unreachable = models.PositiveSmallIntegerField(default=0)
+
+    result = models.ForeignKey(
+        JobExecutionResult, on_delete=models.CASCADE, related_name='jobresulttask_fk_result', null=True
+    )
+
+    def __str__(self) -> str:
+        result = 'succeeded'
+
+        if int(self.hosts_failed) > 0 or int(self.hosts_unreachable) > 0:
+            result = 'failed'
+
+        return f"Job execution {self.created} of task '{self.name}': {result}"
+
+
 class JobExecution(BaseJob):
     api_fields_read = [
         'id', 'job', 'job_name', 'user', 'user_name', 'result', 'status', 'status_name', 'time_start', 'time_fin',
         'failed', 'error_s', 'error_m', 'log_stdout', 'log_stdout_url', 'log_stderr', 'log_stderr_url', 'job_comment',
         'credential_global', 'credential_user', 'command', 'log_stdout_repo', 'log_stderr_repo',
-        'log_stdout_repo_url', 'log_stderr_repo_url',
+        'log_stdout_repo_url', 'log_stderr_repo_url', 'updated',
     ]
     log_file_fields = ['log_stdout', 'log_stderr', 'log_stdout_repo', 'log_stderr_repo']
+    status_done = ['Failed', 'Finished', 'Stopped']
 
     # NOTE: scheduled execution will have no user
     user = models.ForeignKey(
@@ -257,6 +295,12 @@ class JobExecution(BaseJob):
     def log_stderr_repo_url(self) -> str:
         return f"/api/job/{self.job.id}/{self.id}/log?type=stderr_repo"
 
+    class Meta:
+        indexes = [
+            # keyset-pagination of the execution-history
+            models.Index(fields=['updated', 'id'], name='jobexec_updated_id'),
+        ]
+
 
 class JobQueue(BareModel):
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='jobqueue_fk_job')
@@ -264,3 +308,4 @@ class JobQueue(BareModel):
         USERS, on_delete=models.SET_NULL, null=True,
         related_name='jobqueue_fk_user',
     )
+    priority = models.PositiveSmallIntegerField(default=0)
@@ -15,18 +15,18 @@ CHOICES_REPOSITORY = [
 class Repository(BaseModel):
     form_fields_git = [
         'name', 'git_origin', 'git_credentials', 'git_branch', 'git_isolate', 'git_lfs', 'git_limit_depth',
-        'git_playbook_base',
+        'git_partial', 'git_sparse', 'git_sparse_paths', 'git_playbook_base',
         'git_hook_pre', 'git_hook_post', 'git_override_initialize', 'git_override_update',
     ]
     form_fields_static = ['name', 'static_path']
     form_fields = [
         'name', 'rtype', 'static_path', 'git_origin', 'git_credentials', 'git_branch', 'git_isolate', 'git_lfs',
         'git_limit_depth', 'git_hook_pre', 'git_hook_post', 'git_override_initialize', 'git_override_update',
-        'git_playbook_base',
+        'git_playbook_base', 'git_partial', 'git_sparse', 'git_sparse_paths',
     ]
     api_fields_read = form_fields.copy()
     api_fields_read.extend([
-        'id', 'rtype_name', 'time_update', 'status', 'status_name', 'log_stdout', 'log_stdout_url',
+        'id', 'rtype_name', 'time_update', 'status', 'status_name', 'update_progress', 'log_stdout', 'log_stdout_url',
         'log_stderr', 'log_stderr_url',
 
     ])
@@ -36,6 +36,7 @@ class Repository(BaseModel):
     rtype = models.PositiveSmallIntegerField(choices=CHOICES_REPOSITORY)
     time_update = models.DateTimeField(**DEFAULT_NONE)
     status = models.PositiveSmallIntegerField(default=0, choices=CHOICES_JOB_EXEC_STATUS)
+    update_progress = models.CharField(max_length=100, **DEFAULT_NONE)
     log_stdout = models.CharField(max_length=300, **DEFAULT_NONE)
     log_stderr = models.CharField(max_length=300, **DEFAULT_NONE)
 
@@ -46,6 +47,9 @@ class Repository(BaseModel):
     git_isolate = models.BooleanField(choices=CHOICES_BOOL, default=False)
     git_lfs = models.BooleanField(choices=CHOICES_BOOL, default=False)
     git_limit_depth = models.PositiveIntegerField(**DEFAULT_NONE)
+    git_partial = models.BooleanField(choices=CHOICES_BOOL, default=False)
+    git_sparse = models.BooleanField(choices=CHOICES_BOOL, default=False)
+    git_sparse_paths = models.CharField(max_length=1000, **DEFAULT_NONE)
     git_hook_pre = models.CharField(max_length=1000, **DEFAULT_NONE)
     git_hook_post = models.CharField(max_length=1000, **DEFAULT_NONE)
     git_override_initialize = models.CharField(max_length=1000, **DEFAULT_NONE)
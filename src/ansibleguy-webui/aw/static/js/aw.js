@@ -315,7 +315,8 @@ function fetchApiTableDataPlaceholder(dataTable, placeholderId) {
 
 // for example with second (hidden) child-row - see: 'job-manage'
 // for example with two tables - see: 'job-credentials'
-function fetchApiTableData(apiEndpoint, updateFunction, secondRow = false, placeholderFunction = null, targetTable = null, dataSubKey = null, reverseData = false) {
+// partialData: only changed entries are returned - rows of missing entries are kept - see: 'job-logs'
+function fetchApiTableData(apiEndpoint, updateFunction, secondRow = false, placeholderFunction = null, targetTable = null, dataSubKey = null, reverseData = false, partialData = false) {
     // NOTE: data needs to be list of dict and include an 'id' attribute
     if (targetTable == null) {
         targetTable = ELEM_ID_TABLE;
@@ -400,7 +401,7 @@ function fetchApiTableData(apiEndpoint, updateFunction, secondRow = false, place
                 if (data.length > 0) {
                     rowsToDelete.push(rowIdx);
                 }
-            } else if (!existingEntryIds.includes(String(existingRowId))) {
+            } else if (!partialData && !existingEntryIds.includes(String(existingRowId))) {
                 rowsToDelete.push(rowIdx);
             }
         }
@@ -409,7 +410,7 @@ function fetchApiTableData(apiEndpoint, updateFunction, secondRow = false, place
             dataTable.deleteRow(rowIdx);
         }
         // add placeholder row if empty
-        if (data.length == 0 && !placeholderExists) {
+        if (data.length == 0 && !placeholderExists && !partialData) {
             if (placeholderFunction == null) {
                 fetchApiTableDataPlaceholder(dataTable, placeholderId);
             } else {
@@ -33,29 +33,109 @@ function replaceLineColors(rawLines) {
     return fixedLines
 }
 
-function addLogLines($this) {
-    let logParentElement = $this.attr("aw-expand");
+// one multiplexed stream for all shown logs; browsers only open a few connections per host
+var logStream = null;
+var logStreamExecutions = {};  // execution-id => log-button
+var logStreamSync = null;
+
+function addLogContent($this, content) {
     let logElement = $this.attr("aw-log");
     let logElementEnd = document.getElementById($this.attr("aw-log-end"));
-    let job_id = $this.attr("aw-job");
-    let exec_id = $this.attr("aw-exec");
-    let hidden = document.getElementById(logParentElement).getAttribute("hidden");
-    let logLineStart = $this.attr("aw-log-line");
-    if(typeof logLineStart === "undefined") {
-        logLineStart = 0;
-    }
-    if (!hidden) {
-        $.get("/api/job/" + job_id + "/" + exec_id + "/log/" + logLineStart, function(data) {
-          if (data.lines.length > 0) {
-            document.getElementById(logElement).innerHTML += replaceLineColors(data.lines).join('');
-            $this.attr("aw-log-line", parseInt(logLineStart) + data.lines.length);
-            logElementEnd.scrollIntoView({ behavior: "smooth", block: "end", inline: "end" });
-          }
-        });
+
+    // only show complete lines; color-codes could be cut otherwise
+    content = ($this.data("aw-log-pending") || "") + content;
+    let lineEnd = content.lastIndexOf("\n") + 1;
+    $this.data("aw-log-pending", content.substring(lineEnd));
+    if (lineEnd > 0) {
+        document.getElementById(logElement).innerHTML += replaceLineColors([content.substring(0, lineEnd)]).join('');
+        logElementEnd.scrollIntoView({ behavior: "smooth", block: "end", inline: "end" });
+    }
+}
+
+function syncLogStream() {
+    // changes in short succession only re-connect once
+    clearTimeout(logStreamSync);
+    logStreamSync = setTimeout(connectLogStream, 100);
+}
+
+function connectLogStream() {
+    if (logStream != null) {
+        logStream.close();
+        logStream = null;
+    }
+    let executions = [];
+    for (let [exec_id, $button] of Object.entries(logStreamExecutions)) {
+        executions.push(exec_id + ":" + $button.attr("aw-log-offset"));
+    }
+    if (executions.length == 0) {
+        return;
+    }
+
+    // re-connects are resumed by the browser using the id (offsets of all executions) of the last event
+    let stream = new EventSource("/api/job_exec/log/stream?executions=" + executions.join(","));
+    stream.addEventListener("log", function(event) {
+        let data = JSON.parse(event.data);
+        let $button = logStreamExecutions[data.execution];
+        if ($button) {
+            addLogContent($button, data.data);
+            $button.attr("aw-log-offset", data.offset);
+        }
+    });
+    stream.addEventListener("end", function(event) {
+        let data = JSON.parse(event.data);
+        let $button = logStreamExecutions[data.execution];
+        if ($button) {
+            // last line might not be terminated
+            if ($button.data("aw-log-pending")) {
+                addLogContent($button, "\n");
+            }
+            delete logStreamExecutions[data.execution];
+        }
+        if (Object.keys(logStreamExecutions).length == 0) {
+            stream.close();
+            logStream = null;
+        }
+    });
+    stream.onerror = function() {
+        // p.e. the limit of concurrent streams was reached; the browser does not retry those
+        if (stream.readyState == EventSource.CLOSED && logStream === stream) {
+            logStream = null;
+            setTimeout(syncLogStream, 3000);
+        }
     };
+    logStream = stream;
 }
 
+function closeLogStream(exec_id) {
+    if (exec_id in logStreamExecutions) {
+        delete logStreamExecutions[exec_id];
+        syncLogStream();
+    }
+}
+
+// the stream follows the visibility of the log-panel; it was already toggled by the 'aw-btn-expand' handler
+function toggleLogStream($this) {
+    let exec_id = $this.attr("aw-exec");
+
+    if (document.getElementById($this.attr("aw-expand")).hasAttribute("hidden")) {
+        closeLogStream(exec_id);
+        return;
+    }
+    logStreamExecutions[exec_id] = $this;
+    syncLogStream();
+}
+
+// only executions that changed since are fetched on refresh
+var executionsUpdated = null;
+
 function updateApiTableDataJobLogs(row, row2, entry) {
+    // the re-render resets the log-content; a shown log is streamed again from the start
+    let logsShown = row2.hasAttribute("id") && !row2.hasAttribute("hidden");
+    closeLogStream(String(entry.id));
+
+    if (executionsUpdated == null || Date.parse(entry.updated) > Date.parse(executionsUpdated)) {
+        executionsUpdated = entry.updated;
+    }
     row.innerHTML = document.getElementById(ELEM_ID_TMPL_ROW).innerHTML;
     if (entryIsFiltered(entry.job)) {
         row.setAttribute("hidden", "hidden");
@@ -93,12 +173,15 @@ function updateApiTableDataJobLogs(row, row2, entry) {
         logsTemplates = logsTemplates.replaceAll('${LOG_STDOUT}', TITLE_NULL);
         logsTemplates = logsTemplates.replaceAll('${LOG_STDOUT_URL}', LINK_NULL);
     }
+    // newer executions have no separate error-log; it is part of the job output
     if (is_set(entry.log_stderr)) {
         logsTemplates = logsTemplates.replaceAll('${LOG_STDERR}', entry.log_stderr);
         logsTemplates = logsTemplates.replaceAll('${LOG_STDERR_URL}', entry.log_stderr_url);
+        logsTemplates = logsTemplates.replaceAll('${LOG_STDERR_HIDDEN}', '');
     } else {
         logsTemplates = logsTemplates.replaceAll('${LOG_STDERR}', TITLE_NULL);
         logsTemplates = logsTemplates.replaceAll('${LOG_STDERR_URL}', LINK_NULL);
+        logsTemplates = logsTemplates.replaceAll('${LOG_STDERR_HIDDEN}', 'hidden="hidden"');
     }
     if (is_set(entry.log_stdout_repo)) {
         logsTemplates = logsTemplates.replaceAll('${LOG_STDOUT_REPO}', entry.log_stdout_repo);
@@ -140,13 +223,27 @@ function updateApiTableDataJobLogs(row, row2, entry) {
         let logsContainerEnd = document.getElementById("aw-execution-logs-end-" + entry.id);
         logsContainerEnd.innerHTML = "<br><b>Finish time:</b> " + entry.time_fin + "<br><b>Duration:</b> " + entry.time_duration;
     }
+
+    if (logsShown) {
+        row2.removeAttribute("hidden");
+        toggleLogStream($(row).find(".aw-log-read"));
+    }
+}
+
+function refreshJobLogs() {
+    if (executionsUpdated == null) {
+        fetchApiTableData(apiEndpoint, updateApiTableDataJobLogs, true, null, null, null, true);
+    } else {
+        fetchApiTableData(
+            apiEndpoint + "&updated_since=" + encodeURIComponent(executionsUpdated),
+            updateApiTableDataJobLogs, true, null, null, null, true, true,
+        );
+    }
 }
 
 $( document ).ready(function() {
     $(".aw-main").on("click", ".aw-log-read", function(){
-        $this = jQuery(this);
-        addLogLines($this);
-        setInterval('addLogLines($this)', (DATA_REFRESH_SEC * 1000));
+        toggleLogStream(jQuery(this));
     });
     executionCount = 20;
     if (HTTP_PARAMS.has('filter')) {
@@ -154,5 +251,6 @@ $( document ).ready(function() {
     }
     apiEndpoint = "/api/job_exec?execution_count=" + executionCount;
     fetchApiTableData(apiEndpoint, updateApiTableDataJobLogs, true, null, null, null, true);
-    setInterval('fetchApiTableData(apiEndpoint, updateApiTableDataJobLogs, true, null, null, null, true)', (DATA_REFRESH_SEC * 1000));
+    setInterval('refreshJobLogs()', (DATA_REFRESH_SEC * 1000));
 });
+
@@ -21,6 +21,9 @@ function updateApiTableDataRepository(row, entry) {
         }
         row.cells[3].innerHTML += '<b>Status</b>: <span class="aw-job-status aw-job-status-' + entry.status_name.toLowerCase() + '">' +
                                    entry.status_name + '</span>';
+        if (is_set(entry.update_progress)) {
+            row.cells[3].innerHTML += ' (' + entry.update_progress + ')';
+        }
         let statusTemplate = document.getElementById("aw-api-data-tmpl-status").innerHTML;
 
         statusTemplate = statusTemplate.replaceAll('${LOG_STDOUT}', entry.log_stdout);
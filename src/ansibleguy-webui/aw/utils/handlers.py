@@ -11,6 +11,11 @@ class AnsibleRepositoryError(Exception):
     pass
 
 
+class AnsibleGalaxyError(AnsibleConfigError):
+    # executions handle it like other errors of their config
+    pass
+
+
 def handler_log(request, msg: str, status: int):
     log(f"{request.build_absolute_uri()} - Got error {status} - {msg}")
 
@@ -57,3 +57,31 @@ def ui_endpoint_wrapper_kwargs(func) -> Callable:
         return func(request, **kwargs)
 
     return wrapper
+
+
+def parse_range_header(header: (str, None), size: int) -> (tuple[int, int], None):
+    # returns the first and last byte of a single range; others are answered with the whole content (RFC 9110)
+    #   raises ValueError if the range can not be satisfied
+    if header is None or not header.startswith('bytes=') or header.find(',') != -1:
+        return None
+
+    start, sep, end = header[6:].strip().partition('-')
+    if sep == '' or (start == '' and end == '') or not all(part == '' or part.isdigit() for part in [start, end]):
+        return None
+
+    if start == '':
+        # suffix; last n bytes
+        if int(end) == 0:
+            raise ValueError('Empty suffix-range')
+
+        return max(size - int(end), 0), size - 1
+
+    start = int(start)
+    if end != '' and int(end) < start:
+        return None
+
+    if start >= size:
+        raise ValueError('Range out of content')
+
+    end = size - 1 if end == '' else min(int(end), size - 1)
+    return start, end
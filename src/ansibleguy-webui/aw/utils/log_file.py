@@ -0,0 +1,459 @@
+# incremental reading of (growing) log-files; polling clients must not re-read the whole file every time
+#   the byte-offset tail is the primary interface
+#   the line-based reads are served from a sparse line-offset index that is extended as the file grows
+#   streaming clients wait for changes using inotify (if available) or stat-polling
+#   finished logs can be compressed; they stay readable at any offset using an index of independently compressed blocks
+
+from pathlib import Path
+from os import stat as os_stat
+from os import read as os_read
+from os import close as os_close
+from os import remove as remove_file
+from os import chmod, replace
+from time import time, sleep
+from select import select
+from struct import unpack, unpack_from, calcsize
+from zlib import compressobj, decompressobj, Z_FULL_FLUSH, MAX_WBITS
+from json import dumps as json_dumps
+from json import loads as json_loads
+from json import JSONDecodeError
+from ctypes import CDLL
+from ctypes.util import find_library
+from threading import Lock
+from collections import OrderedDict
+
+from aw.config.hardcoded import LOG_TAIL_CHUNK_MAX, LOG_TAIL_CHUNK_MIN, LOG_INDEX_STRIDE, LOG_INDEX_CACHE_SIZE, \
+    LOG_WATCH_POLL, LOG_COMPRESS_BLOCK, LOG_COMPRESS_LEVEL
+from aw.utils.debug import log
+
+READ_BLOCK = 1024 * 1024
+READ_BLOCK_COMPRESSED = 64 * 1024
+LOG_COMPRESS_SUFFIX = '.gz'
+LOG_INDEX_SUFFIX = '.idx'
+GZIP_WBITS = MAX_WBITS | 16
+DEFLATE_WBITS = -MAX_WBITS
+
+# see: man inotify
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+IN_EVENT_HEADER = 'iIII'
+IN_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+
+try:
+    _LIBC = CDLL(find_library('c'), use_errno=True)
+    _INOTIFY = (_LIBC.inotify_init1, _LIBC.inotify_add_watch)
+
+except (OSError, AttributeError, TypeError):
+    _INOTIFY = None
+
+_INDEX_CACHE = OrderedDict()  # path => LogLineIndex
+_INDEX_LOCK = Lock()
+
+
+def _cut_incomplete_utf8(data: bytes) -> bytes:
+    # a multibyte-character might not be completely written yet or be cut by the chunk-size
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte & 0xC0 != 0x80:
+            # lead-byte; expected length of the sequence
+            if byte & 0xE0 == 0xC0:
+                length = 2
+
+            elif byte & 0xF0 == 0xE0:
+                length = 3
+
+            elif byte & 0xF8 == 0xF0:
+                length = 4
+
+            else:
+                length = 1
+
+            return data[:-back] if length > back else data
+
+    return data
+
+
+def get_log_file(path: (str, None)) -> (str, None):
+    # finished logs might have been compressed
+    if path is None:
+        return None
+
+    for candidate in [path, f'{path}{LOG_COMPRESS_SUFFIX}']:
+        if Path(candidate).is_file():
+            return candidate
+
+    return None
+
+
+def get_log_files(path: (str, None)) -> list[str]:
+    # all files that belong to a log
+    if path is None:
+        return []
+
+    return [
+        file for file in [path, f'{path}{LOG_COMPRESS_SUFFIX}', f'{path}{LOG_COMPRESS_SUFFIX}{LOG_INDEX_SUFFIX}']
+        if Path(file).is_file()
+    ]
+
+
+class LogFileCache:
+    # existence-checks of many logs (p.e. listing executions); every path is only checked once
+    #   the files are checked one by one; the cost is bound to the listed executions - not the size of the log-directory
+    def __init__(self):
+        self.files = {}
+
+    def get_log_file(self, path: (str, None)) -> (str, None):
+        if path is None:
+            return None
+
+        if path not in self.files:
+            self.files[path] = get_log_file(path)
+
+        return self.files[path]
+
+
+class LogReader:
+    # random read-access to plain and compressed logs; offsets always are positions in the uncompressed content
+    def __init__(self, path: str):
+        self.file = None
+        for _ in range(2):
+            self.path = get_log_file(path)
+            if self.path is None:
+                raise FileNotFoundError(path)
+
+            try:
+                self.file = open(self.path, 'rb')  # pylint: disable=R1732
+                break
+
+            except FileNotFoundError:
+                # got compressed in the meantime
+                continue
+
+        if self.file is None:
+            raise FileNotFoundError(path)
+
+        stat = os_stat(self.file.fileno())
+        self.inode = stat.st_ino
+        self.compressed = self.path.endswith(LOG_COMPRESS_SUFFIX)
+        self.blocks = None
+        self.pos = 0
+        if self.compressed:
+            self.blocks, self.size = _read_compress_index(self.path)
+
+        else:
+            self.size = stat.st_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def seek(self, pos: int):
+        self.pos = pos
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = max(self.size - self.pos, 0)
+
+        if self.compressed:
+            data = self._read_compressed(min(size, max(self.size - self.pos, 0)))
+
+        else:
+            self.file.seek(self.pos)
+            data = self.file.read(size)
+
+        self.pos += len(data)
+        return data
+
+    def _read_compressed(self, size: int) -> bytes:
+        # decompression starts at the nearest block; they do not reference previous ones (full-flush)
+        if size == 0:
+            return b''
+
+        block = self.pos // LOG_COMPRESS_BLOCK
+        if self.blocks is None or block >= len(self.blocks):
+            block = 0
+            self.file.seek(0)
+
+        else:
+            self.file.seek(self.blocks[block])
+
+        decompressor = decompressobj(wbits=GZIP_WBITS if block == 0 else DEFLATE_WBITS)
+        skip = self.pos - (block * LOG_COMPRESS_BLOCK)
+        data = bytearray()
+        while len(data) < size and not decompressor.eof:
+            compressed = self.file.read(READ_BLOCK_COMPRESSED)
+            if len(compressed) == 0:
+                break
+
+            data += decompressor.decompress(compressed)
+            if skip > 0:
+                skipped = min(skip, len(data))
+                del data[:skipped]
+                skip -= skipped
+
+        return bytes(data[:size])
+
+
+def _read_compress_index(path: str) -> tuple[(list, None), int]:
+    try:
+        with open(f'{path}{LOG_INDEX_SUFFIX}', 'r', encoding='utf-8') as _index:
+            index = json_loads(_index.read())
+            return index['blocks'], index['size']
+
+    except (FileNotFoundError, JSONDecodeError, KeyError):
+        # not compressed by us; the trailer of gzip holds the uncompressed size (modulo 4GB)
+        with open(path, 'rb') as _file:
+            _file.seek(-4, 2)
+            return None, unpack('<I', _file.read(4))[0]
+
+
+def compress_log_file(path: str) -> bool:
+    # gzip with a full-flush every block so it can be read from any block-offset (see LogReader)
+    path_compressed = f'{path}{LOG_COMPRESS_SUFFIX}'
+    path_tmp = f'{path_compressed}.tmp'
+    compressor = compressobj(level=LOG_COMPRESS_LEVEL, wbits=GZIP_WBITS)
+    blocks = []
+    size = 0
+    written = 0
+
+    try:
+        with open(path, 'rb') as src, open(path_tmp, 'wb') as dst:
+            while True:
+                data = src.read(LOG_COMPRESS_BLOCK)
+                if len(data) == 0:
+                    break
+
+                blocks.append(written)
+                compressed = compressor.compress(data) + compressor.flush(Z_FULL_FLUSH)
+                dst.write(compressed)
+                written += len(compressed)
+                size += len(data)
+
+            dst.write(compressor.flush())
+
+        chmod(path_tmp, os_stat(path).st_mode)
+        with open(f'{path_compressed}{LOG_INDEX_SUFFIX}', 'w', encoding='utf-8') as _index:
+            _index.write(json_dumps({'blocks': blocks, 'size': size}))
+
+        chmod(f'{path_compressed}{LOG_INDEX_SUFFIX}', os_stat(path).st_mode)
+        replace(path_tmp, path_compressed)
+        remove_file(path)
+        return True
+
+    except OSError as err:
+        log(f"Failed to compress log-file '{path}': {err}", level=3)
+        if Path(path_tmp).is_file():
+            remove_file(path_tmp)
+
+        return False
+
+
+def read_log_chunk(path: str, offset: int = 0, max_bytes: int = LOG_TAIL_CHUNK_MAX, final: bool = False) -> dict:
+    # final: the log is complete (execution has finished)
+    #   a chunk must be able to hold any complete multibyte-character
+    max_bytes = min(max(max_bytes, LOG_TAIL_CHUNK_MIN), LOG_TAIL_CHUNK_MAX)
+    with LogReader(path) as logfile:
+        size = logfile.size
+        offset = min(max(offset, 0), size)
+        logfile.seek(offset)
+        data = logfile.read(max_bytes)
+        # only finished logs get compressed
+        final = final or logfile.compressed
+
+    # characters that are cut by the chunk-size are read completely by the next request
+    #   incomplete ones at the end are held back while they might still be written - but only once
+    cut = _cut_incomplete_utf8(data)
+    if offset + len(data) < size or (not final and len(cut) > 0):
+        data = cut
+
+    return {
+        'data': data.decode('utf-8', errors='replace'),
+        'offset': offset + len(data),
+        'size': size,
+    }
+
+
+def stream_log_file(path: str, offset: int = 0, length: int = -1):
+    with LogReader(path) as logfile:
+        logfile.seek(offset)
+        if length < 0:
+            length = logfile.size - offset
+
+        while length > 0:
+            data = logfile.read(min(READ_BLOCK, length))
+            if len(data) == 0:
+                break
+
+            length -= len(data)
+            yield data
+
+
+class LogLineIndex:
+    # byte-offset of every LOG_INDEX_STRIDE'th line
+    def __init__(self, inode: int):
+        self.inode = inode
+        self.size = 0
+        self.lines = 0  # complete lines
+        self.offsets = [0]
+
+    def update(self, logfile: LogReader):
+        logfile.seek(self.size)
+        while True:
+            block = logfile.read(READ_BLOCK)
+            if len(block) == 0:
+                break
+
+            pos = block.find(b'\n')
+            while pos != -1:
+                self.lines += 1
+                if self.lines % LOG_INDEX_STRIDE == 0:
+                    self.offsets.append(self.size + pos + 1)
+
+                pos = block.find(b'\n', pos + 1)
+
+            self.size += len(block)
+
+    def seek_line(self, line: int) -> tuple[int, int]:
+        # returns the nearest indexed offset before the line and the count of lines to skip from there
+        checkpoint = min(line // LOG_INDEX_STRIDE, len(self.offsets) - 1)
+        return self.offsets[checkpoint], line - (checkpoint * LOG_INDEX_STRIDE)
+
+
+def _get_line_index(path: str, logfile: LogReader) -> LogLineIndex:
+    with _INDEX_LOCK:
+        index = _INDEX_CACHE.pop(path, None)
+        if index is None or index.size > logfile.size or (
+            # the content stays the same if the file got compressed
+            index.inode != logfile.inode and not (logfile.compressed and index.size == logfile.size)
+        ):
+            # new, replaced or truncated file
+            index = LogLineIndex(inode=logfile.inode)
+
+        index.inode = logfile.inode
+        _INDEX_CACHE[path] = index
+        while len(_INDEX_CACHE) > LOG_INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+
+        if index.size < logfile.size:
+            index.update(logfile)
+
+        return index
+
+
+def read_log_lines(path: str, line_start: int = 0) -> list[str]:
+    with LogReader(path) as logfile:
+        offset, skip = _get_line_index(path=path, logfile=logfile).seek_line(max(line_start, 0))
+        logfile.seek(offset)
+        data = logfile.read()
+        if not logfile.compressed:
+            data = _cut_incomplete_utf8(data)
+
+    parts = data.decode('utf-8', errors='replace').split('\n')
+    lines = [part + '\n' for part in parts[:-1]]
+    if parts[-1] != '':
+        # line that is still being written
+        lines.append(parts[-1])
+
+    return lines[skip:]
+
+
+class FileWatcher:
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def watch(self):
+        if _INOTIFY is None or self.fd is not None or self.path is None:
+            return
+
+        inotify_init, inotify_add_watch = _INOTIFY
+        fd = inotify_init(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+
+        if inotify_add_watch(fd, str(self.path).encode('utf-8'), IN_MASK) < 0:
+            # file does not exist (yet)
+            os_close(fd)
+            return
+
+        self.fd = fd
+
+    def drain(self):
+        try:
+            while True:
+                events = os_read(self.fd, 4096)
+                pos = 0
+                while pos < len(events):
+                    _, mask, _, name_len = unpack_from(IN_EVENT_HEADER, events, pos)
+                    pos += calcsize(IN_EVENT_HEADER) + name_len
+                    if mask & IN_IGNORED:
+                        # file was removed or replaced; re-create the watch
+                        self.close()
+                        return
+
+        except BlockingIOError:
+            pass
+
+    def stat(self) -> (tuple, None):
+        try:
+            stat = os_stat(self.path)
+            return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+        except (FileNotFoundError, TypeError):
+            return None
+
+    def wait(self, timeout: float):
+        # returns once the file might have changed or the timeout is reached
+        self.wait_any(watchers=[self], timeout=timeout)
+
+    @staticmethod
+    def wait_any(watchers: list, timeout: float):
+        # returns once any of the files might have changed or the timeout is reached
+        #   files that cannot be watched (yet) are stat-polled
+        for watcher in watchers:
+            watcher.watch()
+
+        watched = {watcher.fd: watcher for watcher in watchers if watcher.fd is not None}
+        polled = [watcher for watcher in watchers if watcher.fd is None]
+        before = [watcher.stat() for watcher in polled]
+        end = time() + timeout
+        while True:
+            wait = max(end - time(), 0)
+            if len(polled) > 0:
+                wait = min(LOG_WATCH_POLL, wait)
+
+            if len(watched) > 0:
+                ready, _, _ = select(list(watched), [], [], wait)
+                for fd in ready:
+                    watched[fd].drain()
+
+                if len(ready) > 0:
+                    return
+
+            else:
+                sleep(wait)
+
+            if time() >= end or [watcher.stat() for watcher in polled] != before:
+                return
+
+    def close(self):
+        if self.fd is not None:
+            os_close(self.fd)
+            self.fd = None
@@ -0,0 +1,165 @@
+# full-text index of execution-logs; sqlite fts5 in a side-database so the main database stays small
+#   one row per log-line; the rowid-range of every execution is saved so it can be removed cheaply
+#   only the log-maintenance thread of the scheduler writes to it
+
+import sqlite3
+from pathlib import Path
+from contextlib import closing
+from functools import cache
+from re import compile as regex_compile
+
+from aw.settings import DB_FILE
+from aw.config.hardcoded import LOG_SEARCH_LINE_MAX, LOG_SEARCH_BATCH, LOG_SEARCH_DB_TIMEOUT
+from aw.model.job import JobExecution
+from aw.utils.log_file import stream_log_file
+from aw.utils.debug import log
+
+ANSI_ESCAPE = regex_compile(rb'\x1b\[[0-9;]*[A-Za-z]')
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS log_lines USING fts5("
+    "content, execution_id UNINDEXED, job_id UNINDEXED, log_type UNINDEXED, line UNINDEXED)",
+    "CREATE TABLE IF NOT EXISTS log_indexed ("
+    "execution_id INTEGER PRIMARY KEY, job_id INTEGER, rowid_first INTEGER, rowid_last INTEGER)",
+]
+SQL_INSERT_LINES = 'INSERT INTO log_lines (content, execution_id, job_id, log_type, line) VALUES (?, ?, ?, ?, ?)'
+MSG_UNAVAILABLE = 'The log-search is not available - sqlite was built without FTS5'
+
+
+class LogSearchError(Exception):
+    pass
+
+
+@cache
+def is_search_available() -> bool:
+    with closing(sqlite3.connect(':memory:')) as conn:
+        try:
+            conn.execute('CREATE VIRTUAL TABLE fts5_check USING fts5(content)')
+            return True
+
+        except sqlite3.OperationalError as err:
+            log(f"{MSG_UNAVAILABLE}: {err}", level=3)
+            return False
+
+
+def get_path_search_db() -> Path:
+    return Path(DB_FILE).with_name(f'{Path(DB_FILE).stem}.search.db')
+
+
+@cache
+def _create_schema(path: Path):
+    with closing(sqlite3.connect(path, timeout=LOG_SEARCH_DB_TIMEOUT)) as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            conn.execute(statement)
+
+        conn.commit()
+
+
+def _connect() -> sqlite3.Connection:
+    if not is_search_available():
+        raise LogSearchError(MSG_UNAVAILABLE)
+
+    path = get_path_search_db()
+    _create_schema(path)
+    return sqlite3.connect(path, timeout=LOG_SEARCH_DB_TIMEOUT)
+
+
+def _log_lines(path: str):
+    pending = b''
+    for block in stream_log_file(path):
+        lines = (pending + block).split(b'\n')
+        pending = lines.pop()
+        yield from lines
+
+    if pending != b'':
+        yield pending
+
+
+def _index_rows(execution: dict):
+    for field in JobExecution.log_file_fields:
+        if execution[field] is None:
+            continue
+
+        try:
+            for nr, line in enumerate(_log_lines(execution[field]), start=1):
+                content = ANSI_ESCAPE.sub(b'', line).decode('utf-8', errors='replace').strip()
+                if content != '':
+                    yield content[:LOG_SEARCH_LINE_MAX], execution['id'], execution['job_id'], field[4:], nr
+
+        except FileNotFoundError:
+            continue
+
+
+def get_indexed_executions() -> set[int]:
+    with closing(_connect()) as conn:
+        return {row[0] for row in conn.execute('SELECT execution_id FROM log_indexed')}
+
+
+def index_execution_logs(execution: dict):
+    # execution: id, job_id and log-fields
+    with closing(_connect()) as conn:
+        # commit or rollback as one transaction
+        with conn:
+            if conn.execute('SELECT 1 FROM log_indexed WHERE execution_id = ?', (execution['id'],)).fetchone():
+                return
+
+            rowid_first = conn.execute('SELECT coalesce(max(rowid), 0) + 1 FROM log_lines').fetchone()[0]
+            rows = []
+            for row in _index_rows(execution):
+                rows.append(row)
+                if len(rows) >= LOG_SEARCH_BATCH:
+                    conn.executemany(SQL_INSERT_LINES, rows)
+                    rows = []
+
+            if len(rows) > 0:
+                conn.executemany(SQL_INSERT_LINES, rows)
+
+            rowid_last = conn.execute('SELECT coalesce(max(rowid), 0) FROM log_lines').fetchone()[0]
+            conn.execute(
+                'INSERT INTO log_indexed (execution_id, job_id, rowid_first, rowid_last) VALUES (?, ?, ?, ?)',
+                (execution['id'], execution['job_id'], rowid_first, rowid_last),
+            )
+
+    log(f"Indexed logs of job-execution {execution['id']}", level=7)
+
+
+def remove_execution_index(execution_ids: (list, set)):
+    with closing(_connect()) as conn:
+        # commit or rollback as one transaction
+        with conn:
+            for execution_id in execution_ids:
+                indexed = conn.execute(
+                    'SELECT rowid_first, rowid_last FROM log_indexed WHERE execution_id = ?', (execution_id,),
+                ).fetchone()
+                if indexed is None:
+                    continue
+
+                conn.execute('DELETE FROM log_lines WHERE rowid BETWEEN ? AND ?', indexed)
+                conn.execute('DELETE FROM log_indexed WHERE execution_id = ?', (execution_id,))
+
+
+def search_logs(query: str, job_ids: (list, None), limit: int) -> list[dict]:
+    # job_ids: the user is privileged to view; None for all
+    #   newest matches first; the query is searched as phrase
+    if job_ids is not None and len(job_ids) == 0:
+        return []
+
+    phrase = '"' + query.replace('"', '""') + '"'
+    sql = ("SELECT execution_id, job_id, log_type, line, snippet(log_lines, 0, '', '', '...', 24) "
+           "FROM log_lines WHERE log_lines MATCH ?")
+    if job_ids is not None:
+        # the count of bound parameters is limited
+        sql += ' AND job_id IN (SELECT job_id FROM permitted_jobs)'
+
+    sql += ' ORDER BY execution_id DESC, rowid LIMIT ?'
+
+    with closing(_connect()) as conn:
+        if job_ids is not None:
+            # only visible to this connection
+            conn.execute('CREATE TEMP TABLE permitted_jobs (job_id INTEGER PRIMARY KEY)')
+            conn.executemany('INSERT INTO permitted_jobs (job_id) VALUES (?)', ((job_id,) for job_id in job_ids))
+
+        return [
+            {'execution': execution_id, 'job': job_id, 'log': log_type, 'line': line, 'snippet': snippet}
+            for execution_id, job_id, log_type, line, snippet in conn.execute(sql, (phrase, limit))
+        ]
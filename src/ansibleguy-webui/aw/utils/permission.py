@@ -1,10 +1,12 @@
+from django.db.models import Q
+
 from aw.model.job import Job
-from aw.model.permission import JobPermissionMapping, JobPermissionMemberUser, JobPermissionMemberGroup, \
-    CHOICE_PERMISSION_READ, JobCredentialsPermissionMapping, JobRepositoryPermissionMapping, JobPermission, \
-    CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE
+from aw.model.permission import JobPermissionMapping, CHOICE_PERMISSION_READ, JobCredentialsPermissionMapping, \
+    JobRepositoryPermissionMapping, JobPermission, CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE
 from aw.model.job_credential import BaseJobCredentials, JobGlobalCredentials
 from aw.model.repository import Repository
 from aw.base import USERS
+from aw.utils.permission_cache import get_cached_permission
 from aw.utils.debug import log
 from aw.config.hardcoded import GRP_MANAGER
 
@@ -22,124 +24,156 @@ def get_job_if_allowed(user: USERS, job: Job, permission_needed: int) -> (Job, N
     return None
 
 
-def _evaluate_permission(permission: JobPermission, user: USERS, permission_needed: int) -> bool:
-    # ignore permission if access-level is too low
-    if permission.permission < permission_needed:
-        return False
+def _get_user_permissions(user: USERS, permission_needed: int, permission_attr_all: str) -> list[dict]:
+    # permissions with a sufficient access-level that include the user or one of its groups
+    return list(JobPermission.objects.filter(
+        Q(jobpermissionmemberuser__user=user) | Q(jobpermissionmembergroup__group__in=user.groups.all()),
+        permission__gte=permission_needed,
+    ).distinct().values('id', 'name', permission_attr_all))
 
-    # if one of the permissions allows the user
-    if JobPermissionMemberUser.objects.filter(user=user, permission=permission).exists():
-        return True
 
-    # if one of the permissions allows a group that the user is a member of
-    links = JobPermissionMemberGroup.objects.filter(permission=permission)
-    if links.exists() and user.groups.filter(name__in=[
-        link.group.name for link in links
-    ]).exists():
+def _is_privileged_all(user: USERS, permission_needed: int, manager: (str, None)) -> bool:
+    if user.is_superuser:
         return True
 
-    return False
-
+    return manager is not None and \
+        permission_needed in [CHOICE_PERMISSION_READ, CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE] and \
+        has_manager_privileges(user=user, kind=manager)
 
-def _has_permission(
-        permission_links: (JobPermissionMapping, JobCredentialsPermissionMapping), permission_needed: int,
-        user: USERS, permission_attr_all: str, manager: str = None,
-) -> bool:
-    if user.is_superuser:
-        return True
 
-    if manager is not None and \
-            permission_needed in [CHOICE_PERMISSION_READ, CHOICE_PERMISSION_WRITE, CHOICE_PERMISSION_DELETE] and \
-            has_manager_privileges(user=user, kind=manager):
-        return True
+def _resolve_permitted_ids(
+        user: USERS, *, permission_needed: int, permission_attr_all: str, mapping: type, mapping_field: str,
+        manager: str = None,
+) -> (set[int], None):
+    if _is_privileged_all(user=user, permission_needed=permission_needed, manager=manager):
+        return None
 
-    # 'all' permissions
-    for permission in JobPermission.objects.filter(**{permission_attr_all: True}):
-        if _evaluate_permission(permission=permission, user=user, permission_needed=permission_needed):
+    permissions = _get_user_permissions(
+        user=user, permission_needed=permission_needed, permission_attr_all=permission_attr_all,
+    )
+    for permission in permissions:
+        if permission[permission_attr_all]:
             log(
-                msg=f"User '{user}' privileged ({permission_needed}) through permission {permission.name}",
+                msg=f"User '{user}' privileged ({permission_needed}) through permission {permission['name']}",
                 level=7,
             )
-            return True
+            return None
 
-    # lined permissions
-    for link in permission_links:
-        if _evaluate_permission(permission=link.permission, user=user, permission_needed=permission_needed):
-            log(
-                msg=f"User '{user}' privileged ({permission_needed}) through permission {link.permission.name}",
-                level=7,
-            )
-            return True
+    return set(mapping.objects.filter(
+        permission_id__in=[permission['id'] for permission in permissions],
+    ).values_list(f'{mapping_field}_id', flat=True))
 
-    return False
 
+def _get_permitted_ids(
+        user: USERS, *, permission_needed: int, permission_attr_all: str, mapping: type, mapping_field: str,
+        manager: str = None,
+) -> (set[int], None):
+    # ids of all objects the user is privileged to access; None if it may access all of them
+    if user.is_superuser:
+        return None
 
-def has_job_permission(user: USERS, job: Job, permission_needed: int) -> bool:
-    return _has_permission(
-        permission_links=JobPermissionMapping.objects.filter(job=job),
-        permission_needed=permission_needed,
-        permission_attr_all='jobs_all',
+    return get_cached_permission(
         user=user,
-        manager='job',
+        key=(permission_attr_all, permission_needed),
+        resolve=lambda: _resolve_permitted_ids(
+            user=user, permission_needed=permission_needed, permission_attr_all=permission_attr_all,
+            mapping=mapping, mapping_field=mapping_field, manager=manager,
+        ),
     )
 
 
+def _is_permitted(obj, ids: (set[int], None)) -> bool:
+    # obj: instance or its id
+    return ids is None or getattr(obj, 'id', obj) in ids
+
+
+def has_job_permission(user: USERS, job: Job, permission_needed: int) -> bool:
+    return _is_permitted(obj=job, ids=get_permitted_job_ids(user=user, permission_needed=permission_needed))
+
+
 def has_credentials_permission(
         user: USERS, credentials: BaseJobCredentials, permission_needed: int,
 ) -> bool:
-    return _has_permission(
-        permission_links=JobCredentialsPermissionMapping.objects.filter(credentials=credentials),
-        permission_needed=permission_needed,
-        permission_attr_all='credentials_all',
-        user=user,
-        manager='credentials',
+    return _is_permitted(
+        obj=credentials,
+        ids=get_permitted_credentials_ids(user=user, permission_needed=permission_needed),
     )
 
 
 def has_repository_permission(
         user: USERS, repository: Repository, permission_needed: int,
 ) -> bool:
-    return _has_permission(
-        permission_links=JobRepositoryPermissionMapping.objects.filter(repository=repository),
-        permission_needed=permission_needed,
-        permission_attr_all='repositories_all',
+    return _is_permitted(
+        obj=repository,
+        ids=get_permitted_repository_ids(user=user, permission_needed=permission_needed),
+    )
+
+
+def get_permitted_job_ids(user: USERS, permission_needed: int = CHOICE_PERMISSION_READ) -> (set[int], None):
+    # None if the user is privileged to access all jobs
+    return _get_permitted_ids(
         user=user,
-        manager='repository',
+        permission_needed=permission_needed,
+        permission_attr_all='jobs_all',
+        mapping=JobPermissionMapping,
+        mapping_field='job',
+        manager='job',
     )
 
 
-def get_viewable_jobs(user: USERS) -> list[Job]:
-    jobs_viewable = []
+def get_permitted_credentials_ids(
+        user: USERS, permission_needed: int = CHOICE_PERMISSION_READ,
+) -> (set[int], None):
+    # None if the user is privileged to access all global credentials
+    return _get_permitted_ids(
+        user=user,
+        permission_needed=permission_needed,
+        permission_attr_all='credentials_all',
+        mapping=JobCredentialsPermissionMapping,
+        mapping_field='credentials',
+        manager='credentials',
+    )
 
-    for job in Job.objects.all():
-        if has_job_permission(user=user, job=job, permission_needed=CHOICE_PERMISSION_READ):
-            jobs_viewable.append(job)
 
-    return jobs_viewable
+def get_permitted_repository_ids(
+        user: USERS, permission_needed: int = CHOICE_PERMISSION_READ,
+) -> (set[int], None):
+    # None if the user is privileged to access all repositories
+    return _get_permitted_ids(
+        user=user,
+        permission_needed=permission_needed,
+        permission_attr_all='repositories_all',
+        mapping=JobRepositoryPermissionMapping,
+        mapping_field='repository',
+        manager='repository',
+    )
 
 
-def get_viewable_credentials(user: USERS) -> list[BaseJobCredentials]:
-    credentials_viewable = []
+def filter_permitted(queryset, ids: (set[int], None), field: str = 'id'):
+    if ids is None:
+        return queryset
 
-    for credentials in JobGlobalCredentials.objects.all():
-        if has_credentials_permission(user=user, credentials=credentials, permission_needed=CHOICE_PERMISSION_READ):
-            credentials_viewable.append(credentials)
+    return queryset.filter(**{f'{field}__in': ids})
 
-    return credentials_viewable
 
+def get_viewable_jobs(user: USERS) -> list[Job]:
+    return list(filter_permitted(Job.objects.all(), ids=get_permitted_job_ids(user)))
 
-def get_viewable_repositories(user: USERS) -> list[Repository]:
-    repositories_viewable = []
 
-    for repository in Repository.objects.all():
-        if has_repository_permission(user=user, repository=repository, permission_needed=CHOICE_PERMISSION_READ):
-            repositories_viewable.append(repository)
+def get_viewable_credentials(user: USERS) -> list[BaseJobCredentials]:
+    return list(filter_permitted(JobGlobalCredentials.objects.all(), ids=get_permitted_credentials_ids(user)))
 
-    return repositories_viewable
+
+def get_viewable_repositories(user: USERS) -> list[Repository]:
+    return list(filter_permitted(Repository.objects.all(), ids=get_permitted_repository_ids(user)))
 
 
 def has_manager_privileges(user: USERS, kind: str) -> bool:
     if user.is_superuser:
         return True
 
-    return user.groups.filter(name=GRP_MANAGER[kind]).exists()
+    return get_cached_permission(
+        user=user,
+        key=('manager', kind),
+        resolve=lambda: user.groups.filter(name=GRP_MANAGER[kind]).exists(),
+    )
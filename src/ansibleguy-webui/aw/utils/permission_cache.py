@@ -0,0 +1,108 @@
+# in-process cache of the effective permissions of users
+#   changes of permissions, their mappings/members or the group-memberships of users bump a global generation;
+#   it is kept as file next to the database so every process (web-workers, scheduler) sees it using a single stat
+#   cached permissions of an older generation are dropped on their next lookup
+
+from pathlib import Path
+from os import stat as os_stat
+from os import replace
+from time import time_ns
+from threading import Lock
+from collections import OrderedDict
+from collections.abc import Callable
+
+from django.db import transaction
+from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from aw.settings import DB_FILE
+from aw.config.hardcoded import PERMISSION_CACHE_SIZE
+from aw.model.permission import JobPermission, JobPermissionMapping, JobCredentialsPermissionMapping, \
+    JobRepositoryPermissionMapping, JobPermissionMemberUser, JobPermissionMemberGroup
+from aw.base import USERS, GROUPS
+from aw.utils.debug import log
+
+_CACHE = OrderedDict()
+_CACHE_LOCK = Lock()
+PERMISSION_MODELS = [
+    JobPermission, JobPermissionMapping, JobCredentialsPermissionMapping, JobRepositoryPermissionMapping,
+    JobPermissionMemberUser, JobPermissionMemberGroup, GROUPS,
+]
+
+
+def get_path_generation() -> Path:
+    return Path(DB_FILE).with_name(f'{Path(DB_FILE).stem}.permissions.gen')
+
+
+def get_generation() -> (tuple, None):
+    # the file is replaced on every bump
+    try:
+        stat = os_stat(get_path_generation())
+        return stat.st_ino, stat.st_mtime_ns
+
+    except FileNotFoundError:
+        return None
+
+
+def bump_generation():
+    path = get_path_generation()
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as _file:
+        _file.write(str(time_ns()))
+
+    replace(f'{path}.tmp', path)
+    log('Permissions changed - dropping cached permissions', level=7)
+
+
+def get_cached_permission(user: USERS, key: tuple, resolve: Callable) -> any:
+    generation = get_generation()
+    with _CACHE_LOCK:
+        cached = _CACHE.get(user.id, None)
+        if cached is not None and cached['generation'] == generation and key in cached['entries']:
+            _CACHE.move_to_end(user.id)
+            return cached['entries'][key]
+
+    # resolve outside the lock; concurrent lookups of the same key only do redundant work
+    value = resolve()
+
+    with _CACHE_LOCK:
+        cached = _CACHE.pop(user.id, None)
+        if cached is None or cached['generation'] != generation:
+            cached = {'generation': generation, 'entries': {}}
+
+        cached['entries'][key] = value
+        _CACHE[user.id] = cached
+        while len(_CACHE) > PERMISSION_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+    return value
+
+
+def _on_change():
+    # readers must not cache the state before the change is committed
+    transaction.on_commit(bump_generation)
+
+
+def _permission_changed(**kwargs):
+    _on_change()
+
+
+@receiver(post_save, sender=USERS)
+def _user_changed(update_fields: (frozenset, None), **kwargs):
+    # every login updates the user
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        _on_change()
+
+
+def _membership_changed(action: str, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        _on_change()
+
+
+# connected to the specific models; receivers without sender would disable fast-deletes of all models
+for _model in PERMISSION_MODELS:
+    post_save.connect(_permission_changed, sender=_model)
+    post_delete.connect(_permission_changed, sender=_model)
+
+for _through in [JobPermission.users.through, JobPermission.groups.through, JobPermission.jobs.through,
+                 JobPermission.credentials.through, JobPermission.repositories.through, USERS.groups.through]:
+    m2m_changed.connect(_membership_changed, sender=_through)
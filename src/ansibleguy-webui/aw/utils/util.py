@@ -8,7 +8,7 @@ from math import ceil
 
 from pkg_resources import get_distribution
 from crontab import CronTab
-from pytz import utc
+from pytz import utc, BaseTzInfo
 
 from aw.config.main import config
 from aw.config.hardcoded import SHORT_TIME_FORMAT
@@ -23,17 +23,20 @@ def datetime_w_tz() -> datetime:
     return datetime.now(config.timezone)
 
 
-def datetime_from_db(dt: (datetime, None)) -> (datetime, None):
+def datetime_from_db(dt: (datetime, None), tz: BaseTzInfo = None) -> (datetime, None):
     # datetime form db will always be UTC; convert it
     if not isinstance(dt, datetime):
         return None
 
-    local_dt = dt.replace(tzinfo=utc).astimezone(config.timezone)
-    return config.timezone.normalize(local_dt)
+    if tz is None:
+        tz = config.timezone
 
+    local_dt = dt.replace(tzinfo=utc).astimezone(tz)
+    return tz.normalize(local_dt)
 
-def datetime_from_db_str(dt: (datetime, None), fmt: str = SHORT_TIME_FORMAT) -> str:
-    dt = datetime_from_db(dt)
+
+def datetime_from_db_str(dt: (datetime, None), fmt: str = SHORT_TIME_FORMAT, tz: BaseTzInfo = None) -> str:
+    dt = datetime_from_db(dt=dt, tz=tz)
     if not isinstance(dt, datetime):
         return ''
 
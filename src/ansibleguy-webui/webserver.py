@@ -22,6 +22,8 @@ OPTIONS_DEV = {
 }
 OPTIONS_PROD = {
     'bind': f'{LISTEN_ADDRESS}:{PORT_WEB}',
+    # streamed responses (live-logs) would block a whole sync-worker
+    'threads': int(get_aw_env_var_or_default('web_threads')),
     'reload': False,
     'loglevel': 'warning',
 }
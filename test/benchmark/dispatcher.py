@@ -0,0 +1,116 @@
+# compares the cron-dispatcher to one sleeping thread per schedule
+#   python3 test/benchmark/dispatcher.py --schedules 10000
+
+from argparse import ArgumentParser
+from os import environ
+from os import path as os_path
+from sys import path as sys_path
+from tempfile import mkdtemp
+from shutil import rmtree
+from random import randint
+from threading import Thread, Event, active_count
+from time import time, sleep
+from types import SimpleNamespace
+
+sys_path.append(os_path.join(os_path.dirname(os_path.abspath(__file__)), '../../src/ansibleguy-webui'))
+environ.setdefault('AW_ENV', 'staging')
+# never touch the configured database; a directory gets a database-file created inside
+environ['AW_DB'] = mkdtemp(prefix='aw-bench-')
+
+# pylint: disable=C0413,E0401
+from cli_init import init_cli
+
+init_cli()
+
+from aw.execute.dispatcher import CronDispatcher
+
+
+class CountingPool:
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, job, callback=None):
+        del job, callback
+        self.submitted += 1
+
+
+def _rss_kb() -> int:
+    with open('/proc/self/status', 'r', encoding='utf-8') as status:
+        for line in status.readlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+    return 0
+
+
+def _jobs(count: int) -> list:
+    return [
+        SimpleNamespace(
+            id=nr, name=f'job{nr}', enabled=True, repository_id=None,
+            schedule=f'{randint(0, 59)} {randint(0, 23)} * * {randint(0, 6)}',
+        )
+        for nr in range(count)
+    ]
+
+
+def _report(name: str, took: float, rss_before: int, threads_before: int):
+    print(
+        f"{name}: setup {took:.2f}s | threads +{active_count() - threads_before} | "
+        f"rss +{(_rss_kb() - rss_before) / 1024:.1f} MB"
+    )
+
+
+def bench_dispatcher(jobs: list):
+    rss_before, threads_before = _rss_kb(), active_count()
+    start = time()
+
+    dispatcher = CronDispatcher(pool=CountingPool())
+    dispatcher.start()
+    for job in jobs:
+        dispatcher.add(job)
+
+    for job in jobs[:len(jobs) // 10]:
+        dispatcher.replace(job)
+
+    _report('cron-dispatcher', time() - start, rss_before, threads_before)
+    dispatcher.stop()
+
+
+def bench_threads(jobs: list):
+    rss_before, threads_before = _rss_kb(), active_count()
+    start = time()
+
+    stop = Event()
+    threads = []
+    for job in jobs:
+        thread = Thread(target=stop.wait, daemon=True, name=f'Thread {job.id}')
+        thread.start()
+        threads.append(thread)
+
+    sleep(1)
+    _report('thread per schedule', time() - start, rss_before, threads_before)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-s', '--schedules', type=int, default=10_000)
+    parser.add_argument('-n', '--no-compare', action='store_true', default=False)
+    args = parser.parse_args()
+
+    jobs = _jobs(args.schedules)
+    print(f'Benchmarking {args.schedules} schedules')
+    try:
+        bench_dispatcher(jobs)
+
+        if not args.no_compare:
+            bench_threads(jobs)
+
+    finally:
+        rmtree(environ['AW_DB'], ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
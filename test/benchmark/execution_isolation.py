@@ -0,0 +1,98 @@
+# measures how much parallel executions delay the scheduler-process (thread- vs process-isolated execution)
+#   python3 test/benchmark/execution_isolation.py --executions 30
+
+from argparse import ArgumentParser
+from os import environ
+from os import path as os_path
+from sys import path as sys_path
+from tempfile import mkdtemp
+from shutil import rmtree
+from threading import Thread, Event
+from time import time, sleep
+from statistics import median, quantiles
+
+sys_path.append(os_path.join(os_path.dirname(os_path.abspath(__file__)), '../../src/ansibleguy-webui'))
+environ.setdefault('AW_ENV', 'staging')
+PATH_PLAY = mkdtemp(prefix='aw-bench-')
+environ['AW_PATH_PLAY'] = PATH_PLAY
+
+# pylint: disable=C0413,E0401
+from cli_init import init_cli
+
+init_cli()
+
+from aw.model.job import Job
+from aw.execute.pool import ExecutionPool
+
+TICK = 0.01
+PLAYBOOK = '''
+- hosts: localhost
+  connection: local
+  gather_facts: false
+  tasks:
+    - name: Produce output
+      ansible.builtin.debug:
+        msg: "{{ range(200) | list }}"
+      loop: "{{ range(%s) | list }}"
+'''
+
+
+def _ticker(stop: Event, delays: list):
+    # stands in for the scheduler-loop; records how late it wakes up
+    while not stop.is_set():
+        start = time()
+        sleep(TICK)
+        delays.append((time() - start - TICK) * 1000)
+
+
+def bench(job: Job, executions: int, isolate: bool):
+    pool = ExecutionPool()
+    pool.size = executions
+    pool.isolate_process = isolate
+    pool.start()
+
+    delays = []
+    stop = Event()
+    ticker = Thread(target=_ticker, args=(stop, delays), daemon=True)
+    ticker.start()
+
+    start = time()
+    items = [pool.submit(job=job) for _ in range(executions)]
+    for item in items:
+        item.done.wait()
+
+    took = time() - start
+    stop.set()
+    ticker.join()
+    pool.stop()
+
+    print(
+        f"{'process' if isolate else 'thread'}-isolation: {executions} executions took {took:.2f}s | "
+        f"scheduler wake-up delay ms: median {median(delays):.2f}, p99 {quantiles(delays, n=100)[98]:.2f}, "
+        f"max {max(delays):.2f}"
+    )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-e', '--executions', type=int, default=30)
+    parser.add_argument('-l', '--loop', type=int, default=100, help='Loop-iterations of the verbose task')
+    args = parser.parse_args()
+
+    with open(f'{PATH_PLAY}/play.yml', 'w', encoding='utf-8') as playbook:
+        playbook.write(PLAYBOOK % args.loop)
+
+    job = Job(name='benchmark_execution_isolation', playbook_file='play.yml', verbosity=3, environment_vars='')
+    job.save()
+
+    try:
+        bench(job=job, executions=args.executions, isolate=False)
+        bench(job=job, executions=args.executions, isolate=True)
+
+    finally:
+        job.delete()
+        rmtree(PATH_PLAY, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# checks that serializing job-executions (api/job_exec, api/job?executions=true) uses a constant count of queries
+#   python3 test/benchmark/execution_serialization.py --executions 1000
+
+from argparse import ArgumentParser
+from os import environ
+from os import path as os_path
+from sys import path as sys_path
+from sys import exit as sys_exit
+from tempfile import mkdtemp
+from shutil import rmtree
+from time import time
+from types import SimpleNamespace
+
+sys_path.append(os_path.join(os_path.dirname(os_path.abspath(__file__)), '../../src/ansibleguy-webui'))
+environ.setdefault('AW_ENV', 'staging')
+PATH_TMP = mkdtemp(prefix='aw-bench-')
+# never touch the configured database
+environ['AW_DB'] = f'{PATH_TMP}/aw.db'
+
+# pylint: disable=C0413,E0401
+from cli_init import init_cli
+
+init_cli()
+
+from django.core.management import call_command
+
+call_command('migrate', verbosity=0)
+# like the webserver once initialized; settings are read from the database
+environ['AW_INIT'] = '0'
+
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from aw.model.job import Job, JobExecution, JobExecutionResult, JobError
+from aw.api_endpoints.job_util import get_executions_serialized, get_viewable_jobs_serialized
+
+JOBS = 5
+SUPERUSER = SimpleNamespace(id=0, is_superuser=True)
+
+
+def _create(jobs: list[Job], executions: int):
+    for nr in range(executions):
+        job = jobs[nr % len(jobs)]
+        error = None
+        if nr % 3 == 0:
+            error = JobError(short='failed', med='task failed')
+            error.save()
+
+        result = JobExecutionResult(time_fin=timezone.now(), failed=error is not None, error=error)
+        result.save()
+
+        log_stdout = f'{PATH_TMP}/{job.id}_{nr}_stdout.log'
+        with open(log_stdout, 'w', encoding='utf-8') as log:
+            log.write('PLAY [all]\n')
+
+        JobExecution(
+            job=job, result=result, status=4, log_stdout=log_stdout, log_stderr=f'{PATH_TMP}/{job.id}_{nr}_stderr.log',
+        ).save()
+
+
+def _measure(name: str, serialize, executions: int) -> int:
+    reset_queries()
+    start = time()
+    with CaptureQueriesContext(connection) as queries:
+        serialize(executions)
+
+    print(f"{name} ({executions} executions): {len(queries)} queries | took {(time() - start) * 1000:.1f} ms")
+    return len(queries)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument('-e', '--executions', type=int, default=1000)
+    args = parser.parse_args()
+
+    try:
+        jobs = []
+        for nr in range(JOBS):
+            job = Job(name=f'benchmark_execution_serialization_{nr}', playbook_file='play.yml')
+            job.save()
+            jobs.append(job)
+
+        _create(jobs=jobs, executions=args.executions)
+        executions = JobExecution.objects.filter(job__in=jobs).order_by('-updated')
+
+        failed = []
+        for name, serialize in {
+            'api/job_exec': lambda count: get_executions_serialized(executions[:count]),
+            'api/job?executions=true': lambda count: get_viewable_jobs_serialized(
+                user=SUPERUSER, executions=True, execution_count=count // JOBS,
+            ),
+        }.items():
+            queries_few = _measure(name=name, serialize=serialize, executions=10)
+            queries_all = _measure(name=name, serialize=serialize, executions=args.executions)
+            if queries_all > queries_few:
+                failed.append(name)
+
+    finally:
+        rmtree(PATH_TMP, ignore_errors=True)
+
+    if len(failed) > 0:
+        print(f"Query-count grows with the executions: {', '.join(failed)}")
+        sys_exit(1)
+
+
+if __name__ == '__main__':
+    main()
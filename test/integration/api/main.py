@@ -89,7 +89,7 @@ def test_add():
         # repos
         {'l': 'repository', 'd': {
             'name': 'gitty1', 'rtype': 2, 'git_origin': 'https://github.com/ansibleguy/webui.git',
-            'git_branch': 'latest',
+            'git_branch': 'latest', 'git_partial': True, 'git_sparse': True, 'git_sparse_paths': 'docs',
         }},
         {'l': 'repository', 'd': {'name': 'staticy1', 'rtype': 1, 'static_path': '/etc/ansible/repo'}},
 
@@ -112,7 +112,7 @@ def test_add():
         }},
         {'l': 'job', 'd': {
             'name': 'jup5', 'playbook_file': 'nope_nr2.yml', 'inventory_file': 'hosts.yml', 'schedule': '5 4 * * *',
-            'environment_vars': 'MY=1,SUPER=2,VARS=3',
+            'environment_vars': 'MY=1,SUPER=2,VARS=3', 'overlap': 2,
         }},
 
         # perms